@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+# Times catching up on a synthetic slurmctld log (200 MB by default), as after a restart: LogFile reading the file a
+# line at a time in text mode and asking for the position after each line (how LogFile.handle used to work) versus
+# reading it in blocks, one line per callback and in batches. Positions are written every 1000 lines. Give --log to
+# time an existing log file instead.
+#
+#   $ python benchmarks/log_read.py [--megabytes 200] [--log slurmctld.log]
+
+import optparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+from ipf.log import LogFile, PositionDB
+
+#######################################################################################################################
+
+def parser():
+    parser = optparse.OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--megabytes",type="int",default=200,help="the size of the synthetic log (default 200)")
+    parser.add_option("--log",help="time this log file instead of a synthetic one")
+    return parser
+
+# slurmctld log lines - the update step handles the last four
+SLURMCTLD_LINES = [
+    "[%s] sched: Allocate JobId=%d NodeList=c401-[101-104] #CPUs=256 Partition=normal",
+    "[%s] _job_complete: JobId=%d WEXITSTATUS 0",
+    "[%s] _job_complete: JobId=%d done",
+    "[%s] _slurm_rpc_complete_batch_script: JobId=%d usec=88",
+    "[%s] _slurm_rpc_kill_job: REQUEST_KILL_JOB JobId=%d uid 1001",
+    "[%s] backfill: Started JobId=%d in normal on c401-203",
+    "[%s] debug:  sched: Running job scheduler for full queue. JobId=%d",
+    "[%s] error: Nodes c401-[101] not responding %d",
+    "[%s] Resending TERMINATE_JOB request JobId=%d Nodelist=c401-101",
+    "[%s] _slurm_rpc_submit_batch_job JobId=%d usec=12273",
+    "[%s] sched: _slurm_rpc_job_step_create: StepId=%d.0 c410-[603,701] usec=477",
+    "[%s] job %d cancelled from interactive user",
+    "[%s] sched: _slurm_rpc_step_complete StepId=%d.0 usec=43",
+]
+
+def slurmctldLines(num_lines, handled_fraction=0.15):
+    """Yields num_lines synthetic slurmctld log lines, about handled_fraction of which the update step handles."""
+    random.seed(16)
+    for i in range(num_lines):
+        timestamp = "2026-01-%02dT%02d:%02d:%02d.%03d" % (1+i//86400%28,i//3600%24,i//60%60,i%60,i%1000)
+        if random.random() < handled_fraction:
+            line = random.choice(SLURMCTLD_LINES[-4:])
+        else:
+            line = random.choice(SLURMCTLD_LINES[:-4])
+        yield line % (timestamp,random.randint(1000000,9999999)) + "\n"
+
+def writeLog(path, megabytes):
+    size = 0
+    with open(path,"w") as f:
+        for line in slurmctldLines(megabytes*1024*1024):
+            f.write(line)
+            size += len(line)
+            if size >= megabytes*1024*1024:
+                break
+
+class ReadlineLogFile(LogFile):
+    def open(self):
+        self.file = open(self.path,"r")
+        self._seek()
+
+    def handle(self):
+        line = "junk"
+        self._seek()
+        while line:
+            line = self.file.readline()
+            if line.endswith("\n"):
+                self.callback(self.path,line)
+                self.pos_db.set(self.id,self.file.tell())
+            else:
+                break
+        self.pos_db.checkpoint()
+
+def timeRead(log_cls, log_path, pos_path, batch=False):
+    lines = [0]
+    def countLine(path, line):
+        lines[0] += 1
+    def countBatch(path, batch_lines):
+        lines[0] += len(batch_lines)
+    if os.path.exists(pos_path):
+        os.remove(pos_path)
+    pos_db = PositionDB(pos_path,checkpoint_lines=1000)
+    log_file = log_cls(log_path,countBatch if batch else countLine,pos_db,batch=batch)
+    pos_db.set(log_file.id,0)   # read from the start instead of the end
+    log_file.open()
+    start = time.time()
+    log_file.handle()
+    pos_db.flush()
+    elapsed = time.time() - start
+    log_file.close()
+    return (lines[0],elapsed,pos_db.get(log_file.id))
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    (options,args) = parser().parse_args()
+    path = tempfile.mkdtemp(prefix="ipf-bench-")
+    try:
+        log_path = options.log
+        if log_path is None:
+            log_path = os.path.join(path,"slurmctld.log")
+            writeLog(log_path,options.megabytes)
+        print("%s, %.0f MB" % (log_path,os.path.getsize(log_path)/1024/1024))
+        for (label,log_cls,batch) in (("readline",ReadlineLogFile,False),
+                                      ("blocks",LogFile,False),
+                                      ("blocks, batch",LogFile,True)):
+            (lines,elapsed,position) = timeRead(log_cls,log_path,os.path.join(path,"positions"),batch)
+            print("  %-13s %9d lines %6.2fs %10.0f lines/s  position %d" %
+                  (label,lines,elapsed,lines/elapsed,position))
+    finally:
+        shutil.rmtree(path)
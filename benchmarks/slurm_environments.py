@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+# Times the SLURM ExecutionEnvironmentsStep on a synthetic cluster: 20 racks of 1000 nodes, 6 overlapping
+# partitions, and 200 reservations by default. Reading (running the fake scontrol and parsing its output) and
+# aggregating the nodes of each partition and reservation are timed separately, for the text and JSON paths.
+#
+#   $ python benchmarks/slurm_environments.py [--racks 20] [--reservations 200] [--repeat 10]
+
+import json
+import optparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+os.environ.setdefault("IPF_VAR_PATH",tempfile.gettempdir())
+
+from ipf.glue2 import execution_environment
+from ipf.glue2 import slurm
+
+#######################################################################################################################
+
+def parser():
+    parser = optparse.OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--racks",type="int",default=20,help="the number of racks of 1000 nodes (default 20)")
+    parser.add_option("--reservations",type="int",default=200,help="the number of reservations (default 200)")
+    parser.add_option("--repeat",type="int",default=10,help="the number of times to run, best is shown (default 10)")
+    return parser
+
+def hostList(names):
+    # rack-1000 names sort after rack-999 as strings, so work with numbers
+    numbers = {}
+    for name in names:
+        (rack,number) = name.split("-")
+        numbers.setdefault(rack,[]).append(int(number))
+    exprs = []
+    for rack in sorted(numbers):
+        ranges = []
+        for number in sorted(numbers[rack]):
+            if len(ranges) > 0 and ranges[-1][1] == number - 1:
+                ranges[-1][1] = number
+            else:
+                ranges.append([number,number])
+        parts = ["%03d" % first if first == last else "%03d-%03d" % (first,last) for (first,last) in ranges]
+        exprs.append("%s-[%s]" % (rack,",".join(parts)))
+    return ",".join(exprs)
+
+def writeCluster(path, num_racks, num_reservations):
+    random.seed(23)
+    racks = ["c4%02d" % rack for rack in range(1,num_racks+1)]
+    names = ["%s-%03d" % (rack,number) for rack in racks for number in range(1,1001)]
+
+    node_strs = []
+    node_docs = []
+    for name in names:
+        gpu = name.startswith(racks[-1])
+        cpus = random.choice([64,128])
+        memory = random.choice([256000,512000])
+        sockets = random.choice([2,4])
+        state = random.choice(["IDLE","ALLOCATED","ALLOCATED","MIXED","DOWN+DRAIN","RESERVED","MAINT"])
+        feature = "gpu" if gpu else "cpu"
+        node_strs.append("NodeName=%s Arch=x86_64 CoresPerSocket=32\n   CPUAlloc=0 CPUTot=%d CPULoad=0.01\n"
+                         "   AvailableFeatures=%s\n   Gres=%s\n   RealMemory=%d AllocMem=0 FreeMem=1 Sockets=%d Boards=1\n"
+                         "   State=%s ThreadsPerCore=1\n   Partitions=normal\n" %
+                         (name,cpus,feature,"gpu:a100:4(S:0)" if gpu else "(null)",memory,sockets,state))
+        node_docs.append({"name": name, "sockets": sockets, "cpus": cpus, "real_memory": memory,
+                          "partitions": ["normal"], "features": [feature], "state": state.split("+"),
+                          "gres": "gpu:a100:4(S:0)" if gpu else "",
+                          "gres_used": "gpu:a100:%d(IDX:0)" % random.randint(0,4) if gpu else ""})
+
+    half = len(names) // 2
+    partitions = [("normal",names),("large",names[:half]),("gpu",[n for n in names if n.startswith(racks[-1])]),
+                  ("debug",names[:64]),("long",names[half//2:half//2+half]),("shared",names[::2])]
+    partition_strs = []
+    partition_docs = []
+    for (name,part_names) in partitions:
+        partition_strs.append("PartitionName=%s\n   AllowGroups=ALL\n   Nodes=%s\n   State=UP TotalCPUs=1 TotalNodes=%d\n" %
+                              (name,hostList(part_names),len(part_names)))
+        partition_docs.append({"name": name, "nodes": {"total": len(part_names), "configured": hostList(part_names)}})
+
+    reservation_strs = []
+    reservation_docs = []
+    for i in range(num_reservations):
+        start = random.randrange(0,len(names)-400)
+        res_names = random.sample(names[start:start+400],random.randint(5,200))
+        active = i % 10 != 0
+        partition = random.choice(["normal","large","gpu"])
+        reservation_strs.append("ReservationName=res%03d StartTime=2026-10-01T00:00:00 EndTime=2026-12-01T00:00:00 Duration=1\n"
+                                "   Nodes=%s NodeCnt=%d CoreCnt=1 Features=(null) PartitionName=%s Flags=\n"
+                                "   State=%s BurstBuffer=(null)\n" %
+                                (i,hostList(res_names),len(res_names),partition,"ACTIVE" if active else "INACTIVE"))
+        reservation_docs.append({"name": "res%03d" % i, "partition": partition, "node_count": len(res_names),
+                                 "node_list": hostList(res_names),
+                                 "start_time": {"set": True, "infinite": False,
+                                                "number": 1700000000 if active else 1900000000},
+                                 "end_time": 1950000000})
+
+    for (kind,strs,docs) in (("node",node_strs,{"nodes": node_docs}),
+                             ("partition",partition_strs,{"partitions": partition_docs}),
+                             ("reservation",reservation_strs,{"reservations": reservation_docs})):
+        with open(os.path.join(path,kind+".txt"),"w") as f:
+            f.write("\n".join(strs))
+        with open(os.path.join(path,kind+".json"),"w") as f:
+            json.dump(docs,f)
+
+    scontrol = os.path.join(path,"scontrol")
+    with open(scontrol,"w") as f:
+        f.write('#!/bin/sh\nif [ "$1" = "--json" ]; then shift; cat %s/$2.json; exit 0; fi\ncat %s/$2.txt\n' % (path,path))
+    os.chmod(scontrol,0o755)
+    return scontrol
+
+def timeStep(scontrol, use_json, repeat):
+    step = slurm.ExecutionEnvironmentsStep()
+    step.params = {"scontrol": scontrol, "cache_ttl": 0}
+    step.resource_name = "bench.org"
+    best_read = best_aggregate = float("inf")
+    for i in range(repeat):
+        start = time.time()
+        if use_json:
+            environments = slurm._readEnvironmentsJson(step,execution_environment.ExecutionEnvironment)
+        else:
+            environments = step._readEnvironments()
+        read_time = time.time() - start
+
+        # aggregate the environments that were just read
+        step._readEnvironments = lambda: environments
+        start = time.time()
+        published = step._run()
+        aggregate_time = time.time() - start
+        del step._readEnvironments
+
+        best_read = min(best_read,read_time)
+        best_aggregate = min(best_aggregate,aggregate_time)
+    return (best_read,best_aggregate,len(published))
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    (options,args) = parser().parse_args()
+    path = tempfile.mkdtemp(prefix="ipf-bench-")
+    try:
+        scontrol = writeCluster(path,options.racks,options.reservations)
+        print("%d nodes, 6 partitions, %d reservations, best of %d" %
+              (options.racks*1000,options.reservations,options.repeat))
+        for (label,use_json) in (("text",False),("json",True)):
+            (read_time,aggregate_time,count) = timeStep(scontrol,use_json,options.repeat)
+            print("  %-4s read %7.1fms  aggregate %6.1fms  (%d environments)" %
+                  (label,read_time*1000,aggregate_time*1000,count))
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+# Times sending one ComputingActivities (50000 jobs by default) from a step to 3 consumer steps in process mode:
+# deep copying the data for each consumer and pickling each copy onto its queue (how Step._output used to work)
+# versus pickling it once into a SerializedData that every queue shares. The producing step and the consumers are
+# timed separately, since they are different processes. Memory is the peak traced while the producer queues the data.
+#
+#   $ python benchmarks/step_output.py [--jobs 50000] [--consumers 3]
+
+import copy
+import datetime
+import optparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+from ipf.data import SerializedData
+from ipf.dt import tzoffset
+from ipf.glue2.computing_activity import ComputingActivity, ComputingActivities
+
+#######################################################################################################################
+
+def parser():
+    parser = optparse.OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--jobs",type="int",default=50000,help="the number of jobs (default 50000)")
+    parser.add_option("--consumers",type="int",default=3,help="the number of consumer steps (default 3)")
+    return parser
+
+def activities(num_jobs):
+    now = datetime.datetime.now(tzoffset(0))
+    jobs = []
+    for i in range(num_jobs):
+        job = ComputingActivity()
+        job.ID = "urn:ogf:glue2:xsede.org:ComputingActivity:%d.bench.org" % i
+        job.LocalIDFromManager = str(1000000+i)
+        job.Name = "job%d" % i
+        job.LocalOwner = "user%d" % (i % 500)
+        job.Queue = "normal"
+        job.State = [ComputingActivity.STATE_RUNNING,"slurm:RUNNING"]
+        job.RequestedSlots = 48
+        job.RequestedTotalWallTime = 48*3600
+        job.SubmissionTime = now
+        job.StartTime = now
+        job.Extension["LocalAccount"] = "acct%d" % (i % 200)
+        job.Extension["Priority"] = i
+        jobs.append(job)
+    return ComputingActivities("bench.org",jobs)
+
+def copyEach(data, num_consumers):
+    return [pickle.dumps(copy.deepcopy(data),pickle.HIGHEST_PROTOCOL) for i in range(num_consumers)]
+
+def receiveCopy(item):
+    return pickle.loads(item)
+
+def serializeOnce(data, num_consumers):
+    serialized = SerializedData(data)
+    return [pickle.dumps(serialized,pickle.HIGHEST_PROTOCOL) for i in range(num_consumers)]
+
+def receiveSerialized(item):
+    return pickle.loads(item).get()
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    (options,args) = parser().parse_args()
+    data = activities(options.jobs)
+    print("%d jobs to %d consumers" % (options.jobs,options.consumers))
+    for (send,receive) in ((copyEach,receiveCopy),(serializeOnce,receiveSerialized)):
+        start = time.time()
+        queued = send(data,options.consumers)
+        send_time = time.time() - start
+        start = time.time()
+        receive(queued[0])
+        receive_time = time.time() - start
+        del queued
+        tracemalloc.start()
+        queued = send(data,options.consumers)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del queued
+        print("  %-13s producer %6.2fs  %5.0f MB peak traced memory  each consumer %5.2fs" %
+              (send.__name__,send_time,peak/1e6,receive_time))
@@ -15,6 +15,8 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
+import importlib
+import json
 import logging
 import logging.config
 import os
@@ -23,7 +25,7 @@ import traceback
 
 import ipf
 from ipf.data import Data,Representation
-from ipf.paths import IPF_ETC_PATH
+from ipf.paths import IPF_ETC_PATH, IPF_VAR_PATH
 from ipf.step import Step
 
 #######################################################################################################################
@@ -33,18 +35,93 @@ logger = logging.getLogger(__name__)
 #######################################################################################################################
 
 class Catalog(object):
-    def __init__(self):
-        self.steps = {}
+    """Finds the Steps, Data, and Representations that workflows can use.
 
-        self.data = {}             # class name -> [Data,]
-        self.representations = {}  # class name -> [Representation,]
+    Finding them means importing every module in the ipf package, so what is found can be saved to an index file
+    in IPF_VAR_PATH along with the modification times of those modules by rebuild(). When the index is current, a
+    module is only imported once a workflow uses something it defines. Nothing is read until the catalog is first
+    used, and the index is only written by rebuild(), so importing this module doesn't touch IPF_VAR_PATH.
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, index_path=None):
+        if index_path is None:
+            index_path = os.path.join(IPF_VAR_PATH,"catalog_index.json")
+        self.index_path = index_path
+        self.loaded = False
+
+    def __getattr__(self, name):
+        # steps, data, representations, producers, and reps_for_data are set when the catalog is first used
+        if name not in ("steps","data","representations","producers","reps_for_data") or self.loaded:
+            raise AttributeError(name)
+        index = self._readIndex()
+        if index is None:
+            logger.info("run 'python -m ipf.catalog' to save the catalog index so that it isn't built every run")
+            index = self._buildIndex()
+        self._setIndex(index)
+        return getattr(self,name)
+
+    def rebuild(self):
+        """Searches the ipf package again and saves the index."""
+        index = self._buildIndex()
+        self._writeIndex(index)
+        self._setIndex(index)
+
+    def _setIndex(self, index):
+        self.loaded = True
+        self.steps = _Classes(index["steps"])                      # class name -> Step
+        self.data = _Classes(index["data"])                        # class name -> Data
+        self.representations = _Classes(index["representations"])  # class name -> Representation
 
         # Data/Representation -> [Step]
-        self.producers = {}
+        self.producers = _ClassLists(index["producers"],self.steps)
 
         # Data -> [Representations]
-        self.reps_for_data = {}
+        self.reps_for_data = _ClassLists(index["reps_for_data"],self.representations)
+
+    def _readIndex(self):
+        try:
+            f = open(self.index_path,"r")
+            index = json.load(f)
+            f.close()
+        except IOError:
+            logger.debug("no catalog index at %s",self.index_path)
+            return None
+        except ValueError as e:
+            logger.warning("ignoring unreadable catalog index %s: %s",self.index_path,e)
+            return None
+        if index.get("version") != self.INDEX_VERSION or index.get("sources") != self._getSources():
+            logger.info("catalog index %s is out of date",self.index_path)
+            return None
+        return index
+
+    def _writeIndex(self, index):
+        try:
+            f = open(self.index_path+".new","w")
+            json.dump(index,f,sort_keys=True,indent=1)
+            f.close()
+            os.rename(self.index_path+".new",self.index_path)
+        except (IOError, OSError) as e:
+            logger.info("failed to write catalog index %s: %s",self.index_path,e)
+
+    def _getSources(self):
+        """The modification time of each Python file in the packages that are searched for classes."""
+        sources = {}
+        # in the future, let users add other packages
+        for package in [ipf]:
+            for package_path in package.__path__:
+                for (dir_path,dir_names,file_names) in os.walk(package_path):
+                    for file_name in file_names:
+                        if not file_name.endswith(".py"):
+                            continue
+                        path = os.path.join(dir_path,file_name)
+                        sources[os.path.relpath(path,package_path)] = os.stat(path).st_mtime
+        return sources
 
+    def _buildIndex(self):
+        logger.info("searching for steps, data, and representations")
+        sources = self._getSources()
         module_names = self._getModules()
 
         for module_name in module_names:
@@ -55,41 +132,48 @@ class Catalog(object):
                 logger.debug(traceback.format_exc())
                 pass  # ignore modules that can't be loaded
 
-        self._addSubclasses(Step,self.steps)
-        self._addSubclasses(Data,self.data)
-        self._addSubclasses(Representation,self.representations)
+        steps = {}
+        data = {}
+        representations = {}
+        self._addSubclasses(Step,steps)
+        self._addSubclasses(Data,data)
+        self._addSubclasses(Representation,representations)
 
-        for rep in list(self.representations.values()):
-            if rep.data_cls not in self.reps_for_data:
-                self.reps_for_data[rep.data_cls] = []
-            self.reps_for_data[rep.data_cls].append(rep)
-        for step_class in list(self.steps.values()):
+        reps_for_data = {}
+        for rep in list(representations.values()):
+            data_name = _className(rep.data_cls)
+            if data_name not in reps_for_data:
+                reps_for_data[data_name] = []
+            reps_for_data[data_name].append(_className(rep))
+        producers = {}
+        for step_class in list(steps.values()):
             step = step_class()
-            for data in step.produces:
+            step_name = _className(step_class)
+            for data_cls in step.produces:
+                data_name = _className(data_cls)
                 # add Data to producers
-                if not data in self.producers:
-                    self.producers[data] = []
-                self.producers[data].append(step_class)
+                if not data_name in producers:
+                    producers[data_name] = []
+                producers[data_name].append(step_name)
                 # add Representations of this Data to producers
-                try:
-                    for rep in self.reps_for_data[data]:
-                        if not rep in self.producers:
-                            self.producers[rep] = []
-                        self.producers[rep].append(step_class)
-                except KeyError:
-                    pass
-
-        #print("data:")
-        #for key in self.data:
-        #    print(key+": "+str(self.data[key]))
-
-        #print("representations:")
-        #for key in self.representations:
-        #    print(key+": "+str(self.representations[key]))
-
-        #print("producers:")
-        #for key in self.producers:
-        #    print(str(key)+": "+str(self.producers[key]))
+                for rep_name in reps_for_data.get(data_name,[]):
+                    if not rep_name in producers:
+                        producers[rep_name] = []
+                    producers[rep_name].append(step_name)
+
+        return {"version": self.INDEX_VERSION,
+                "sources": sources,
+                "steps": self._getModuleNames(steps),
+                "data": self._getModuleNames(data),
+                "representations": self._getModuleNames(representations),
+                "producers": producers,
+                "reps_for_data": reps_for_data}
+
+    def _getModuleNames(self, classes):
+        module_names = {}
+        for name in classes:
+            module_names[name] = classes[name].__module__
+        return module_names
 
     def _handleModuleError(self, module_name):
         logger.warn("failed to load module %s" % module_name)
@@ -148,4 +232,97 @@ class Catalog(object):
                 dict[cls_name] = cls
             stack.extend(cls.__subclasses__())
 
+#######################################################################################################################
+
+def _className(cls):
+    return cls.__module__+"."+cls.__name__
+
+class _Classes(object):
+    """A read-only dictionary of class name -> class that imports the module of a class when it is first used."""
+
+    def __init__(self, module_names):
+        self.module_names = module_names   # class name -> module name
+        self.classes = {}                  # class name -> class
+
+    def __getitem__(self, name):
+        try:
+            return self.classes[name]
+        except KeyError:
+            pass
+        module_name = self.module_names[name]
+        try:
+            module = importlib.import_module(module_name)
+            cls = getattr(module,name[len(module_name)+1:])
+        except Exception:
+            # the index is out of date or the module now fails to load
+            logger.warning("failed to load %s from module %s",name,module_name)
+            logger.debug(traceback.format_exc())
+            raise KeyError(name)
+        self.classes[name] = cls
+        return cls
+
+    def __contains__(self, name):
+        return name in self.module_names
+
+    def __iter__(self):
+        return iter(self.module_names)
+
+    def __len__(self):
+        return len(self.module_names)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.module_names.keys())
+
+    def values(self):
+        return [cls for (name,cls) in self.items()]
+
+    def items(self):
+        items = []
+        for name in self.module_names:
+            try:
+                items.append((name,self[name]))
+            except KeyError:
+                pass
+        return items
+
+class _ClassLists(object):
+    """A read-only dictionary of class -> list of related classes, loaded from the classes dictionary when used."""
+
+    def __init__(self, names, classes):
+        self.names = names       # class name -> [class name]
+        self.classes = classes   # a _Classes
+
+    def __getitem__(self, cls):
+        classes = []
+        for name in self.names[_className(cls)]:
+            try:
+                classes.append(self.classes[name])
+            except KeyError:
+                pass
+        return classes
+
+    def __contains__(self, cls):
+        return _className(cls) in self.names
+
+    def get(self, cls, default=None):
+        try:
+            return self[cls]
+        except KeyError:
+            return default
+
+#######################################################################################################################
+
 catalog = Catalog()
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    # (re)build the index - for example, after installing IPF or a dependency of one of its modules
+    from ipf.catalog import catalog as ipf_catalog   # the catalog other modules use, not the one in __main__
+    ipf_catalog.rebuild()
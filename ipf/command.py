@@ -0,0 +1,109 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import fcntl
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import time
+
+from ipf.error import StepError
+from ipf.paths import IPF_VAR_PATH
+
+#######################################################################################################################
+
+logger = logging.getLogger(__name__)
+
+#######################################################################################################################
+
+class CommandCache(object):
+    """Runs commands, sharing their output with steps that run the same commands at about the same time.
+
+    The output of each command is kept in a file in IPF_VAR_PATH/command_cache and reused for ttl seconds. Each
+    command has a lock file, so a step (in any process) that wants the output of a command that another step is
+    running waits for that output instead of running the command again. Commands that need to be run are run in
+    parallel.
+    """
+
+    def __init__(self, key, ttl, path=None):
+        self.key = key    # distinguishes the same command run for different resources
+        self.ttl = ttl
+        if path is None:
+            path = os.path.join(IPF_VAR_PATH,"command_cache")
+        self.path = path
+
+    def run(self, cmds):
+        """Returns a dictionary of command -> the name of a file containing its output.
+
+        Only stdout is kept, so that output such as JSON isn't mixed with warnings. Stderr is part of the error
+        raised when a command fails.
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(self.path,exist_ok=True)
+
+        locks = []
+        file_names = {}
+        procs = {}
+        try:
+            # always lock in the same order so that steps waiting on each other can't deadlock
+            for cmd in sorted(set(cmds)):
+                file_name = os.path.join(self.path,hashlib.sha1((self.key+"\n"+cmd).encode("utf-8")).hexdigest())
+                lock = open(file_name+".lock","w")
+                locks.append(lock)
+                fcntl.flock(lock,fcntl.LOCK_EX)
+                file_names[cmd] = file_name
+                if self._isCurrent(file_name):
+                    logger.debug("using cached output of %s",cmd)
+                    continue
+                logger.debug("running %s",cmd)
+                out = open(file_name+".new","w")
+                err = tempfile.TemporaryFile(mode="w+")
+                procs[cmd] = (subprocess.Popen(cmd,shell=True,stdout=out,stderr=err),out,err)
+
+            errors = []
+            for cmd in procs:
+                (proc,out,err) = procs[cmd]
+                status = proc.wait()
+                out.close()
+                err.seek(0)
+                err_output = err.read()
+                err.close()
+                if status != 0:
+                    errors.append("%s failed: %s" % (cmd,err_output))
+                    os.remove(file_names[cmd]+".new")
+                else:
+                    if err_output != "":
+                        logger.warning("%s printed to stderr: %s",cmd,err_output.rstrip())
+                    os.rename(file_names[cmd]+".new",file_names[cmd])
+            if len(errors) > 0:
+                raise StepError("\n".join(errors))
+        finally:
+            for lock in locks:
+                lock.close()   # releases the lock
+
+        return file_names
+
+    def _isCurrent(self, file_name):
+        if self.ttl <= 0:
+            return False
+        try:
+            return os.stat(file_name).st_mtime > time.time() - self.ttl
+        except OSError:
+            return False
+
+#######################################################################################################################
@@ -15,6 +15,8 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
+import json
+import pickle
 import sys
 
 from ipf.error import *
@@ -55,5 +57,82 @@ class Representation(object):
 
     def get(self):
         raise NotImplementedError()
-    
+
+    def getChunks(self, compact=False):
+        """Yields the representation in pieces so that large documents don't need to be held in memory.
+
+        Representations that support it write less white space when compact is True.
+        """
+        yield self.get()
+
+##############################################################################################################
+
+def jsonChunks(doc, compact=False, sort_keys=False, level=0, encoder=None):
+    """Yields doc as JSON text in pieces - the same text as json.dumps(doc,indent=4,sort_keys=sort_keys).
+
+    Any iterator in doc (e.g. a generator of activity documents) is written as a list one item at a time, without
+    building the list. Other values are converted all at once. Compact text has no indentation or extra spaces.
+    """
+    if compact:
+        (indent,separators,outer,inner) = (None,(",",":"),"","")
+    else:
+        (indent,separators) = (4,(",",": "))
+        outer = "\n" + " "*4*level
+        inner = outer + " "*4
+    if encoder is None:
+        encoder = json.JSONEncoder(indent=indent,separators=separators,sort_keys=sort_keys)
+    if not _hasIterator(doc):
+        text = encoder.encode(doc)
+        if level > 0 and not compact:
+            text = text.replace("\n",outer)    # newlines in strings are escaped, so these are all indentation
+        yield text
+        return
+    if isinstance(doc,dict):
+        keys = sorted(doc) if sort_keys else list(doc)
+        items = ((json.dumps(key)+separators[1],doc[key]) for key in keys)
+        (start,end) = ("{","}")
+    else:
+        items = (("",value) for value in doc)
+        (start,end) = ("[","]")
+    first = True
+    for (prefix,value) in items:
+        if first:
+            yield start+inner+prefix
+            first = False
+        else:
+            yield separators[0]+inner+prefix
+        for chunk in jsonChunks(value,compact,sort_keys,level+1,encoder):
+            yield chunk
+    if first:
+        yield start+end
+    else:
+        yield outer+end
+
+def _hasIterator(doc):
+    # at any depth
+    if isinstance(doc,dict):
+        doc = doc.values()
+    elif not isinstance(doc,(list,tuple)):
+        return hasattr(doc,"__next__")
+    for value in doc:
+        if isinstance(value,_scalar_types):
+            continue
+        if _hasIterator(value):
+            return True
+    return False
+
+_scalar_types = (str,int,float,type(None))
+
+
+##############################################################################################################
+
+class SerializedData(object):
+    """Data pickled once so that it can be sent to several steps without copying it for each of them."""
+
+    def __init__(self, data):
+        self.bytes = pickle.dumps(data,pickle.HIGHEST_PROTOCOL)
+
+    def get(self):
+        return pickle.loads(self.bytes)
+
 ##############################################################################################################
@@ -44,16 +44,101 @@ class localtzoffset(datetime.tzinfo):
             return datetime.timedelta(0)
 
     def _isdst(self, dt):
+        # daylight saving time starts and ends on the hour, so remember whether it is in effect for each hour
+        key = (dt.year, dt.month, dt.day, dt.hour)
+        try:
+            return _isdst_cache[key]
+        except KeyError:
+            pass
         tt = (dt.year, dt.month, dt.day,
               dt.hour, dt.minute, dt.second,
               dt.weekday(), 0, -1)
         epoch = time.mktime(tt)
         tt = time.localtime(epoch)
-        return tt.tm_isdst > 0
+        if len(_isdst_cache) >= 10000:
+            _isdst_cache.clear()
+        _isdst_cache[key] = tt.tm_isdst > 0
+        return _isdst_cache[key]
 
     def tzname(self, dt):
         return time.tzname
 
+_isdst_cache = {}
+
+_utc = tzoffset(0)
+
+#######################################################################################################################
+
+class TimestampParser(object):
+    """Converts timestamp strings to datetimes with a parse function, remembering recent results.
+
+    Log lines written at about the same time have the same timestamps, so most strings have been converted before.
+    The parse function should return None for a string it can't convert.
+    """
+
+    def __init__(self, parse, size=4096):
+        self._parse = parse
+        self.size = size
+        self.cache = {}
+
+    def parse(self, text):
+        try:
+            return self.cache[text]
+        except KeyError:
+            pass
+        dt = self._parse(text)
+        if len(self.cache) >= self.size:
+            self.cache.clear()
+        self.cache[text] = dt
+        return dt
+
+def isoTextToDateTime(text, tz):
+    """Converts YYYY-MM-DDTHH:MM:SS, optionally followed by fractional seconds, to a datetime in tz.
+
+    Returns None if the text isn't in that form.
+    """
+    if len(text) < 19 or text[4] != "-" or text[7] != "-" or text[10] not in "T " or text[13] != ":" or \
+       text[16] != ":":
+        return None
+    try:
+        microsecond = 0
+        if len(text) > 19:
+            if text[19] != "." or not text[20:].isdigit():
+                return None
+            microsecond = int((text[20:]+"00000")[:6])
+        return datetime.datetime(int(text[0:4]),int(text[5:7]),int(text[8:10]),
+                                 int(text[11:13]),int(text[14:16]),int(text[17:19]),microsecond,tz)
+    except ValueError:
+        return None
+
+def mdyTextToDateTime(text, tz):
+    """Converts MM/DD/YYYY HH:MM:SS (fields need not be padded) to a datetime in tz.
+
+    Returns None if the text isn't in that form.
+    """
+    try:
+        (date,time_str) = text.split(" ")
+        (month,day,year) = date.split("/")
+        (hour,minute,second) = time_str.split(":")
+        return datetime.datetime(int(year),int(month),int(day),int(hour),int(minute),int(second),0,tz)
+    except ValueError:
+        return None
+
+_months = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+           "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+
+def ctimeTextToDateTime(text, tz):
+    """Converts a ctime() style time like 'Fri May 30 06:54:25 2008' to a datetime in tz.
+
+    Returns None if the text isn't in that form.
+    """
+    try:
+        (weekday,month,day,time_str,year) = text.split()
+        (hour,minute,second) = time_str.split(":")
+        return datetime.datetime(int(year),_months[month],int(day),int(hour),int(minute),int(second),0,tz)
+    except (ValueError, KeyError):
+        return None
+
 #######################################################################################################################
 
 def epochToDateTime(epoch, tz=tzoffset(0)):
@@ -83,6 +168,10 @@ def textToEpoch(text):
 def textToDateTime(text):
     if text is None:
         return None
+    if len(text) == 20 and text[19] == "Z":
+        dt = isoTextToDateTime(text[:19],_utc)
+        if dt is not None:
+            return dt
     return datetime.datetime.strptime(text,"%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=tzoffset(0))
 
 def dateTimeToEpoch(dt):
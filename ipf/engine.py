@@ -18,8 +18,12 @@
 import copy
 import json
 import logging
+import multiprocessing
+import multiprocessing.connection
 import os
+import queue
 import sys
+import threading
 import time
 import traceback
 
@@ -36,10 +40,24 @@ logger = logging.getLogger(__name__)
 #######################################################################################################################
 
 class WorkflowEngine(object):
-    def __init__(self):
-        pass
-        
+
+    MODE_PROCESS = "process"   # each step runs in its own OS process
+    MODE_THREAD = "thread"     # each step runs in a thread of the engine process
+    MODE_INLINE = "inline"     # steps run one after another in the engine thread
+
+    MODES = (MODE_PROCESS,MODE_THREAD,MODE_INLINE)
+
+    def __init__(self, mode=None, resident=False):
+        if mode is not None and mode not in self.MODES:
+            raise WorkflowError("unknown engine mode '%s' - expected one of %s" % (mode,", ".join(self.MODES)))
+        self.mode = mode   # overrides the engine_mode specified in the workflow, if any
+        # a resident engine loads a workflow once and then executes the same steps again and again
+        self.resident = resident
+
     def run(self, workflow_file_name):
+        self.execute(self.load(workflow_file_name))
+
+    def load(self, workflow_file_name):
         workflow = Workflow()
         if os.path.isabs(workflow_file_name):
             workflow.read(workflow_file_name)
@@ -54,62 +72,269 @@ class WorkflowEngine(object):
                                     workflow_file_name)
 
         self._setDependencies(workflow)
+        for step in workflow.steps:
+            step.resident = self.resident
         logger.debug(workflow)
+        return workflow
+
+    def execute(self, workflow):
+        mode = self._getMode(workflow)
+        if self.resident:
+            for step in workflow.steps:
+                if hasattr(step,"runner") and step.runner.is_alive():
+                    logger.error("step %s from the previous run of workflow %s is still running - not starting it again",
+                                 step.id,workflow.name)
+                    return
+            for step in workflow.steps:
+                step.reset()
+
+        logger.info("starting workflow %s (%s mode)",workflow.name,mode)
+        if mode == self.MODE_INLINE:
+            self._runInline(workflow)
+        else:
+            self._runConcurrent(workflow,mode)
+
+        if reduce(lambda b1,b2: b1 and b2, [step.runner.exitcode == 0 for step in workflow.steps]):
+            logger.info("workflow succeeded")
+        else:
+            logger.error("workflow failed")
+            for step in workflow.steps:
+                if step.runner.exitcode == 0:
+                    logger.info("  %10s succeeded (%s)",step.id,step.__class__.__name__)
+                else:
+                    logger.error(" %10s failed    (%s)",step.id,step.__class__.__name__)
+
+    def _getMode(self, workflow):
+        if self.mode is not None:
+            mode = self.mode
+        elif workflow.engine_mode is None:
+            mode = self.MODE_PROCESS
+        elif workflow.engine_mode not in self.MODES:
+            raise WorkflowError("workflow %s specifies unknown engine_mode '%s' - expected one of %s" % \
+                                (workflow.name,workflow.engine_mode,", ".join(self.MODES)))
+        else:
+            mode = workflow.engine_mode
+        if self.resident and mode == self.MODE_PROCESS:
+            # a process can only be started once, so resident steps run in threads
+            mode = self.MODE_THREAD
+        return mode
+
+    def _runConcurrent(self, workflow, mode):
+        finished = queue.Queue()   # thread runners put their step here when it exits
+        for step in workflow.steps:
+            if mode == self.MODE_THREAD:
+                step.runner = ThreadStepRunner(step,finished)
+            else:
+                step.runner = ProcessStepRunner(step)
 
-        logger.info("starting workflow %s",workflow.name)
         for step in workflow.steps:
             try:
-                step.start()
-            except OSError as e:
-                logger.error("failed to start step: %d (%s)\n" % (e.errno, e.strerror))
+                step.runner.start()
+            except (OSError, RuntimeError) as e:
+                logger.error("failed to start step %s: %s" % (step.id,e))
                 logger.warn("aborting workflow")
                 for step in workflow.steps:
-                    if step.is_alive():
-                        step.terminate()
+                    if step.runner.is_alive():
+                        step.runner.terminate()
                 return
 
         start_time = time.time()
-        steps_with_inputs = list(filter(self._sendNoMoreInputs,workflow.steps))
-        while self._anyAlive(workflow.steps):
-            if workflow.timeout is not None and time.time() - start_time > workflow.timeout:
-                logger.warn("time out, terminating workflow")
-                for step in workflow.steps:
-                    if step.is_alive():
-                        step.terminate()
-                break
-            time.sleep(0.1)
-            steps_with_inputs = list(filter(self._sendNoMoreInputs,steps_with_inputs))
+        for step in workflow.steps:
+            step.running_producers = len(step.depends_on)
+            if step.running_producers == 0:
+                self._sendNoMoreInputs(step)
+
+        running = set(workflow.steps)
+        while len(running) > 0:
+            timeout = None
+            if workflow.timeout is not None:
+                timeout = start_time + workflow.timeout - time.time()
+                if timeout <= 0:
+                    logger.warn("time out, terminating workflow")
+                    for step in running:
+                        step.runner.terminate()
+                    break
+            for step in self._waitForSteps(mode,running,finished,timeout):
+                running.discard(step)
+                logger.debug("step %s exited",step.id)
+                # send end of input to a consumer exactly when its last producer exits
+                for dstep in step.dependents:
+                    dstep.running_producers -= 1
+                    if dstep.running_producers == 0:
+                        self._sendNoMoreInputs(dstep)
 
         for step in workflow.steps:
-            step.join()
+            step.runner.join()
 
-        if reduce(lambda b1,b2: b1 and b2, [step.exitcode == 0 for step in workflow.steps]):
-            logger.info("workflow succeeded")
-        else:
-            logger.error("workflow failed")
-            for step in workflow.steps:
-                if step.exitcode == 0:
-                    logger.info("  %10s succeeded (%s)",step.id,step.__class__.__name__)
-                else:
-                    logger.error(" %10s failed    (%s)",step.id,step.__class__.__name__)
-                    
-    def _anyAlive(self, steps):
-        return reduce(lambda b1,b2: b1 or b2, [step.is_alive() for step in steps], False)
+    def _waitForSteps(self, mode, running, finished, timeout):
+        """Block until at least one running step exits or the timeout passes and return the steps that exited."""
+        if mode == self.MODE_THREAD:
+            done = []
+            try:
+                done.append(finished.get(True,timeout))
+                while True:
+                    done.append(finished.get_nowait())
+            except queue.Empty:
+                pass
+            return done
+        sentinels = {}
+        for step in running:
+            sentinels[step.runner.sentinel] = step
+        return [sentinels[sentinel] for sentinel in multiprocessing.connection.wait(list(sentinels),timeout)]
+
+    def _runInline(self, workflow):
+        """Run each step to completion before its consumers - only for workflows whose steps all finish."""
+        steps = self._orderSteps(workflow)
+        for step in steps:
+            step.runner = InlineStepRunner(step)
+
+        start_time = time.time()
+        for step in steps:
+            if workflow.timeout is not None and time.time() - start_time > workflow.timeout:
+                logger.warn("time out, not running step %s or any later steps",step.id)
+                break
+            # every producer of this step has already finished
+            step.input_queue.put(None)
+            step.runner.start()
+
+    def _orderSteps(self, workflow):
+        ordered = []
+        done = set()
+        remaining = list(workflow.steps)
+        while len(remaining) > 0:
+            ready = [step for step in remaining if all([dstep in done for dstep in step.depends_on])]
+            if len(ready) == 0:
+                raise WorkflowError("steps %s depend on each other - can't run workflow in %s mode" % \
+                                    (", ".join([step.id for step in remaining]),self.MODE_INLINE))
+            for step in ready:
+                ordered.append(step)
+                done.add(step)
+                remaining.remove(step)
+        return ordered
 
     def _sendNoMoreInputs(self, step):
-        if self._anyAlive(step.depends_on):
-            return True
         logger.debug("no more inputs to step %s",step.id)
         step.input_queue.put(None) # send None to indicate no more inputs
-        step.input_queue.close()   # close the queue to stop the background thread
-        return False
-    
+        step.runner.closeInput()
+
     def _setDependencies(self, workflow):
         for step in workflow.steps:
-            step.depends_on = []  # [step, ...]
+            step.depends_on = []  # [step, ...] - the steps that send data to this step
+            step.dependents = []  # [step, ...] - the steps this step sends data to
         for step in workflow.steps:
             for type in step.outputs:
                 for dstep in step.outputs[type]:
-                    dstep.depends_on.append(step)
+                    if dstep not in step.dependents:
+                        step.dependents.append(dstep)
+                        dstep.depends_on.append(step)
+
+#######################################################################################################################
+
+def _runStep(step):
+    """Run a step in the current thread and return an exit code like the one a step process would have."""
+    try:
+        step.run()
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code,int):
+            return e.code
+        return 1
+    except Exception:
+        logger.error("step %s failed:\n%s",step.id,traceback.format_exc())
+        return 1
+    return 0
+
+class ProcessStepRunner(object):
+    """Runs a step in its own process."""
+
+    def __init__(self, step):
+        self.step = step
+
+    @property
+    def exitcode(self):
+        return self.step.exitcode
+
+    @property
+    def sentinel(self):
+        return self.step.sentinel
+
+    def start(self):
+        self.step.start()
+
+    def is_alive(self):
+        return self.step.is_alive()
+
+    def join(self, timeout=None):
+        self.step.join(timeout)
+
+    def terminate(self):
+        self.step.terminate()
+
+    def closeInput(self):
+        self.step.input_queue.close()   # close the queue to stop the background thread
+
+class ThreadStepRunner(object):
+    """Runs a step in a thread of the engine process, passing data through in-memory queues."""
+
+    def __init__(self, step, finished):
+        self.step = step
+        self.finished = finished
+        self.exitcode = None
+        self.abandoned = False
+        step.input_queue = queue.Queue()
+        step.local_input_queue = True
+        # daemon so that a step that times out doesn't keep the engine process from exiting
+        self.thread = threading.Thread(target=self._run,name=step.id)
+        self.thread.daemon = True
+
+    def _run(self):
+        try:
+            self.exitcode = _runStep(self.step)
+        finally:
+            self.finished.put(self.step)
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def join(self, timeout=None):
+        if self.abandoned:
+            # a terminated thread keeps running, so don't wait on it
+            return
+        self.thread.join(timeout)
+
+    def terminate(self):
+        logger.warning("can't terminate step %s running in a thread - abandoning it",self.step.id)
+        self.abandoned = True
+
+    def closeInput(self):
+        pass
+
+class InlineStepRunner(object):
+    """Runs a step to completion in the engine thread when it is started."""
+
+    def __init__(self, step):
+        self.step = step
+        self.exitcode = None
+        step.input_queue = queue.Queue()
+        step.local_input_queue = True
+
+    def start(self):
+        self.exitcode = _runStep(self.step)
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        pass
+
+    def closeInput(self):
+        pass
 
 #######################################################################################################################
@@ -19,7 +19,7 @@ import json
 import os
 from xml.dom.minidom import getDOMImplementation
 
-from ipf.data import Data, Representation
+from ipf.data import Data, Representation, jsonChunks
 from ipf.dt import *
 from ipf.error import NoMoreInputsError, StepError
 from ipf.sysinfo import ResourceName
@@ -316,7 +316,17 @@ class PrivateOgfJson(Representation):
             self, Representation.MIME_APPLICATION_JSON, data)
 
     def get(self):
-        return json.dumps(self.toJson(), indent=4)
+        return "".join(self.getChunks())
+
+    def getChunks(self, compact=False):
+        doc = {}
+        if len(self.data.activity) > 0:
+            # converted one activity at a time as the text is written
+            doc["ComputingActivity"] = (ComputingActivityOgfJson(
+                activity).toJson() for activity in self.data.activity)
+        doc["PublisherInfo"] = [IPFInformationJson(
+            ipfinfo).toJson() for ipfinfo in self.data.ipfinfo]
+        return jsonChunks(doc, compact)
 
     def toJson(self):
         doc = {}
@@ -15,14 +15,27 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
+import bz2
+import collections
+import copy
+import glob
+import gzip
+import hashlib
 import json
+import logging
+import lzma
+import multiprocessing
 import os
+import pickle
+import threading
 import time
+import traceback
 from xml.dom.minidom import getDOMImplementation
 
-from ipf.data import Data, Representation
+from ipf.data import Data, Representation, jsonChunks
 from ipf.dt import *
 from ipf.error import StepError
+from ipf.log import PositionDB
 from ipf.paths import IPF_VAR_PATH
 from ipf.sysinfo import ResourceName
 
@@ -31,6 +44,17 @@ from .step import GlueStep
 
 #######################################################################################################################
 
+logger = logging.getLogger(__name__)
+
+# the published attributes of a ComputingActivity that can change from one run to the next, for the delta
+_delta_attribs = ("Name","OtherInfo","ShareID","State","RestartState","ExitCode","ComputingManagerExitCode","Error",
+                  "WaitingPosition","LocalOwner","RequestedTotalWallTime","RequestedTotalCPUTime","RequestedSlots",
+                  "RequestedApplicationEnvironment","ExecutionNode","Queue","UsedTotalWallTime","UsedTotalCPUTime",
+                  "UsedMainMemory","SubmissionTime","ComputingManagerSubmissionTime","StartTime",
+                  "ComputingManagerEndTime","EndTime","WorkingAreaEraseTime","ProxyExpirationTime","OtherMessages")
+
+#######################################################################################################################
+
 class ComputingActivitiesStep(GlueStep):
     def __init__(self):
         GlueStep.__init__(self)
@@ -45,8 +69,18 @@ class ComputingActivitiesStep(GlueStep):
         self._acceptParameter("queues",
                               "An expression describing the queues to include (optional). The syntax is a series of +<queue> and -<queue> where <queue> is either a queue name or a '*'. '+' means include '-' means exclude. the expression is processed in order and the value for a queue at the end determines if it is shown.",
                               False)
+        self._acceptParameter("delta",
+                              "compare the activities to those of the previous run so that ComputingActivitiesDeltaOgfJson can publish only the changes (default false)",
+                              False)
+        self._acceptParameter("delta_file",
+                              "the file to store the activities of the previous run in - relative to IPF_VAR_PATH (default activities_<resource name>.json). Not used when the workflow is resident, since the activities are then kept in memory.",
+                              False)
+        self._acceptParameter("full_interval",
+                              "the minimum number of seconds between publishing all activities instead of the changes (default 3600)",
+                              False)
 
         self.resource_name = None
+        self.snapshot = None   # the activities of the previous run, when resident
         
     def run(self):
         self.resource_name = self._getInput(ResourceName).resource_name
@@ -62,11 +96,88 @@ class ComputingActivitiesStep(GlueStep):
                 activity.ShareID = "urn:ogf:glue2:xsede.org:ComputingShare:%s.%s" % (activity.Queue,self.resource_name)
             activity.hide = self.params.get("hide_job_attribs",[])
 
-        self._output(ComputingActivities(self.resource_name,activities))
+        data = ComputingActivities(self.resource_name,activities)
+        if not self.params.get("delta",False):
+            self._output(data)
+            return
+        (data.delta,snapshot) = self._getDelta(activities)
+        self._output(data)
+        # only once the delta has been handed off, so that a failed run is compared against again next run
+        self._writeSnapshot(snapshot)
 
     def _run(self):
         raise StepError("ComputingActivitiesStep._run not overriden")
 
+    def _getDelta(self, activities):
+        """Returns the delta from the previous run and the snapshot to save for the next run."""
+        previous = self._readSnapshot()
+
+        current = {}   # LocalIDFromManager -> [ID, digest of the attributes that can change]
+        for activity in activities:
+            current[activity.LocalIDFromManager] = [activity.ID,self._getDigest(activity)]
+
+        now = time.time()
+        if previous is None:
+            delta = ComputingActivitiesDelta(0,True,activities)
+            full_time = now
+        else:
+            sequence = previous["sequence"] + 1
+            if now - previous["full_time"] >= self.params.get("full_interval",3600):
+                delta = ComputingActivitiesDelta(sequence,True,activities)
+                full_time = now
+            else:
+                delta = ComputingActivitiesDelta(sequence,False)
+                full_time = previous["full_time"]
+                prev_activities = previous["activities"]
+                for activity in activities:
+                    if activity.LocalIDFromManager not in prev_activities:
+                        delta.added.append(activity)
+                    elif prev_activities[activity.LocalIDFromManager][1] != current[activity.LocalIDFromManager][1]:
+                        delta.changed.append(activity)
+                for local_id in prev_activities:
+                    if local_id not in current:
+                        delta.removed.append(prev_activities[local_id][0])
+        self.debug("delta %d: %d added, %d changed, %d removed",
+                   delta.sequence,len(delta.added),len(delta.changed),len(delta.removed))
+
+        return (delta,{"sequence": delta.sequence, "full_time": full_time, "activities": current})
+
+    def _getDigest(self, activity):
+        # str() of a datetime doesn't include the id of its tzinfo object like repr() does
+        values = [str(getattr(activity,name)) for name in _delta_attribs if name not in activity.hide]
+        values.append(str(sorted(activity.Extension.items())))
+        return hashlib.md5("\x1f".join(values).encode("utf-8")).hexdigest()
+
+    def _getSnapshotFile(self):
+        return os.path.join(IPF_VAR_PATH,self.params.get("delta_file","activities_%s.json" % self.resource_name))
+
+    def _readSnapshot(self):
+        if self.resident:
+            return self.snapshot
+        try:
+            f = open(self._getSnapshotFile(),"r")
+            snapshot = json.load(f)
+            f.close()
+            return snapshot
+        except IOError:
+            return None
+        except ValueError:
+            self.warning("ignoring unreadable delta file %s",self._getSnapshotFile())
+            return None
+
+    def _writeSnapshot(self, snapshot):
+        if self.resident:
+            self.snapshot = snapshot
+            return
+        file_name = self._getSnapshotFile()
+        try:
+            f = open(file_name+".new","w")
+            json.dump(snapshot,f)
+            f.close()
+            os.rename(file_name+".new",file_name)
+        except (IOError, OSError) as e:
+            self.warning("failed to write delta file %s: %s",file_name,e)
+
     def _jobStateKey(self, job):
         # assumes the IPF state is the first one
         if job.State[0] == ComputingActivity.STATE_RUNNING:
@@ -105,6 +216,15 @@ class ComputingActivityUpdateStep(GlueStep):
         self.produces = [ComputingActivity]
 
         self._acceptParameter("position_file","the file to store the read position into the log file - relative to IPF_VAR_PATH (default none)",False)
+        self._acceptParameter("position_checkpoint_lines","the number of log lines to read before writing the position file (default 1)",False)
+        self._acceptParameter("position_checkpoint_interval","the number of seconds after which a changed position is written to the position file (default none)",False)
+
+        self._acceptParameter("coalesce_updates","only publish the last update to each job in a batch of log lines (default false)",False)
+        self._acceptParameter("activity_cache_size","the maximum number of jobs to remember information about (default 100000)",False)
+        self._acceptParameter("activity_cache_age","the number of seconds after which to forget about a job that hasn't been updated (default 2592000 - 30 days)",False)
+        self._acceptParameter("lookup_window","the number of seconds to collect new jobs before querying the scheduler about them together in the background (default 0 - query each new job immediately)",False)
+        self._acceptParameter("replay_files","a list of log files (glob patterns) to read completely before following the log - for example, rotated logs after an outage. Files ending in .gz, .bz2, or .xz are decompressed. With a position_file, they are only replayed once. (optional)",False)
+        self._acceptParameter("replay_processes","the number of processes to search replayed log files with (default the number of CPUs)",False)
 
         self._acceptParameter("hide_job_attribs",
                               "a comma-separated list of ComputingActivity attributes to hide (optional)",
@@ -115,6 +235,9 @@ class ComputingActivityUpdateStep(GlueStep):
 
 
         self.resource_name = None
+        self.activities = ActivityCache()    # job id -> ComputingActivity
+        self.pending = None    # activities to output at the end of a batch, by job id, when coalescing updates
+        self.lookup = None
         
     def run(self):
         self.resource_name = self._getInput(ResourceName).resource_name
@@ -123,10 +246,27 @@ class ComputingActivityUpdateStep(GlueStep):
             self.position_file = os.path.join(IPF_VAR_PATH,self.params["position_file"])
         except KeyError:
             self.position_file = None
-        
+        self.checkpoint_lines = self.params.get("position_checkpoint_lines",1)
+        self.checkpoint_interval = self.params.get("position_checkpoint_interval",None)
+        self.activities = ActivityCache(self.params.get("activity_cache_size",100000),
+                                        self.params.get("activity_cache_age",30*24*60*60))
+        if self.params.get("lookup_window",0) > 0:
+            self.lookup = ActivityLookup(self,self.params["lookup_window"])
+
+        if "replay_files" in self.params:
+            self._replay()
+
         self._run()
 
     def output(self, activity):
+        if isinstance(activity,_PendingActivity):
+            # published once the scheduler has been queried about it
+            activity.__dict__["output_requested"] = True
+            return
+        if self.lookup is not None and activity is self.lookup.finishing:
+            # a deferred update of a job that was just queried - published once all of its updates are made
+            self.lookup.finishing_output = True
+            return
         if activity.LocalOwner is None:
             activity.id = "%s.unknown.%s" % (activity.LocalIDFromManager,self.resource_name)
         else:
@@ -135,14 +275,298 @@ class ComputingActivityUpdateStep(GlueStep):
         if activity.Queue is not None:
             activity.ShareID = "urn:ogf:glue2:xsede.org:ComputingShare:%s.%s" % (activity.Queue,self.resource_name)
         activity.hide = self.params.get("hide_job_attribs",[])
-        
+
+        if self.pending is not None:
+            # publish the state of the activity at the end of the batch - output order is that of the last updates
+            self.pending.pop(activity.LocalIDFromManager,None)
+            self.pending[activity.LocalIDFromManager] = activity
+            return
         self._output(activity)
 
+    def _logEntries(self, log_file_name, entries):
+        """Handles a batch of log lines that were read at the same time."""
+        if self.lookup is None:
+            self._handleEntries(log_file_name,entries)
+        else:
+            with self.lookup.lock:    # lookups are finished between batches
+                self._handleEntries(log_file_name,entries)
+
+    def _handleEntries(self, log_file_name, entries):
+        if not self.params.get("coalesce_updates",False):
+            for entry in entries:
+                self._logEntry(log_file_name,entry)
+            return
+        self.pending = {}
+        try:
+            for entry in entries:
+                self._logEntry(log_file_name,entry)
+        finally:
+            pending = self.pending
+            self.pending = None
+            for activity in pending.values():
+                self._output(activity)
+        self.debug("published %d jobs for %d log lines",len(pending),len(entries))
+
+    def _logEntry(self, log_file_name, entry):
+        raise StepError("ComputingActivityUpdateStep._logEntry not overriden")
+
+    def _findActivity(self, id):
+        """Returns the activity of a known job, which may be waiting on a lookup. Raises KeyError for other jobs."""
+        if self.lookup is not None and id in self.lookup.waiting:
+            return self.lookup.waiting[id]
+        return self.activities[id]
+
+    def _whenKnown(self, activity, names, func):
+        """Calls func(activity) now, or once the scheduler has been queried if activity is a placeholder that doesn't
+        know all of the attributes in names yet.
+
+        A log handler that decides what to do from the current state (or other attributes) of a job uses this so
+        that, for a job that hasn't been queried yet, the decision is made from what the scheduler reports.
+        """
+        if isinstance(activity,_PendingActivity) and not activity.knows(names):
+            activity.defer(func)
+        else:
+            func(activity)
+
+    def _includeActivity(self, activity, no_queue_name_return=False):
+        if isinstance(activity,_PendingActivity):
+            # the queue isn't known yet - it is checked once the scheduler has been queried
+            activity.__dict__["no_queue_name_return"] = no_queue_name_return
+            return True
+        return self._includeQueue(activity.Queue,no_queue_name_return)
+
+    def _queryActivities(self, ids):
+        """Queries the scheduler about jobs and returns a dictionary of job id -> ComputingActivity."""
+        raise StepError("ComputingActivityUpdateStep._queryActivities not overriden")
+
+    def _logFilter(self):
+        """Returns an object whose match(line) returns None for log lines that _logEntry ignores, or None.
+
+        The object is sent to other processes to search replayed log files in parallel.
+        """
+        return None
+
+    def _replay(self):
+        """Reads the replay_files, oldest first, and publishes the last state of each job that they mention.
+
+        Once a replay completes, it is recorded in the position file so that the same replay_files aren't replayed
+        again when the workflow restarts.
+        """
+        patterns = self.params["replay_files"]
+        if isinstance(patterns,str):
+            patterns = [patterns]
+        replay_id = "%sreplay-%s" % (PositionDB.RECORD_PREFIX,
+                                     hashlib.md5(json.dumps(sorted(patterns)).encode("utf-8")).hexdigest())
+        pos_db = None
+        if self.position_file is not None:
+            pos_db = PositionDB(self.position_file)
+            if pos_db.get(replay_id) is not None:
+                self.info("the replay_files were replayed at %s - not replaying them again",
+                          time.strftime("%Y-%m-%dT%H:%M:%S",time.localtime(pos_db.get(replay_id))))
+                return
+        paths = set()
+        for pattern in patterns:
+            paths.update(glob.glob(pattern))
+        paths = sorted(paths,key=lambda path: os.stat(path).st_mtime)
+        self.info("replaying %d log files",len(paths))
+        start_time = time.time()
+
+        # query the scheduler about all of the jobs at the end instead of one at a time
+        original_lookup = self.lookup
+        lookup = self.lookup
+        if lookup is None:
+            lookup = ActivityLookup(self,0)
+            self.lookup = lookup
+        self.pending = {}
+        lookup.replaying = True
+        lines = 0
+        try:
+            with lookup.lock:
+                for (path,entries) in self._replayEntries(paths):
+                    lines += len(entries)
+                    for entry in entries:
+                        self._logEntry(path,entry)
+                pending = self.pending
+                self.pending = None
+                jobs = len(pending) + len(lookup.waiting)
+            for activity in pending.values():
+                self._output(activity)
+            # the other jobs are published as the scheduler is queried about them
+            while True:
+                with lookup.lock:
+                    if len(lookup.waiting) == 0:
+                        break
+                if not lookup.thread.is_alive():
+                    raise StepError("the lookup of %d replayed jobs failed" % len(lookup.waiting))
+                time.sleep(0.1)
+        finally:
+            lookup.replaying = False
+            if lookup is not original_lookup:
+                lookup.stop()
+            self.lookup = original_lookup
+            self.pending = None
+        self.info("replayed %d log lines about %d jobs in %.1f seconds",lines,jobs,time.time()-start_time)
+        if pos_db is not None:
+            pos_db.set(replay_id,int(time.time()))
+
+    def _replayEntries(self, paths):
+        """Yields (path, lines) for the lines in the files that _logEntry may be interested in, in order."""
+        log_filter = self._logFilter()
+        if log_filter is None:
+            for path in paths:
+                for chunk in _readChunks(path):
+                    yield (path,_splitLines(chunk))
+            return
+        processes = self.params.get("replay_processes",os.cpu_count() or 1)
+        pool = multiprocessing.Pool(processes)
+        try:
+            # search chunks in parallel, but only read a few chunks ahead
+            results = collections.deque()
+            for path in paths:
+                for chunk in _readChunks(path):
+                    results.append((path,pool.apply_async(_filterLines,(log_filter,chunk))))
+                    if len(results) > 2*processes:
+                        (result_path,result) = results.popleft()
+                        yield (result_path,result.get())
+            while len(results) > 0:
+                (result_path,result) = results.popleft()
+                yield (result_path,result.get())
+        finally:
+            pool.terminate()
+
     def _run(self):
         raise StepError("ComputingActivityUpdateStep._run not overriden")
 
 #######################################################################################################################
 
+def _readChunks(path, size=16*1024*1024):
+    """Yields about size bytes of a (possibly compressed) log file at a time, split after a newline."""
+    opener = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}.get(os.path.splitext(path)[1],open)
+    f = opener(path,"rb")
+    try:
+        while True:
+            chunk = f.read(size)
+            if len(chunk) == 0:
+                break
+            if not chunk.endswith(b"\n"):
+                chunk += f.readline()
+            yield chunk
+    finally:
+        f.close()
+
+def _splitLines(chunk):
+    lines = chunk.decode("utf-8","replace").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line+"\n" for line in lines]
+
+def _filterLines(log_filter, chunk):
+    # runs in a pool process
+    return [line for line in _splitLines(chunk) if log_filter.match(line) is not None]
+
+#######################################################################################################################
+
+class ActivityCache(object):
+    """A bounded map of job id to the activity that an update step last published for that job.
+
+    Update steps forget about a job when they see it end, but jobs whose end is missed would otherwise be remembered
+    forever. The least recently used jobs are forgotten once there are more than max_size of them, as are jobs that
+    haven't been used in max_age seconds. The hot_size most recently used activities are kept as objects that can be
+    changed in place and the rest are kept as compact records of how they differ from a new activity.
+    """
+
+    def __init__(self, max_size=100000, max_age=30*24*60*60, hot_size=1000):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hot_size = hot_size
+        self.hot = collections.OrderedDict()    # id -> (last use, activity), least recently used first
+        self.cold = collections.OrderedDict()   # id -> (last use, (class, record)), least recently used first
+        self.evicted_size = 0
+        self.evicted_age = 0
+        self.last_report = time.time()
+
+    def __len__(self):
+        return len(self.hot) + len(self.cold)
+
+    def __contains__(self, id):
+        return id in self.hot or id in self.cold
+
+    def __getitem__(self, id):
+        try:
+            (last_use,activity) = self.hot.pop(id)
+        except KeyError:
+            (last_use,(cls,record)) = self.cold.pop(id)
+            activity = cls()
+            activity.__dict__.update(pickle.loads(record))
+        self._put(id,activity)
+        return activity
+
+    def __setitem__(self, id, activity):
+        self.hot.pop(id,None)
+        self.cold.pop(id,None)
+        self._put(id,activity)
+
+    def __delitem__(self, id):
+        try:
+            del self.hot[id]
+        except KeyError:
+            del self.cold[id]
+
+    def get(self, id, default=None):
+        try:
+            return self[id]
+        except KeyError:
+            return default
+
+    def _put(self, id, activity):
+        now = time.time()
+        self.hot[id] = (now,activity)
+        if len(self.hot) > self.hot_size:
+            (old_id,(last_use,old_activity)) = self.hot.popitem(last=False)
+            self.cold[old_id] = (last_use,self._compact(old_activity))
+        self._evict(now)
+
+    def _compact(self, activity):
+        defaults = _defaultAttributes(activity.__class__)
+        record = {}
+        for (name,value) in activity.__dict__.items():
+            if name not in defaults or defaults[name] != value:
+                record[name] = value
+        return (activity.__class__,pickle.dumps(record,pickle.HIGHEST_PROTOCOL))
+
+    def _evict(self, now):
+        while len(self) > self.max_size:
+            self._oldest().popitem(last=False)
+            self.evicted_size += 1
+        while len(self) > 0:
+            entries = self._oldest()
+            (last_use,value) = next(iter(entries.values()))
+            if last_use >= now - self.max_age:
+                break
+            entries.popitem(last=False)
+            self.evicted_age += 1
+        if self.evicted_size + self.evicted_age > 0 and now - self.last_report >= 60*60:
+            logger.info("forgot %d jobs because more than %d were cached and %d jobs not updated in %d seconds - %d jobs cached",
+                        self.evicted_size,self.max_size,self.evicted_age,self.max_age,len(self))
+            self.evicted_size = 0
+            self.evicted_age = 0
+            self.last_report = now
+
+    def _oldest(self):
+        if len(self.cold) > 0:
+            return self.cold
+        return self.hot
+
+_default_attributes = {}
+
+def _defaultAttributes(cls):
+    # the attributes of a new object of a class, for compacting objects of that class
+    if cls not in _default_attributes:
+        _default_attributes[cls] = cls().__dict__
+    return _default_attributes[cls]
+
+#######################################################################################################################
+
 class ComputingActivity(Activity):
 
     STATE_PENDING = "ipf:pending"
@@ -205,6 +629,144 @@ class ComputingActivity(Activity):
 
 #######################################################################################################################
 
+class ActivityLookup(object):
+    """Queries the scheduler about jobs that an update step hasn't seen before, in batches on a background thread.
+
+    Until the scheduler has been queried about a job, the step is given a placeholder for it. Changes that the step
+    makes to the placeholder are then applied to the queried activity, which is published if the placeholder was.
+    """
+
+    def __init__(self, step, window):
+        self.step = step
+        self.window = window
+        self.lock = threading.Lock()    # held while the step handles log lines
+        self.waiting = {}               # job id -> _PendingActivity
+        self.finishing = None           # the activity whose placeholder updates are being applied
+        self.finishing_output = False   # whether a deferred update asked for that activity to be published
+        self.replaying = False          # publish what the log says about jobs that the scheduler doesn't know
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run,name="%s-lookup" % step.id)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Ends the background thread once it has finished any query it is making."""
+        self.stopped = True
+        self.wake.set()
+
+    def get(self, id):
+        """Returns a placeholder for the job, querying the scheduler about it soon."""
+        try:
+            return self.waiting[id]
+        except KeyError:
+            activity = _PendingActivity(id)
+            self.waiting[id] = activity
+            self.wake.set()
+            return activity
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            if self.stopped:
+                return
+            time.sleep(self.window)   # let more jobs show up
+            with self.lock:
+                self.wake.clear()
+                ids = list(self.waiting.keys())
+            self.step.debug("querying %d jobs",len(ids))
+            try:
+                activities = self.step._queryActivities(ids)
+            except Exception as e:
+                self.step.warning("failed to query jobs: %s",e)
+                activities = {}
+            with self.lock:
+                for id in ids:
+                    try:
+                        self._finish(self.waiting.pop(id),activities.get(id))
+                    except Exception as e:
+                        # don't let one job stop the updates of the others
+                        self.step.warning("failed to update job %s: %s",id,e)
+                        self.step.debug(traceback.format_exc())
+
+    def _finish(self, pending, activity):
+        id = pending.LocalIDFromManager
+        no_queue_name_return = pending.no_queue_name_return
+        if activity is None:
+            # the job ended long enough ago that the scheduler has forgotten it - when replaying, publish what the
+            # log says, including its queue if the log has it
+            activity = ComputingActivity()
+            no_queue_name_return = no_queue_name_return or self.replaying
+        self.finishing = activity
+        self.finishing_output = False
+        try:
+            pending.apply(activity)
+        finally:
+            self.finishing = None
+        if len(activity.State) > 0 and activity.State[0] in _ENDED_STATES:
+            if id in self.step.activities:
+                del self.step.activities[id]
+        else:
+            self.step.activities[id] = activity
+        if self.finishing_output or \
+           (pending.output_requested and self.step._includeQueue(activity.Queue,no_queue_name_return)):
+            self.step.output(activity)
+
+_ENDED_STATES = set([ComputingActivity.STATE_TERMINATED,ComputingActivity.STATE_FINISHED,
+                     ComputingActivity.STATE_FAILED])
+
+class _PendingActivity(ComputingActivity):
+    """A placeholder for a job that is waiting on an ActivityLookup that remembers which attributes are set.
+
+    There can be very many placeholders when replaying logs, so attributes are only added when they are used, and
+    the order of changes is only recorded once a log handler defers a decision until the job has been queried.
+    """
+
+    def __init__(self, id):
+        self.__dict__["set_names"] = set()
+        self.__dict__["updates"] = None   # (name, value) or (None, deferred function) in order, after a deferral
+        self.__dict__["output_requested"] = False
+        self.__dict__["no_queue_name_return"] = False
+        self.LocalIDFromManager = id
+
+    def knows(self, names):
+        """Whether the values of names are those the job has now - they were set and no decision is deferred."""
+        return self.updates is None and all(name in self.set_names for name in names)
+
+    def defer(self, func):
+        if self.updates is None:
+            self.__dict__["updates"] = [(name,self.__dict__[name]) for name in self.set_names]
+        self.updates.append((None,func))
+
+    def apply(self, activity):
+        """Makes the changes made to this placeholder to the activity the scheduler reported."""
+        if self.updates is None:
+            for name in self.set_names:
+                setattr(activity,name,getattr(self,name))
+            return
+        for (name,value) in self.updates:
+            if name is None:
+                value(activity)
+            else:
+                setattr(activity,name,value)
+
+    def __getattr__(self, name):
+        # only called for attributes that haven't been added
+        defaults = _defaultAttributes(ComputingActivity)
+        if name not in defaults:
+            raise AttributeError(name)
+        value = copy.copy(defaults[name])
+        self.__dict__[name] = value
+        return value
+
+    def __setattr__(self, name, value):
+        if self.updates is not None:
+            self.updates.append((name,value))
+        self.set_names.add(name)
+        ComputingActivity.__setattr__(self,name,value)
+
+#######################################################################################################################
+
 class ComputingActivityTeraGridXml(ActivityTeraGridXml):
     data_cls = ComputingActivity
 
@@ -482,6 +1044,19 @@ class ComputingActivities(Data):
     def __init__(self, id, activities):
         Data.__init__(self,id)
         self.activities = activities
+        self.delta = None   # a ComputingActivitiesDelta if the step was asked to compute one
+
+class ComputingActivitiesDelta(object):
+    """The changes to the activities since the previous run, or all of them if full is True."""
+
+    def __init__(self, sequence, full, activities=None):
+        self.sequence = sequence     # increases by one each run, so that a consumer can detect a missed delta
+        self.full = full
+        if activities is None:
+            activities = []
+        self.added = activities      # [ComputingActivity] - all activities if full
+        self.changed = []            # [ComputingActivity]
+        self.removed = []            # [ComputingActivity ID]
     
 #######################################################################################################################
 
@@ -509,9 +1084,47 @@ class ComputingActivitiesOgfJson(Representation):
         Representation.__init__(self,Representation.MIME_APPLICATION_JSON,data)
 
     def get(self):
-        adoc = []
-        for activity in self.data.activities:
-            adoc.append(ComputingActivityOgfJson(activity).toJson())
-        return json.dumps(adoc,sort_keys=True,indent=4)
+        return "".join(self.getChunks())
+
+    def getChunks(self, compact=False):
+        adoc = (ComputingActivityOgfJson(activity).toJson() for activity in self.data.activities)
+        return jsonChunks(adoc,compact,sort_keys=True)
+
+#######################################################################################################################
+
+class ComputingActivitiesDeltaOgfJson(Representation):
+    """Only the activities that were added, changed, or removed since the previous run."""
+
+    data_cls = ComputingActivities
+
+    def __init__(self, data):
+        Representation.__init__(self,Representation.MIME_APPLICATION_JSON,data)
+
+    def get(self):
+        return "".join(self.getChunks())
+
+    def getChunks(self, compact=False):
+        # the activity documents are generators, so they are written one at a time
+        return jsonChunks(self._toJson(self._activityDocs),compact,sort_keys=True)
+
+    def toJson(self):
+        return self._toJson(lambda activities: list(self._activityDocs(activities)))
+
+    def _activityDocs(self, activities):
+        return (ComputingActivityOgfJson(activity).toJson() for activity in activities)
+
+    def _toJson(self, activityDocs):
+        delta = self.data.delta
+        if delta is None or delta.full:
+            doc = {"Full": True,
+                   "Activities": activityDocs(self.data.activities)}
+        else:
+            doc = {"Full": False,
+                   "Added": activityDocs(delta.added),
+                   "Changed": activityDocs(delta.changed),
+                   "Removed": delta.removed}
+        if delta is not None:
+            doc["Sequence"] = delta.sequence
+        return doc
     
 #######################################################################################################################
@@ -72,55 +72,58 @@ class ComputingSharesStep(GlueStep):
         raise StepError("ComputingSharesStep._run not overriden")
 
     def _addActivities(self, shares):
-        shareDict = {}
+        share_dict = {}
         for share in shares:
-            shareDict[share.Name] = share
-
-        for share in shares:
-            share.TotalJobs = 0
-            share.RunningJobs = 0
-            share.WaitingJobs = 0
-            share.SuspendedJobs = 0
-            share.UsedSlots = 0
-            share.UsedAcceleratorSlots = 0
-            share.RequestedSlots = 0
-            share.activity = []
+            share_dict[share.Name] = share
 
+        # share -> [TotalJobs, RunningJobs, WaitingJobs, SuspendedJobs, UsedSlots, UsedAcceleratorSlots, RequestedSlots]
+        counts = dict((share,[0,0,0,0,0,0,0]) for share in shares)
+        found_shares = {}   # (reservation name, queue) -> share or None - looked up once for each pair
         for activity in self.activities:
             if activity.Queue is None:
                 self.debug("no queue specified for activity %s",activity)
                 continue
+            key = (activity.Extension.get("ReservationName",_NO_RESERVATION),activity.Queue)
             try:
-                # if an activity is associated with a reservation, use that share
-                share = shareDict[activity.Extension["ReservationName"]]
+                share = found_shares[key]
             except KeyError:
-                try:
-                    share = shareDict[activity.Queue]
-                except KeyError:
-                    self.warning("  didn't find share for queue "+str(activity.Queue))
-                    continue
-            share.activity.append(activity)
-            if activity.State[0] == ComputingActivity.STATE_RUNNING:
-                share.RunningJobs = share.RunningJobs + 1
-                share.TotalJobs = share.TotalJobs + 1
-                share.UsedSlots = share.UsedSlots + activity.RequestedSlots
+                share = self._findShare(share_dict,key)
+                found_shares[key] = share
+            if share is None:
+                continue
+            share_counts = counts[share]
+            state = activity.State[0]
+            if state == ComputingActivity.STATE_RUNNING:
+                share_counts[0] += 1
+                share_counts[1] += 1
+                share_counts[4] += activity.RequestedSlots
                 if activity.RequestedAcceleratorSlots:
-                    share.UsedAcceleratorSlots = share.UsedAcceleratorSlots + activity.RequestedAcceleratorSlots
-            elif activity.State[0] == ComputingActivity.STATE_PENDING:
-                share.WaitingJobs = share.WaitingJobs + 1
-                share.TotalJobs = share.TotalJobs + 1
-                share.RequestedSlots = share.RequestedSlots + activity.RequestedSlots
-            elif activity.State[0] == ComputingActivity.STATE_SUSPENDED:
-                share.SuspendedJobs = share.SuspendedJobs + 1
-                share.TotalJobs = share.TotalJobs + 1
-                share.RequestedSlots = share.RequestedSlots + activity.RequestedSlots
-            elif activity.State[0] == ComputingActivity.STATE_FINISHED:
-                pass
-            elif activity.State[0] == ComputingActivity.STATE_TERMINATED:
-                pass
-            else:
-                # output a warning
-                pass
+                    share_counts[5] += activity.RequestedAcceleratorSlots
+            elif state == ComputingActivity.STATE_PENDING:
+                share_counts[0] += 1
+                share_counts[2] += 1
+                share_counts[6] += activity.RequestedSlots
+            elif state == ComputingActivity.STATE_SUSPENDED:
+                share_counts[0] += 1
+                share_counts[3] += 1
+                share_counts[6] += activity.RequestedSlots
+            # finished and terminated activities aren't counted
+
+        for share in shares:
+            (share.TotalJobs,share.RunningJobs,share.WaitingJobs,share.SuspendedJobs,share.UsedSlots,
+             share.UsedAcceleratorSlots,share.RequestedSlots) = counts[share]
+
+    def _findShare(self, share_dict, key):
+        (reservation_name,queue) = key
+        # if an activity is associated with a reservation, use that share
+        if reservation_name in share_dict:
+            return share_dict[reservation_name]
+        if queue in share_dict:
+            return share_dict[queue]
+        self.warning("  didn't find share for queue "+str(queue))
+        return None
+
+_NO_RESERVATION = object()
 
 #######################################################################################################################
 
@@ -85,51 +85,69 @@ class ExecutionEnvironmentsStep(GlueStep):
 
     def _groupHosts(self, hosts):
         use_name = self._shouldUseName(hosts)
-        host_groups = []
+        # hosts that sameHostGroup() considers the same have the same key, so hosts aren't compared to every group
+        groups = {}    # key -> hosts, in the order that the groups were first seen
         for host in hosts:
-            for host_group in host_groups:
-                if host.sameHostGroup(host_group, use_name):
-                    if "UsedAverageLoad" in host.Extension:
-                        host_load = host.Extension["UsedAverageLoad"]
-                        if "UsedAverageLoad" not in host_group.Extension:
-                            host_group.Extension["UsedAverageLoad"] = host_load
-                        else:
-                            host_group_load = host_group.Extension["UsedAverageLoad"]
-                            host_group_load = (host_group_load * host_group.UsedInstances +
-                                               host_load * host.UsedInstances) / \
-                                (host_group.UsedInstances + host.UsedInstances)
-                            host_group.Extension["UsedAverageLoad"] = host_group_load
-                    if "AvailableAverageLoad" in host.Extension:
-                        host_load = host.Extension["AvailableAverageLoad"]
-                        if "AvailableAverageLoad" not in host_group.Extension:
-                            host_group.Extension["AvailableAverageLoad"] = host_load
-                        else:
-                            host_group_load = host_group.Extension["AvailableAverageLoad"]
-                            host_group_avail = host_group.TotalInstances - host_group.UsedInstances - \
-                                host_group.UnavailableInstances
-                            host_avail = host.TotalInstances - host.UsedInstances - host.UnavailableInstances
-                            host_group_load = (host_group_load * host_group_avail + host_load * host_avail) / \
-                                              (host_group_avail + host_group_avail)
-                            host_group.Extension["AvailableAverageLoad"] = host_group_load
-                    if "PartiallyUsedInstances" in host.Extension:
-                        if "PartiallyUsedInstances" not in host_group.Extension:
-                            host_group.Extension["PartiallyUsedInstances"] = host.Extension["PartiallyUsedInstances"]
-                        else:
-                            host_group.Extension["PartiallyUsedInstances"] = \
-                                host_group.Extension["PartiallyUsedInstances"] + \
-                                host.Extension["PartiallyUsedInstances"]
-                    host_group.TotalInstances += host.TotalInstances
-                    host_group.UsedInstances += host.UsedInstances
-                    host_group.UnavailableInstances += host.UnavailableInstances
-                    host = None
-                    break
-            if host is not None:
-                host_groups.append(host)
-                if not use_name:
-                    host.Name = "NodeType%d" % len(host_groups)
+            key = host.hostGroupKey(use_name)
+            try:
+                groups[key].append(host)
+            except KeyError:
+                groups[key] = [host]
+
+        host_groups = []
+        for group_hosts in groups.values():
+            host_groups.append(self._mergeHosts(group_hosts))
+            if not use_name:
+                host_groups[-1].Name = "NodeType%d" % len(host_groups)
 
         return host_groups
 
+    def _mergeHosts(self, hosts):
+        """Adds the instances of the other hosts to the first one. Loads are averaged, weighted by instances."""
+        host_group = hosts[0]
+        if len(hosts) == 1:
+            return host_group
+
+        # load name -> [sum of load * weight, sum of weights, sum of loads, number of loads]
+        loads = {"UsedAverageLoad": [0.0,0,0.0,0], "AvailableAverageLoad": [0.0,0,0.0,0]}
+        partially_used = None
+        total = used = unavailable = 0
+        for host in hosts:
+            for name in loads:
+                if name not in host.Extension:
+                    continue
+                if name == "UsedAverageLoad":
+                    weight = host.UsedInstances
+                else:
+                    weight = host.TotalInstances - host.UsedInstances - host.UnavailableInstances
+                sums = loads[name]
+                sums[0] += host.Extension[name] * weight
+                sums[1] += weight
+                sums[2] += host.Extension[name]
+                sums[3] += 1
+            if "PartiallyUsedInstances" in host.Extension:
+                if partially_used is None:
+                    partially_used = host.Extension["PartiallyUsedInstances"]
+                else:
+                    partially_used += host.Extension["PartiallyUsedInstances"]
+            total += host.TotalInstances
+            used += host.UsedInstances
+            unavailable += host.UnavailableInstances
+
+        for (name,(weighted_sum,weights,load_sum,count)) in loads.items():
+            if count == 0:
+                continue
+            if weights > 0:
+                host_group.Extension[name] = weighted_sum / weights
+            else:
+                host_group.Extension[name] = load_sum / count
+        if partially_used is not None:
+            host_group.Extension["PartiallyUsedInstances"] = partially_used
+        host_group.TotalInstances = total
+        host_group.UsedInstances = used
+        host_group.UnavailableInstances = unavailable
+        return host_group
+
     def _run(self):
         raise StepError("ExecutionEnvironmentsStep._run not overriden")
 
@@ -213,6 +231,15 @@ class ExecutionEnvironment(Resource):
     def __str__(self):
         return json.dumps(ExecutionEnvironmentOgfJson(self).toJson(), sort_keys=True, indent=4)
 
+    def hostGroupKey(self, useName):
+        """Returns a value that is the same for hosts that sameHostGroup() considers to be in the same group."""
+        key = (self.Platform,self.PhysicalCPUs,self.LogicalCPUs,self.CPUVendor,self.CPUModel,self.CPUVersion,
+               self.CPUClockSpeed,self.MainMemorySize,self.OSFamily,self.OSName,self.OSVersion,
+               len(self.ShareID),frozenset(self.ShareID))
+        if useName:
+            return (self.Name,)+key
+        return key
+
     def sameHostGroup(self, exec_env, useName):
         if useName and self.Name != exec_env.Name:
             return False
@@ -15,7 +15,6 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
-import subprocess
 import datetime
 
 from ipf.dt import *
@@ -29,6 +28,7 @@ from . import execution_environment
 from . import accelerator_environment
 from . import computing_manager_accel_info
 from . import computing_share_accel_info
+from . import scheduler
 
 #######################################################################################################################
 
@@ -72,6 +72,37 @@ class ComputingManagerStep(computing_manager.ComputingManagerStep):
 #######################################################################################################################
 
 
+class SchedulerSnapshotStep(scheduler.SchedulerSnapshotStep):
+
+    def __init__(self):
+        scheduler.SchedulerSnapshotStep.__init__(self)
+
+        self.produces = [SchedulerSnapshot]
+
+        self._acceptParameter(
+            "bjobs", "the path to the LSF bjobs program (default 'bjobs')", False)
+        self._acceptParameter(
+            "bqueues", "the path to the LSF bqueues program (default 'bqueues')", False)
+        self._acceptParameter(
+            "lshosts", "the path to the LSF lshosts program (default 'lshosts')", False)
+        self._acceptParameter(
+            "bhosts", "the path to the LSF bhosts program (default 'bhosts')", False)
+
+    def _queries(self):
+        return {"jobs": self.params.get("bjobs", "bjobs") + " -a -l -u all",
+                "queues": self.params.get("bqueues", "bqueues") + " -l",
+                "lshosts": self.params.get("lshosts", "lshosts") + " -w",
+                "bhosts": self.params.get("bhosts", "bhosts") + " -w"}
+
+#######################################################################################################################
+
+
+class SchedulerSnapshot(scheduler.SchedulerSnapshot):
+    pass
+
+#######################################################################################################################
+
+
 class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
     def __init__(self):
@@ -79,13 +110,13 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
         self._acceptParameter(
             "bjobs", "the path to the LSF bjobs program (default 'bjobs')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         bjobs = self.params.get("bjobs", "bjobs")
 
         cmd = bjobs + " -a -l -u all"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("jobs", cmd)
         if status != 0:
             raise StepError("bjobs failed: "+output+"\n")
 
@@ -279,13 +310,13 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
 
         self._acceptParameter(
             "bqueues", "the path to the LSF bqueues program (default 'bqueues')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         bqueues = self.params.get("bqueues", "bqueues")
 
         cmd = bqueues + " -l"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("queues", cmd)
         if status != 0:
             raise StepError("bqueues failed: "+output+"\n")
 
@@ -438,13 +469,13 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
             "lshosts", "the path to the LSF lshosts program (default 'lshosts')", False)
         self._acceptParameter(
             "bhosts", "the path to the LSF bhosts program (default 'lshosts')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         lshosts = self.params.get("lshosts", "lshosts")
 
         cmd = lshosts + " -w"
-        info.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("lshosts", cmd)
         if status != 0:
             raise StepError("lshosts failed: "+output)
 
@@ -457,8 +488,7 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
         bhosts = self.params.get("bhosts", "bhosts")
 
         cmd = bhosts + " -w"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("bhosts", cmd)
         if status != 0:
             raise StepError("bhosts failed: "+output)
 
@@ -281,8 +281,6 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
 
         self._acceptParameter("nimbus_dir","the path to the NIMBUS directory",True)
 
-        self.activities = {}
-
     def _run(self):
         self.info("running")
         step = ComputingActivitiesStep()    # use ComputingActivitiesStep to initialize cache of activities
@@ -296,7 +294,8 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
             raise StepError("nimbus_dir parameter not specified")
 
         log_file = os.path.join(nimbus_dir,"var","services.log")
-        watcher = LogFileWatcher(self._logEntry,log_file,self.position_file)
+        watcher = LogFileWatcher(self._logEntries,log_file,self.position_file,
+                                 self.checkpoint_lines,self.checkpoint_interval,batch=True)
         watcher.run()
 
     def _logEntry(self, log_file_name, line):
@@ -20,7 +20,7 @@ import datetime
 import os
 import re
 
-from ipf.dt import localtzoffset
+from ipf.dt import localtzoffset, TimestampParser, ctimeTextToDateTime, mdyTextToDateTime
 from ipf.error import StepError
 from ipf.log import LogDirectoryWatcher
 
@@ -32,6 +32,7 @@ from . import execution_environment
 from . import accelerator_environment
 from . import computing_manager_accel_info
 from . import computing_share_accel_info
+from . import scheduler
 
 #######################################################################################################################
 
@@ -75,6 +76,34 @@ class ComputingManagerStep(computing_manager.ComputingManagerStep):
 #######################################################################################################################
 
 
+class SchedulerSnapshotStep(scheduler.SchedulerSnapshotStep):
+
+    def __init__(self):
+        scheduler.SchedulerSnapshotStep.__init__(self)
+
+        self.produces = [SchedulerSnapshot]
+
+        self._acceptParameter(
+            "qstat", "the path to the PBS qstat program (default 'qstat')", False)
+        self._acceptParameter(
+            "pbsnodes", "the path to the PBS pbsnodes program (default 'pbsnodes')", False)
+
+    def _queries(self):
+        qstat = self.params.get("qstat", "qstat")
+        pbsnodes = self.params.get("pbsnodes", "pbsnodes")
+        return {"jobs": qstat + " -f",
+                "queues": qstat + " -Q -f -M",
+                "nodes": pbsnodes + " -a"}
+
+#######################################################################################################################
+
+
+class SchedulerSnapshot(scheduler.SchedulerSnapshot):
+    pass
+
+#######################################################################################################################
+
+
 class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
     def __init__(self):
@@ -82,14 +111,14 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
         self._acceptParameter(
             "qstat", "the path to the PBS qstat program (default 'qstat')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         qstat = self.params.get("qstat", "qstat")
 
         # what flavors is -x (xml) available in?
         cmd = qstat + " -f"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("jobs", cmd)
         if status != 0:
             raise StepError("qstat failed: "+output+"\n")
 
@@ -250,9 +279,26 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
     @classmethod
     def _getDateTime(cls, dt_str):
         # Example: Fri May 30 06:54:25 2008  (day of the month isn't padded)
+        dt = _qstat_times.parse(dt_str)
+        if dt is not None:
+            return dt
         dt = datetime.datetime.strptime(dt_str, "%a %b %d %H:%M:%S %Y")
         return dt.replace(tzinfo=localtzoffset())
 
+_local_tz = localtzoffset()
+
+_qstat_times = TimestampParser(lambda text: ctimeTextToDateTime(text, _local_tz))
+_log_times = TimestampParser(lambda text: mdyTextToDateTime(text, _local_tz))
+
+
+class _LogFilter(object):
+    """Matches the server log lines that ComputingActivityUpdateStep._logEntry handles - job events and requests."""
+
+    def match(self, entry):
+        if ";0008;" in entry or ";0040;" in entry:
+            return entry
+        return None
+
 #######################################################################################################################
 
 
@@ -267,10 +313,6 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
         self._acceptParameter(
             "qstat", "the path to the PBS qstat program (default 'qstat')", False)
 
-        # caching job information isn't great with very large queues,
-        # but want to provide full information in each job update
-        self.activities = {}
-
     def _run(self):
         try:
             dir_name = self.params["server_logs_dir"]
@@ -287,7 +329,8 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
                         "could not find server_logs dir starting from the directory PBS_HOME")
 
         watcher = LogDirectoryWatcher(
-            self._logEntry, dir_name, self.position_file)
+            self._logEntries, dir_name, self.position_file,
+            self.checkpoint_lines, self.checkpoint_interval, batch=True)
         watcher.run()
 
     def _logEntry(self, log_file_name, entry):
@@ -389,29 +432,45 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
             if id in self.activities:
                 del self.activities[id]
         elif "Job Modified" in toks[5]:
-            # when nodes aren't available, log has jobs that quickly go from Job Queued to Job Run to Job Modified
-            # and the jobs are pending after this
-            if len(activity.State) > 0 and activity.State[0] == computing_activity.ComputingActivity.STATE_RUNNING:
-                activity.State[0] = computing_activity.ComputingActivity.STATE_PENDING
-                activity.StartTime = None
-            else:
-                # seems like we can safely ignore others
-                return
+            # for a job that hasn't been queried yet, decide from the state qstat reports once it has been
+            self._whenKnown(activity, ["State"], self._jobModified)
+            return
         elif "Job moved" in toks[5]:
             m = re.search("Job moved to (\S+) at request", toks[5])
-            if m is None or m.group(1) == activity.Queue:
+            if m is None:
                 return
-            activity.Queue = m.group(1)
+            queue = m.group(1)
+            self._whenKnown(activity, ["Queue"], lambda activity: self._jobMoved(activity, queue))
+            return
         else:
             self.debug("unhandled log event: %s", toks)
             return
 
-        if activity.Queue is None or self._includeQueue(activity.Queue):
+        if self._includeActivity(activity, True):
+            self.output(activity)
+
+    def _jobModified(self, activity):
+        # when nodes aren't available, log has jobs that quickly go from Job Queued to Job Run to Job Modified
+        # and the jobs are pending after this
+        if len(activity.State) > 0 and activity.State[0] == computing_activity.ComputingActivity.STATE_RUNNING:
+            activity.State[0] = computing_activity.ComputingActivity.STATE_PENDING
+            activity.StartTime = None
+        else:
+            # seems like we can safely ignore others
+            return
+        if self._includeActivity(activity, True):
+            self.output(activity)
+
+    def _jobMoved(self, activity, queue):
+        if queue == activity.Queue:
+            return
+        activity.Queue = queue
+        if self._includeActivity(activity, True):
             self.output(activity)
 
     def _getActivity(self, id):
         try:
-            activity = self.activities[id]
+            activity = self._findActivity(id)
             # activity will be modified - update creation time
             activity.CreationTime = datetime.datetime.now(localtzoffset())
         except KeyError:
@@ -419,6 +478,10 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
         return activity
 
     def _queryActivity(self, id):
+        if self.lookup is not None:
+            if id not in self.lookup.waiting:
+                self.lookup.get(id).published = False
+            return self.lookup.waiting[id]
         qstat = self.params.get("qstat", "qstat")
         cmd = qstat + " -f " + id
         self.debug("running "+cmd)
@@ -433,8 +496,31 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
         activity.published = False
         return activity
 
+    def _logFilter(self):
+        return _LogFilter()
+
+    def _queryActivities(self, ids):
+        qstat = self.params.get("qstat", "qstat")
+        activities = {}
+        # qstat accepts many job ids - keep the command line to a reasonable length
+        for i in range(0, len(ids), 500):
+            cmd = qstat + " -f " + " ".join(ids[i:i+500])
+            self.debug("running "+cmd)
+            status, output = subprocess.getstatusoutput(cmd)
+            if status != 0:
+                # qstat fails if any of the jobs has ended, but still describes the others
+                self.debug("qstat failed: "+output+"\n")
+            for job_string in output.split("Job Id: ")[1:]:
+                activity = ComputingActivitiesStep._getJob("Job Id: "+job_string, self)
+                activity.published = False
+                activities[activity.LocalIDFromManager] = activity
+        return activities
+
     def _getDateTime(self, dt_str):
         # Example: 06/10/2012 16:17:41
+        dt = _log_times.parse(dt_str)
+        if dt is not None:
+            return dt
         m = re.search("(\d+)/(\d+)/(\d+) (\d+):(\d+):(\d+)", dt_str)
         if m is None:
             raise StepError("can't parse '%s' as a date/time" % dt_str)
@@ -462,12 +548,12 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
 
         self._acceptParameter(
             "qstat", "the path to the PBS qstat program (default 'qstat')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         qstat = self.params.get("qstat", "qstat")
         cmd = qstat + " -Q -f -M"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("queues", cmd)
         if status != 0:
             self.error("qstat failed: "+output)
             raise StepError("qstat failed: "+output+"\n")
@@ -607,13 +693,13 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
         self._acceptParameter("nodes",
                               "An expression describing the nodes to include (optional). The syntax is a series of +<property> and -<property> where <property> is the name of a node property or a '*'. '+' means include '-' means exclude. The expression is processed in order and the value for a node at the end determines if it is shown.",
                               False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         pbsnodes = self.params.get("pbsnodes", "pbsnodes")
 
         cmd = pbsnodes + " -a"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("nodes", cmd)
         if status != 0:
             self.error("pbsnodes failed: "+output)
             raise StepError("pbsnodes failed: "+output+"\n")
@@ -0,0 +1,84 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import datetime
+import subprocess
+import threading
+
+from ipf.data import Data
+from ipf.dt import *
+from ipf.error import StepError
+from ipf.sysinfo import ResourceName
+
+from .step import GlueStep
+
+#######################################################################################################################
+
+class SchedulerSnapshotStep(GlueStep):
+    """Runs all of the queries that the GLUE 2 steps of a scheduler need at the same time.
+
+    Steps given "scheduler_snapshot": true in their params read the output of their queries from the snapshot
+    instead of running them, so the jobs, queues, and nodes they describe are from one point in time and the
+    scheduler is asked about each of them once. Each scheduler produces its own subclass of SchedulerSnapshot, so
+    that the snapshot step of a workflow can be inferred from the steps that read it.
+    """
+
+    def __init__(self):
+        GlueStep.__init__(self)
+
+        self.description = "produces the output of the queries the GLUE 2 steps of a scheduler need"
+        self.time_out = 30
+        self.requires = [ResourceName]
+        self.produces = [SchedulerSnapshot]
+
+    def run(self):
+        resource_name = self._getInput(ResourceName).resource_name
+
+        snapshot = self.produces[0](resource_name)
+        threads = []
+        for (name,cmd) in self._queries().items():
+            self.debug("running "+cmd)
+            thread = threading.Thread(target=self._runQuery,args=(snapshot,name,cmd))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self._output(snapshot)
+
+    def _queries(self):
+        """Returns a dictionary of query name -> the command to run."""
+        raise StepError("SchedulerSnapshotStep._queries not overriden")
+
+    def _runQuery(self, snapshot, name, cmd):
+        snapshot.outputs[name] = subprocess.getstatusoutput(cmd)
+
+#######################################################################################################################
+
+class SchedulerSnapshot(Data):
+    def __init__(self, resource_name):
+        Data.__init__(self,resource_name)
+        self.resource_name = resource_name
+        self.Time = datetime.datetime.now(tzoffset(0))   # when the queries were started
+        self.outputs = {}   # query name -> (status, output) like subprocess.getstatusoutput
+
+    def getOutput(self, name):
+        """Returns the (status, output) of a query."""
+        try:
+            return self.outputs[name]
+        except KeyError:
+            raise StepError("scheduler snapshot doesn't contain query '%s'" % name)
+
+#######################################################################################################################
@@ -35,6 +35,7 @@ from . import execution_environment
 from . import accelerator_environment
 from . import computing_manager_accel_info
 from . import computing_share_accel_info
+from . import scheduler
 
 #######################################################################################################################
 
@@ -78,6 +79,36 @@ class ComputingManagerStep(computing_manager.ComputingManagerStep):
 #######################################################################################################################
 
 
+class SchedulerSnapshotStep(scheduler.SchedulerSnapshotStep):
+
+    def __init__(self):
+        scheduler.SchedulerSnapshotStep.__init__(self)
+
+        self.produces = [SchedulerSnapshot]
+
+        self._acceptParameter(
+            "qstat", "the path to the SGE qstat program (default 'qstat')", False)
+        self._acceptParameter(
+            "qconf", "the path to the SGE qconf program (default 'qconf')", False)
+        self._acceptParameter(
+            "qhost", "the path to the SGE qhost program (default 'qhost')", False)
+
+    def _queries(self):
+        qstat = self.params.get("qstat", "qstat")
+        return {"jobs": qstat + " -xml -pri -s prsz -u \\*",
+                "job_details": qstat + " -xml -s prsz -j \\*",
+                "queues": self.params.get("qconf", "qconf") + " -sq \**",
+                "hosts": self.params.get("qhost", "qhost") + " -xml -q"}
+
+#######################################################################################################################
+
+
+class SchedulerSnapshot(scheduler.SchedulerSnapshot):
+    pass
+
+#######################################################################################################################
+
+
 class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
     def __init__(self):
@@ -85,6 +116,7 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
         self._acceptParameter(
             "qstat", "the path to the SGE qstat program (default 'qstat')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         try:
@@ -94,8 +126,7 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
         # the output of -u is in schedule order
         cmd = qstat + " -xml -pri -s prsz -u \\*"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("jobs", cmd)
         if status != 0:
             self.error("qstat failed: "+output+"\n")
             raise StepError("qstat failed: "+output+"\n")
@@ -108,8 +139,7 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
             jobs[job.LocalIDFromManager] = job
 
         cmd = qstat + " -xml -s prsz -j \\*"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("job_details", cmd)
         if status != 0:
             self.error("qstat failed: "+output+"\n")
             raise StepError("qstat failed: "+output+"\n")
@@ -311,8 +341,6 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
         self._acceptParameter(
             "qstat", "the path to the SGE qstat program (default 'qstat')", False)
 
-        self.activities = {}
-
     def _run(self):
         self.info("running")
 
@@ -329,7 +357,8 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
                 self.error(msg)
                 raise StepError(msg)
         watcher = LogFileWatcher(
-            self._logEntry, reporting_file, self.position_file)
+            self._logEntries, reporting_file, self.position_file,
+            self.checkpoint_lines, self.checkpoint_interval, batch=True)
         watcher.run()
 
     def _logEntry(self, log_file_name, line):
@@ -468,6 +497,7 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
 
         self._acceptParameter(
             "qconf", "the path to the SGE qconf program (default 'qconf')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         try:
@@ -475,8 +505,7 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
         except KeyError:
             qconf = "qconf"
         cmd = qconf + " -sq \**"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("queues", cmd)
         if status != 0:
             self.error("qconf failed: "+output+"\n")
             raise StepError("qconf failed: "+output+"\n")
@@ -545,6 +574,7 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
 
         self._acceptParameter(
             "qhost", "the path to the SGE qhost program (default 'qhost')", False)
+        self._acceptSnapshotParameter(SchedulerSnapshot)
 
     def _run(self):
         try:
@@ -553,8 +583,7 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
             qhost = "qhost"
 
         cmd = qhost + " -xml -q"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
+        status, output = self._query("hosts", cmd)
         if status != 0:
             self.error("qhost failed: "+output+"\n")
             raise StepError("qhost failed: "+output+"\n")
@@ -18,12 +18,15 @@
 import subprocess
 import datetime
 import dateutil.parser
-import itertools
+import json
 import os
 import re
+import tempfile
 
 import ipf.dt
+from ipf.command import CommandCache
 from ipf.error import StepError
+from ipf.hostlist import HostList
 from ipf.log import LogFileWatcher
 
 from . import computing_activity
@@ -100,23 +103,31 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
         self._acceptParameter("EndTime","Regular Expression to parse EndTime (default 'EndTime=(\S+)')",False)
         self._acceptParameter("exec_host ","Regular Expression to parse exec_host (default 'exec_host = (\S+)')",False)
         self._acceptParameter("Priority","Regular Expression to parse Priority (default 'Priority=(\S+)')",False)
+        self._acceptParameter("json","read the JSON output of scontrol (SLURM 23.02 or later) instead of its text. The regular expression parameters are then not used. (default false)",False)
 
     def _run(self):
         # squeue command doesn't provide submit time
         scontrol = self.params.get("scontrol","scontrol")
         showjob = self.params.get("showjob","show job")
 
-        cmd = scontrol + " " + showjob
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError(scontrol+" failed: "+output+"\n")
-
+        parser = _JobParser(self)
         jobs = []
-        for job_str in output.split("\n\n"):
-            job = _getJob(self,job_str,self.params)
-            if self._includeQueue(job.Queue):
-                jobs.append(job)
+        if self.params.get("json",False):
+            for job_doc in _readJson(self,scontrol+" --json "+showjob,"jobs"):
+                job = parser.parseJson(job_doc)
+                if self._includeQueue(job.Queue):
+                    jobs.append(job)
+        else:
+            cmd = scontrol + " " + showjob
+            self.debug("running "+cmd)
+            status, output = subprocess.getstatusoutput(cmd)
+            if status != 0:
+                raise StepError(scontrol+" failed: "+output+"\n")
+
+            for job_str in output.split("\n\n"):
+                job = parser.parse(job_str)
+                if self._includeQueue(job.Queue):
+                    jobs.append(job)
 
         # scontrol doesn't sort jobs, so sort them by priority, job id, and state before returning
         jobs = sorted(jobs,key=lambda job: int(job.LocalIDFromManager))
@@ -133,152 +144,581 @@ class ComputingActivitiesStep(computing_activity.ComputingActivitiesStep):
 
         return jobs
 
-def _getJob(step, job_str,params):
-    showjob = params.get("showjob","show job")
-    job = computing_activity.ComputingActivity()
-    JobId = params.get("JobId","JobId=(\S+)")
-    Name = params.get(" Name"," Name=(\S+)")
-    JobName = params.get(" JobName"," JobName=(\S+)")
-    UserId = params.get("UserId","UserId=(\S+)\(")
-    Account = params.get("Account","Account=(\S+)")
-    Partition = params.get("Partition","Partition=(\S+)")
-    Reservation = params.get("Reservation","Reservation=(\S+)")
-    JobState = params.get("JobState","JobState=(\S+)")
-    JobHeld = params.get("JobHeld","Reason=Dependency")
-    NumCPUs = params.get("NumCPUs","NumCPUs=(\d+)")
-    gresgpu = params.get("gresgpu","gres/gpu=(\d+)")
-    TimeLimit = params.get("TimeLimit","TimeLimit=(\S+)")
-    RunTime = params.get("RunTime","RunTime=(\S+)")
-    SubmitTime = params.get("SubmitTime","SubmitTime=(\S+)")
-    StartTime = params.get("StartTime","StartTime=(\S+)")
-    EndTime = params.get("EndTime","EndTime=(\S+)")
-    exec_host  = params.get("exec_host ","exec_host = (\S+)")
-    Priority = params.get("Priority","Priority=(\S+)")
-
-    m = re.search(JobId,job_str)
-    if m is not None:
-        job.LocalIDFromManager = m.group(1)
-    m = re.search(Name,job_str)
-    if m is not None:
-        job.Name = m.group(1)
-    else:
-        m = re.search(JobName,job_str)
+_job_id = re.compile("JobId=(\S+)")
+
+class _LogDispatcher(object):
+    """Finds the slurmctld log lines that the update step handles and the type, time, and job id of each.
+
+    The default regular expressions are combined into one that is searched for once per line, and lines that don't
+    contain one of their fixed strings aren't searched. When a step parameter replaces one of them, each regular
+    expression is searched for in turn, as written, and the first that matches is used.
+    """
+
+    SUBMIT = "submit"
+    STEP_CREATE = "step_create"
+    CANCELLED = "cancelled"
+    STEP_COMPLETE = "step_complete"
+
+    # event type, parameter name, default regular expression - in the order they are checked
+    EVENTS = [
+        (SUBMIT,"submit_batch_job_regexp","\[(\S+)\] _slurm_rpc_submit_batch_job JobId=(\S+) usec=\d+"),
+        (STEP_CREATE,"job_step_create_regexp","\[(\S+)\] sched: _slurm_rpc_job_step_create: StepId=(\S+).0"),
+        (CANCELLED,"job_cancelled_regexp","\[(\S+)\] job (\S+) cancelled from interactive user"),
+        (STEP_COMPLETE,"step_complete_regexp","\[(\S+)\] sched: _slurm_rpc_step_complete StepId=(\S+).0"),
+    ]
+
+    # each default regular expression contains one of these
+    PREFILTER = ("_slurm_rpc_","cancelled from interactive user")
+
+    def __init__(self, step):
+        self.regexps = [(event_type,re.compile(step.params.get(param,default)))
+                        for (event_type,param,default) in self.EVENTS]
+        self.regexp = None   # the combined default regular expressions
+        if any(step.params.get(param,default) != default for (event_type,param,default) in self.EVENTS):
+            # combining could change which expression matches or what backreferences and flags mean
+            return
+        alternatives = []
+        self.groups = {}     # event type -> (index of time group, index of job id group)
+        group = 1
+        for (event_type,regexp) in self.regexps:
+            alternatives.append("(?P<%s>%s)" % (event_type,regexp.pattern))
+            self.groups[event_type] = (group+1,group+2)
+            group += 1 + regexp.groups
+        self.regexp = re.compile("|".join(alternatives))
+
+    def match(self, entry):
+        """Returns (event type, time string, job id) or None if the line isn't handled."""
+        if self.regexp is None:
+            for (event_type,regexp) in self.regexps:
+                m = regexp.search(entry)
+                if m is not None:
+                    return (event_type,m.group(1),m.group(2))
+            return None
+        if self.PREFILTER[0] not in entry and self.PREFILTER[1] not in entry:
+            return None
+        m = self.regexp.search(entry)
+        if m is None:
+            return None
+        (time_group,id_group) = self.groups[m.lastgroup]
+        return (m.lastgroup,m.group(time_group),m.group(id_group))
+
+class _JobParser(object):
+    """Parses the output of 'scontrol show job' for one job.
+
+    The Key=Value pairs in the output are split apart in one pass. If a step has a regular expression parameter
+    for one of them (such as "JobId"), that expression is used instead to find its value.
+    """
+
+    # parameter name -> default regular expression, equivalent to how the Key=Value pairs are parsed
+    REGEXPS = {
+        "JobId": "JobId=(\S+)",
+        " Name": " Name=(\S+)",
+        " JobName": " JobName=(\S+)",
+        "UserId": "UserId=(\S+)\(",
+        "Account": "Account=(\S+)",
+        "Partition": "Partition=(\S+)",
+        "Reservation": "Reservation=(\S+)",
+        "JobState": "JobState=(\S+)",
+        "JobHeld": "Reason=Dependency",
+        "NumCPUs": "NumCPUs=(\d+)",
+        "gresgpu": "gres/gpu=(\d+)",
+        "TimeLimit": "TimeLimit=(\S+)",
+        "RunTime": "RunTime=(\S+)",
+        "SubmitTime": "SubmitTime=(\S+)",
+        "StartTime": "StartTime=(\S+)",
+        "EndTime": "EndTime=(\S+)",
+        "Priority": "Priority=(\S+)",
+    }
+
+    _gres_gpu = re.compile(REGEXPS["gresgpu"])
+    _digits = re.compile("\d+")
+
+    def __init__(self, step):
+        self.step = step
+        self.overrides = {}   # parameter name -> compiled regular expression
+        for name in self.REGEXPS:
+            if name in step.params:
+                self.overrides[name] = re.compile(step.params[name])
+
+    def parse(self, job_str):
+        return self._getJob(self._getValues(job_str))
+
+    def parseJson(self, job_doc):
+        return self._getJob(self._getJsonValues(job_doc))
+
+    def _getValues(self, job_str):
+        fields = {}
+        for token in job_str.split():
+            (key,sep,value) = token.partition("=")
+            if sep and key not in fields:
+                fields[key] = value
+
+        strs = {}
+        for name in ("JobId","Account","Partition","Reservation","JobState",
+                     "TimeLimit","RunTime","SubmitTime","StartTime","EndTime","Priority"):
+            strs[name] = fields.get(name)
+        strs[" Name"] = fields.get("Name")
+        strs[" JobName"] = fields.get("JobName")
+        user_id = fields.get("UserId")
+        if user_id is not None and user_id.rfind("(") > 0:
+            strs["UserId"] = user_id[:user_id.rfind("(")]
+        else:
+            strs["UserId"] = None
+        strs["JobHeld"] = fields.get("Reason","").startswith("Dependency")
+        strs["NumCPUs"] = self._leadingDigits(fields.get("NumCPUs"))
+        m = self._gres_gpu.search(job_str)
         if m is not None:
-            job.Name = m.group(1)
-    m = re.search(UserId,job_str)
-    if m is not None:
-        job.LocalOwner = m.group(1)
-    m = re.search(Account,job_str)
-    if m is not None:
-        job.Extension["LocalAccount"] = m.group(1)
-    m = re.search(Partition,job_str)
-    if m is not None:
-        job.Queue = m.group(1)
-        job.EnvironmentID = "urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % (m.group(1),step.resource_name)
-    m = re.search(Reservation,job_str)
-    if m is not None and m.group(1) != "(null)":
-        job.Extension["ReservationName"] = m.group(1)
-        job.EnvironmentID = "urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % (m.group(1),step.resource_name)
-    m = re.search(JobState,job_str)
-    if m is not None:
-        state = m.group(1)  # see squeue man page for state descriptions
-        if state == "CANCELLED":
-            job.State = [computing_activity.ComputingActivity.STATE_TERMINATED]
-        elif state == "COMPLETED":
-            job.State = [computing_activity.ComputingActivity.STATE_FINISHED]
-        elif state == "CONFIGURING":
-            job.State = [computing_activity.ComputingActivity.STATE_STARTING]
-        elif state == "COMPLETING":
-            job.State = [computing_activity.ComputingActivity.STATE_FINISHING]
-        elif state == "FAILED":
-            job.State = [computing_activity.ComputingActivity.STATE_FAILED]
-        elif state == "NODE_FAIL":
-            job.State = [computing_activity.ComputingActivity.STATE_FAILED]
-        elif state == "PENDING":
-            m = re.search(JobHeld,job_str)
-            if m is None:
-                job.State = [computing_activity.ComputingActivity.STATE_PENDING]
-            else:
-                job.State = [computing_activity.ComputingActivity.STATE_HELD]
-                # could add what the dependency is
-        elif state == "PREEMPTED":
-            job.State = [computing_activity.ComputingActivity.STATE_TERMINATED]
-        elif state == "REQUEUE_HOLD":
-            job.State = [computing_activity.ComputingActivity.STATE_HELD]
-        elif state == "RUNNING":
-            job.State = [computing_activity.ComputingActivity.STATE_RUNNING]
-        elif state == "SUSPENDED":
-            job.State = [computing_activity.ComputingActivity.STATE_SUSPENDED]
-        elif state == "TIMEOUT":
-            job.State = [computing_activity.ComputingActivity.STATE_FINISHED]
+            strs["gresgpu"] = m.group(1)
         else:
-            step.warning("found unknown job state '%s'",state)
-            job.State = [computing_activity.ComputingActivity.STATE_UNKNOWN]
-        job.State.append("slurm:"+state)
+            strs["gresgpu"] = None
+
+        for name in self.overrides:
+            m = self.overrides[name].search(job_str)
+            if name == "JobHeld":
+                strs[name] = m is not None
+            elif m is None:
+                strs[name] = None
+            else:
+                strs[name] = m.group(1)
 
-    m = re.search(NumCPUs,job_str)
-    if m is not None:
-        job.RequestedSlots = int(m.group(1))
-    m = re.search(gresgpu,job_str)
-    if m is not None:
-        job.RequestedAcceleratorSlots = int(m.group(1))
-    m = re.search(TimeLimit,job_str)
-    if m is not None:
-        wall_time = _getDuration(m.group(1))
-        if job.RequestedSlots is not None:
-            job.RequestedTotalWallTime = wall_time * job.RequestedSlots
-    m = re.search(RunTime,job_str)
-    if m is not None and m.group(1) != "INVALID":
-        used_wall_time = _getDuration(m.group(1))
-        if used_wall_time > 0 and job.RequestedSlots is not None:
-            job.UsedTotalWallTime = used_wall_time * job.RequestedSlots
-    m = re.search(SubmitTime,job_str)
-    if m is not None:
-        job.SubmissionTime = _getDateTime(m.group(1))
-        job.ComputingManagerSubmissionTime = job.SubmissionTime
-    m = re.search(StartTime,job_str)
-    if m is not None and m.group(1) != "Unknown":
-        # ignore if job hasn't started (it is an estimated start time used for backfill scheduling)
-        if job.State[0] != computing_activity.ComputingActivity.STATE_PENDING:
-            job.StartTime = _getDateTime(m.group(1))
-    # SLURM sets EndTime to StartTime+TimeLimit while the job is running, so ignore it then
-    if job.State != computing_activity.ComputingActivity.STATE_RUNNING:
-        m = re.search(EndTime,job_str)
-        if m is not None and m.group(1) != "Unknown":
-            job.EndTime = _getDateTime(m.group(1))
-            job.ComputingManagerEndTime = job.EndTime
-
-    # not sure how to interpret NodeList yet
-    #m = re.search(exec_host",job_str)
-    #if m is not None:
-    #    # exec_host = c013.cm.cluster/7+c013.cm.cluster/6+...
-    #    nodes = set(map(lambda s: s.split("/")[0], m.group(1).split("+")))
-    #    job.ExecutionNode = list(nodes)
-
-    m = re.search(Priority,job_str)
-    if m is not None:
-        job.Extension["Priority"] = int(m.group(1))
+        values = {}
+        values["JobId"] = strs["JobId"]
+        if strs[" Name"] is not None:
+            values["Name"] = strs[" Name"]
+        else:
+            values["Name"] = strs[" JobName"]
+        values["UserId"] = strs["UserId"]
+        values["Account"] = strs["Account"]
+        values["Partition"] = strs["Partition"]
+        if strs["Reservation"] != "(null)":
+            values["Reservation"] = strs["Reservation"]
+        else:
+            values["Reservation"] = None
+        values["JobState"] = strs["JobState"]
+        values["JobHeld"] = strs["JobHeld"]
+        for name in ("NumCPUs","gresgpu","Priority"):
+            if strs[name] is not None:
+                values[name] = int(strs[name])
+            else:
+                values[name] = None
+        if strs["TimeLimit"] is not None:
+            values["TimeLimit"] = _getDuration(strs["TimeLimit"])
+        else:
+            values["TimeLimit"] = None
+        if strs["RunTime"] is not None and strs["RunTime"] != "INVALID":
+            values["RunTime"] = _getDuration(strs["RunTime"])
+        else:
+            values["RunTime"] = None
+        for name in ("SubmitTime","StartTime","EndTime"):
+            if strs[name] is not None and strs[name] != "Unknown":
+                values[name] = _getDateTime(strs[name])
+            else:
+                values[name] = None
+        return values
 
-    return job
+    def _leadingDigits(self, value):
+        if value is None:
+            return None
+        m = self._digits.match(value)
+        if m is None:
+            return None
+        return m.group(0)
+
+    def _getJsonValues(self, job_doc):
+        values = {}
+        values["JobId"] = str(job_doc["job_id"])
+        values["Name"] = job_doc.get("name")
+        values["UserId"] = job_doc.get("user_name")
+        values["Account"] = job_doc.get("account")
+        values["Partition"] = job_doc.get("partition")
+        values["Reservation"] = job_doc.get("resv_name") or None
+        states = _jsonFlags(job_doc.get("job_state"))
+        if len(states) > 0:
+            values["JobState"] = states[0]   # any others are flags such as REQUEUED
+        else:
+            values["JobState"] = None
+        values["JobHeld"] = (job_doc.get("state_reason") or "").startswith("Dependency")
+        values["NumCPUs"] = _jsonNumber(job_doc.get("cpus"))
+        m = self._gres_gpu.search(job_doc.get("tres_req_str") or "")
+        if m is not None:
+            values["gresgpu"] = int(m.group(1))
+        else:
+            values["gresgpu"] = None
+        time_limit = _jsonNumber(job_doc.get("time_limit"))  # minutes
+        if time_limit is not None:
+            values["TimeLimit"] = time_limit * 60
+        else:
+            values["TimeLimit"] = None
+        values["SubmitTime"] = _jsonDateTime(job_doc.get("submit_time"))
+        values["StartTime"] = _jsonDateTime(job_doc.get("start_time"))
+        values["EndTime"] = _jsonDateTime(job_doc.get("end_time"))
+        # the JSON doesn't include the RunTime that the text does
+        values["RunTime"] = None
+        if values["StartTime"] is not None and values["JobState"] != "PENDING":
+            run_end = datetime.datetime.now(_local_tz)
+            if values["EndTime"] is not None and values["EndTime"] < run_end:
+                run_end = values["EndTime"]
+            values["RunTime"] = max(0,int((run_end - values["StartTime"]).total_seconds()))
+        values["Priority"] = _jsonNumber(job_doc.get("priority"))
+        return values
+
+    def _getJob(self, values):
+        job = computing_activity.ComputingActivity()
+
+        if values["JobId"] is not None:
+            job.LocalIDFromManager = values["JobId"]
+        if values["Name"] is not None:
+            job.Name = values["Name"]
+        if values["UserId"] is not None:
+            job.LocalOwner = values["UserId"]
+        if values["Account"] is not None:
+            job.Extension["LocalAccount"] = values["Account"]
+        if values["Partition"] is not None:
+            job.Queue = values["Partition"]
+            job.EnvironmentID = "urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % \
+                                (values["Partition"],self.step.resource_name)
+        if values["Reservation"] is not None:
+            job.Extension["ReservationName"] = values["Reservation"]
+            job.EnvironmentID = "urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % \
+                                (values["Reservation"],self.step.resource_name)
+        state = values["JobState"]  # see squeue man page for state descriptions
+        if state is not None:
+            if state == "PENDING":
+                if values["JobHeld"]:
+                    job.State = [computing_activity.ComputingActivity.STATE_HELD]
+                    # could add what the dependency is
+                else:
+                    job.State = [computing_activity.ComputingActivity.STATE_PENDING]
+            elif state in _job_states:
+                job.State = [_job_states[state]]
+            else:
+                self.step.warning("found unknown job state '%s'",state)
+                job.State = [computing_activity.ComputingActivity.STATE_UNKNOWN]
+            job.State.append("slurm:"+state)
+
+        if values["NumCPUs"] is not None:
+            job.RequestedSlots = values["NumCPUs"]
+        if values["gresgpu"] is not None:
+            job.RequestedAcceleratorSlots = values["gresgpu"]
+        if values["TimeLimit"] is not None and job.RequestedSlots is not None:
+            job.RequestedTotalWallTime = values["TimeLimit"] * job.RequestedSlots
+        if values["RunTime"] is not None and values["RunTime"] > 0 and job.RequestedSlots is not None:
+            job.UsedTotalWallTime = values["RunTime"] * job.RequestedSlots
+        if values["SubmitTime"] is not None:
+            job.SubmissionTime = values["SubmitTime"]
+            job.ComputingManagerSubmissionTime = job.SubmissionTime
+        if values["StartTime"] is not None:
+            # ignore if job hasn't started (it is an estimated start time used for backfill scheduling)
+            if job.State[0] != computing_activity.ComputingActivity.STATE_PENDING:
+                job.StartTime = values["StartTime"]
+        # SLURM sets EndTime to StartTime+TimeLimit while the job is running, so ignore it then
+        if job.State != computing_activity.ComputingActivity.STATE_RUNNING:
+            if values["EndTime"] is not None:
+                job.EndTime = values["EndTime"]
+                job.ComputingManagerEndTime = job.EndTime
+
+        # not sure how to interpret NodeList yet
+
+        if values["Priority"] is not None:
+            job.Extension["Priority"] = values["Priority"]
+
+        return job
+
+# SLURM job state -> IPF state, except for PENDING, which depends on the reason the job is pending
+_job_states = {
+    "CANCELLED": computing_activity.ComputingActivity.STATE_TERMINATED,
+    "COMPLETED": computing_activity.ComputingActivity.STATE_FINISHED,
+    "CONFIGURING": computing_activity.ComputingActivity.STATE_STARTING,
+    "COMPLETING": computing_activity.ComputingActivity.STATE_FINISHING,
+    "FAILED": computing_activity.ComputingActivity.STATE_FAILED,
+    "NODE_FAIL": computing_activity.ComputingActivity.STATE_FAILED,
+    "PREEMPTED": computing_activity.ComputingActivity.STATE_TERMINATED,
+    "REQUEUE_HOLD": computing_activity.ComputingActivity.STATE_HELD,
+    "RUNNING": computing_activity.ComputingActivity.STATE_RUNNING,
+    "SUSPENDED": computing_activity.ComputingActivity.STATE_SUSPENDED,
+    "TIMEOUT": computing_activity.ComputingActivity.STATE_FINISHED,
+}
+
+_days_duration = re.compile("(\d+)-(\d+):(\d+):(\d+)")
+_duration = re.compile("(\d+):(\d+):(\d+)")
 
 def _getDuration(dstr):
-    m = re.search("(\d+)-(\d+):(\d+):(\d+)",dstr)
+    m = _days_duration.search(dstr)
     if m is not None:
         return int(m.group(4)) + 60 * (int(m.group(3)) + 60 * (int(m.group(2)) + 24 * int(m.group(1))))
-    m = re.search("(\d+):(\d+):(\d+)",dstr)
+    m = _duration.search(dstr)
     if m is not None:
         return int(m.group(3)) + 60 * (int(m.group(2)) + 60 * int(m.group(1)))
     raise StepError("failed to parse duration: %s" % dstr)
 
+_local_tz = ipf.dt.localtzoffset()
+
+# SLURM prints times as YYYY-MM-DDTHH:MM:SS in local time (with milliseconds in slurmctld.log) - avoid the general
+# parser for those
+_times = ipf.dt.TimestampParser(lambda text: ipf.dt.isoTextToDateTime(text,_local_tz))
+
 def _getDateTime(dtStr):
+    dt = _times.parse(dtStr)
+    if dt is not None:
+        return dt
 
-    DEFAULTYEAR=datetime.datetime.now(tz=ipf.dt.localtzoffset())
+    DEFAULTYEAR=datetime.datetime.now(tz=_local_tz)
     dt = dateutil.parser.parse(dtStr,default=DEFAULTYEAR)
 
     return dt
 
 #######################################################################################################################
 
+# SLURM 23.02 and later print JSON when given --json. The output is an object containing an array of the items
+# that were asked for (such as "jobs") along with some metadata. The items are decoded one at a time as the
+# output is read, so that a large document is never in memory all at once.
+
+def _readJson(step, cmd, key):
+    """Yields the items in the array named key from the JSON printed by cmd."""
+    step.debug("running "+cmd)
+    err_file = tempfile.TemporaryFile(mode="w+")
+    proc = subprocess.Popen(cmd,shell=True,stdout=subprocess.PIPE,stderr=err_file,universal_newlines=True)
+    error = None
+    try:
+        for item in _JsonReader(proc.stdout).items(key):
+            yield item
+    except StepError as e:
+        error = e
+    proc.stdout.close()
+    if proc.wait() != 0:
+        err_file.seek(0)
+        raise StepError("%s failed: %s" % (cmd,err_file.read()))
+    err_file.close()
+    if error is not None:
+        raise error
+
+def _readJsonFile(file_name, key):
+    """Yields the items in the array named key from a file containing JSON."""
+    f = open(file_name,"r")
+    try:
+        for item in _JsonReader(f).items(key):
+            yield item
+    finally:
+        f.close()
+
+class _JsonReader(object):
+    """Reads the top-level arrays of a JSON object from a file one item at a time."""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, file):
+        self.file = file
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def items(self, key):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            name = self._decode()
+            self._expect(":")
+            if name != key:
+                self._decode()
+            else:
+                self._expect("[")
+                if self._peek() == "]":
+                    self._expect("]")
+                else:
+                    while True:
+                        yield self._decode()
+                        if self._expect(",]") == "]":
+                            break
+            if self._expect(",}") == "}":
+                return
+
+    def _fill(self):
+        if self.eof:
+            return False
+        data = self.file.read(self.CHUNK_SIZE)
+        if data == "":
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, chars):
+        c = self._peek()
+        if c is None or c not in chars:
+            raise StepError("expected one of '%s' in JSON but found %s" % (chars,c))
+        self.pos += 1
+        return c
+
+    def _decode(self):
+        self._peek()
+        while True:
+            try:
+                (value,end) = self.decoder.raw_decode(self.buffer,self.pos)
+            except ValueError as e:
+                if self._fill():
+                    continue
+                raise StepError("failed to decode JSON: %s" % e)
+            # a number at the end of the buffer may continue in the next chunk - even after a partial
+            # fraction or exponent such as "1700000000." that the decoder stops short of
+            if isinstance(value,(int,float)) and not isinstance(value,bool) and \
+                    (end == len(self.buffer) or self.buffer[end] in _json_number_chars) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+_json_number_chars = frozenset(".eE+-0123456789")
+
+def _jsonNumber(value):
+    # newer versions of SLURM print some numbers as {"set": true, "infinite": false, "number": 5}
+    if isinstance(value,dict):
+        if not value.get("set",True) or value.get("infinite",False):
+            return None
+        return value.get("number")
+    return value
+
+def _jsonFlags(value):
+    # states are strings in older versions of SLURM and lists of flags in newer ones
+    if value is None:
+        return []
+    if isinstance(value,list):
+        return value
+    return value.split("+")
+
+def _jsonDateTime(value):
+    epoch = _jsonNumber(value)
+    if not epoch:   # 0 if not known
+        return None
+    return datetime.datetime.fromtimestamp(epoch,_local_tz)
+
+def _jsonList(value):
+    # lists such as features are comma-separated strings in older versions of SLURM
+    if value is None:
+        return None
+    if isinstance(value,list):
+        return ",".join(value)
+    return value
+
+#######################################################################################################################
+
+# The compute workflow has several steps that ask scontrol about the same partitions, reservations, and nodes.
+# They share that output for cache_ttl seconds instead of each running the same commands.
+
+def _runCommands(step, cmds):
+    """Runs scontrol commands in parallel. Returns a dictionary of command -> the name of a file with its output."""
+    return CommandCache(step.resource_name,step.params.get("cache_ttl",10)).run(cmds)
+
+def _readOutput(file_name):
+    f = open(file_name,"r")
+    output = f.read()
+    f.close()
+    if output.endswith("\n"):
+        output = output[:-1]   # like subprocess.getstatusoutput
+    return output
+
+def _readEnvironmentsJson(step, env_cls):
+    """Reads the nodes, partitions, and reservations for an ExecutionEnvironmentsStep or AcceleratorEnvironmentsStep."""
+    scontrol = step.params.get("scontrol","scontrol")
+    node_cmd = scontrol + " --json show node"
+    partition_cmd = scontrol + " --json show partition"
+    reservation_cmd = scontrol + " --json show reservation"
+    outputs = _runCommands(step,[node_cmd,partition_cmd,reservation_cmd])
+
+    nodes = [node for node in map(step._getNodeJson,_readJsonFile(outputs[node_cmd],"nodes"))
+             if step._goodHost(node)]
+    partitions = [_getPartitionJson(step,env_cls(),partition_doc) for partition_doc in
+                  _readJsonFile(outputs[partition_cmd],"partitions")
+                  if step._includeQueue(partition_doc["name"])]
+    reservations = [_getReservationJson(step,env_cls(),rsrv_doc) for rsrv_doc in
+                    _readJsonFile(outputs[reservation_cmd],"reservations")
+                    if step._includeQueue(rsrv_doc.get("partition"))]
+    return (nodes,partitions,reservations)
+
+def _setNodeJson(step, node, node_doc):
+    # ID set by ExecutionEnvironment
+    node.Name = node_doc.get("name")
+    node.PhysicalCPUs = _jsonNumber(node_doc.get("sockets"))
+    node.LogicalCPUs = _jsonNumber(node_doc.get("cpus"))
+    real_memory = _jsonNumber(node_doc.get("real_memory"))  # MB
+    if real_memory is not None:
+        node.MainMemorySize = real_memory
+    node.Partitions = _jsonList(node_doc.get("partitions",[]))
+    _setNodeState(step,node,"+".join(_jsonFlags(node_doc.get("state"))))
+
+def _getPartitionJson(step, partition, partition_doc):
+    # ID set by ExecutionEnvironment
+    partition.Name = partition_doc["name"]
+    nodes = partition_doc.get("nodes",{})
+    total_nodes = _jsonNumber(nodes.get("total"))
+    if total_nodes is not None:
+        partition.TotalInstances = total_nodes
+    if nodes.get("configured"):
+        partition.Extension["Nodes"] = HostList(nodes["configured"])
+    return partition
+
+def _getReservationJson(step, rsrv, rsrv_doc):
+    rsrv.Extension["Reservation"] = True
+
+    # ID set by ExecutionEnvironment
+    rsrv.Name = rsrv_doc["name"]
+    rsrv.ShareID = ["urn:ogf:glue2:xsede.org:ComputingShare:%s.%s" % (rsrv.Name,step.resource_name)]
+
+    start_time = _jsonDateTime(rsrv_doc.get("start_time"))
+    if start_time is not None:
+        rsrv.Extension["StartTime"] = start_time
+    end_time = _jsonDateTime(rsrv_doc.get("end_time"))
+    if end_time is not None:
+        rsrv.Extension["EndTime"] = end_time
+
+    node_count = _jsonNumber(rsrv_doc.get("node_count"))
+    if node_count is not None:
+        rsrv.Extension["RequestedInstances"] = node_count
+
+    # only an active reservation has nodes at the current time
+    now = datetime.datetime.now(_local_tz)
+    if rsrv_doc.get("node_list") and (start_time is None or start_time <= now) and (end_time is None or now < end_time):
+        rsrv.Extension["Nodes"] = HostList(rsrv_doc["node_list"])
+
+    return rsrv
+
+def _setNodeState(step, node, state):
+    node.TotalInstances = 1
+    if "IDLE" in state:
+        node.UsedInstances = 0
+        node.UnavailableInstances = 0
+    elif "ALLOCATED" in state:
+        node.UsedInstances = 1
+        node.UnavailableInstances = 0
+    elif "DOWN" in state:
+        node.UsedInstances = 0
+        node.UnavailableInstances = 1
+    elif "MAINT" in state:
+        node.UsedInstances = 0
+        node.UnavailableInstances = 1
+    elif "RESERVED" in state:
+        node.UsedInstances = 0
+        node.UnavailableInstances = 0
+    elif "MIXED" in state:
+        node.UsedInstances = 1
+        node.UnavailableInstances = 0
+    else:
+        step.warning("unknown node state: %s",state)
+        node.UsedInstances = 0
+        node.UnavailableInstances = 1
+
+#######################################################################################################################
+
 class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep):
 
     def __init__(self):
@@ -291,92 +731,87 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
         self._acceptParameter("job_cancelled_regexp","regexp to match cancelled from interactive user lines from slurmctl.log",False)
         self._acceptParameter("step_complete_regexp","regexp to match _slurm_rpc_step_complete lines from slurmctl.log",False)
 
-        self.activities = {}
+        self.job_parser = None
+        self.log_dispatcher = None
 
     def _run(self):
         log_file = self.params.get("slurmctl_log_file","/usr/local/slurm/var/slurmctl.log")
-        watcher = LogFileWatcher(self._logEntry,log_file,self.position_file)
+        watcher = LogFileWatcher(self._logEntries,log_file,self.position_file,
+                                 self.checkpoint_lines,self.checkpoint_interval,batch=True)
         watcher.run()
 
     def _logEntry(self, log_file_name, entry):
-        submit_re = self.params.get("submit_batch_job_regexp","\[(\S+)\] _slurm_rpc_submit_batch_job JobId=(\S+) usec=\d+")
-        stepcreate_re = self.params.get("job_step_create_regexp","\[(\S+)\] sched: _slurm_rpc_job_step_create: StepId=(\S+).0")
-        cancelled_re = self.params.get("job_cancelled_regexp","\[(\S+)\] job (\S+) cancelled from interactive user")
-        stepcomplete_re = self.params.get("step_complete_regexp","\[(\S+)\] sched: _slurm_rpc_step_complete StepId=(\S+).0")
-        #[2013-04-21T16:14:47] _slurm_rpc_submit_batch_job JobId=618921 usec=12273
-
-        m = re.search(submit_re,entry)
-        if m is not None:
-            dt = _getDateTime(m.group(1))
-            #DEFAULTYEAR=datetime.datetime.now(tz=ipf.dt.localtzoffset())
-            #dt = dateutil.parser.parse(m.group(1),default=DEFAULTYEAR)
+        if self.log_dispatcher is None:
+            self.log_dispatcher = _LogDispatcher(self)
+        event = self.log_dispatcher.match(entry)
+        if event is None:
+            return
+        (event_type,time_str,job_id) = event
 
-            job_id = m.group(2)
+        #[2013-04-21T16:14:47] _slurm_rpc_submit_batch_job JobId=618921 usec=12273
+        if event_type == _LogDispatcher.SUBMIT:
             activity = self._getActivity(job_id)
             activity.State = [computing_activity.ComputingActivity.STATE_PENDING]
-            activity.SubmissionTime = _getDateTime(m.group(1))
+            activity.SubmissionTime = _getDateTime(time_str)
             activity.ComputingManagerSubmissionTime = activity.SubmissionTime
             # in case scontrol has more info than just at submit time
             activity.StartTime = None
             activity.EndTime = None
             activity.ComputingManagerEndTime = None
-            if self._includeQueue(activity.Queue):
+            if self._includeActivity(activity):
                 self.output(activity)
             return
 
         #[2013-04-21T11:51:52] sched: _slurm_rpc_job_step_create: StepId=617701.0 c410-[603,701,803,904] usec=477
-        m = re.search(stepcreate_re,entry)
-        if m is not None:
-            dt = _getDateTime(m.group(1))
-            job_id = m.group(2)
+        if event_type == _LogDispatcher.STEP_CREATE:
             activity = self._getActivity(job_id)
             activity.State = [computing_activity.ComputingActivity.STATE_RUNNING]
-            activity.StartTime = _getDateTime(m.group(1))
+            activity.StartTime = _getDateTime(time_str)
             # in case scontrol has more info than just at submit time
             activity.EndTime = None
             activity.ComputingManagerEndTime = None
-            if self._includeQueue(activity.Queue):
+            if self._includeActivity(activity):
                 self.output(activity)
             return
 
         #[2013-04-21T16:10:43] Job 618861 cancelled from interactive user
-        m = re.search(cancelled_re,entry)
-        if m is not None:
-            dt = _getDateTime(m.group(1))
-            job_id = m.group(2)
+        if event_type == _LogDispatcher.CANCELLED:
             activity = self._getActivity(job_id)
             activity.State = [computing_activity.ComputingActivity.STATE_TERMINATED]
-            activity.StartTime = _getDateTime(m.group(1))
-            if self._includeQueue(activity.Queue):
+            activity.StartTime = _getDateTime(time_str)
+            if self._includeActivity(activity):
                 self.output(activity)
             if job_id in self.activities:
                 del self.activities[job_id]
             return
 
         #[2013-04-21T11:51:53] sched: _slurm_rpc_step_complete StepId=617701.0 usec=43
-        m = re.search(stepcomplete_re,entry)
-        if m is not None:
-            dt = _getDateTime(m.group(1))
-            job_id = m.group(2)
+        if event_type == _LogDispatcher.STEP_COMPLETE:
             activity = self._getActivity(job_id)
-            if len(activity.State) > 0 and \
-               activity.State[0] == computing_activity.ComputingActivity.STATE_TERMINATED:
-                return
-            activity.State = [computing_activity.ComputingActivity.STATE_FINISHED]
-            activity.EndTime = _getDateTime(m.group(1))
-            activity.ComputingManagerEndTime = activity.EndTime
-            if self._includeQueue(activity.Queue):
-                self.output(activity)
-            if job_id in self.activities:
-                del self.activities[job_id]
+            # a cancelled job stays cancelled - for a job that hasn't been queried yet, decide once it has been
+            self._whenKnown(activity,["State"],lambda activity: self._stepComplete(activity,job_id,time_str))
+            return
+
+    def _stepComplete(self, activity, job_id, time_str):
+        if len(activity.State) > 0 and \
+           activity.State[0] == computing_activity.ComputingActivity.STATE_TERMINATED:
             return
+        activity.State = [computing_activity.ComputingActivity.STATE_FINISHED]
+        activity.EndTime = _getDateTime(time_str)
+        activity.ComputingManagerEndTime = activity.EndTime
+        if self._includeActivity(activity):
+            self.output(activity)
+        if job_id in self.activities:
+            del self.activities[job_id]
 
     def _getActivity(self, job_id):
         try:
-            activity = self.activities[job_id]
+            activity = self._findActivity(job_id)
             # activity will be modified - update creation time
             activity.CreationTime = datetime.datetime.now(ipf.dt.tzoffset(0))
         except KeyError:
+            if self.lookup is not None:
+                return self.lookup.get(job_id)
             scontrol = self.params.get("scontrol","scontrol")
             showjob = self.params.get("showjob","show job")
             cmd = scontrol + " " +showjob+" "+job_id
@@ -387,10 +822,40 @@ class ComputingActivityUpdateStep(computing_activity.ComputingActivityUpdateStep
                 activity = computing_activity.ComputingActivity()
                 activity.LocalIDFromManager = job_id
             else:
-                activity = _getJob(self,output,self.params)
+                if self.job_parser is None:
+                    self.job_parser = _JobParser(self)
+                activity = self.job_parser.parse(output)
             self.activities[activity.LocalIDFromManager] = activity
         return activity
 
+    def _logFilter(self):
+        return _LogDispatcher(self)
+
+    def _queryActivities(self, job_ids):
+        scontrol = self.params.get("scontrol","scontrol")
+        showjob = self.params.get("showjob","show job")
+        if len(job_ids) == 1:
+            cmd = scontrol + " " + showjob + " " + job_ids[0]
+        else:
+            # one query for all jobs is much cheaper than a query per job
+            cmd = scontrol + " " + showjob
+        self.debug("running "+cmd)
+        status, output = subprocess.getstatusoutput(cmd)
+        if status != 0:
+            self.warning("scontrol failed: "+output+"\n")
+            return {}
+        if self.job_parser is None:
+            self.job_parser = _JobParser(self)
+        wanted = set(job_ids)
+        activities = {}
+        for job_str in output.split("\n\n"):
+            m = _job_id.search(job_str)
+            if m is None or m.group(1) not in wanted:
+                continue
+            activity = self.job_parser.parse(job_str)
+            activities[activity.LocalIDFromManager] = activity
+        return activities
+
 #######################################################################################################################
 
 class ComputingSharesStep(computing_share.ComputingSharesStep):
@@ -409,8 +874,13 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
         self._acceptParameter("ReservationName","Regular Expression to parse ReservationName (default 'ReservationName=(\S+)')",False)
         self._acceptParameter("NodCnt","Regular Expression to parse NodCnt (default 'NodCnt=(\S+)')",False)
         self._acceptParameter("State","Regular Expression to parse State (default 'State=(\S+)')",False)
+        self._acceptParameter("json","read the JSON output of scontrol (SLURM 23.02 or later) instead of its text. The regular expression parameters are then not used. (default false)",False)
+        self._acceptParameter("cache_ttl","the number of seconds that the output of scontrol commands is shared with other steps (default 10, 0 to not share it)",False)
 
     def _run(self):
+        if self.params.get("json",False):
+            return self._runJson()
+
         # create shares for partitions
         scontrol = self.params.get("scontrol","scontrol")
         PartitionName = self.params.get("PartitionName","PartitionName=(\S+)")
@@ -423,22 +893,15 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
         NodCnt = self.params.get("NodCnt","NodCnt=(\S+)")
         State = self.params.get("State","State=(\S+)")
 
-        cmd = scontrol + " show partition"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        partition_strs = output.split("\n\n")
+        partition_cmd = scontrol + " show partition"
+        reservation_cmd = scontrol + " show reservation"
+        outputs = _runCommands(self,[partition_cmd,reservation_cmd])
+
+        partition_strs = _readOutput(outputs[partition_cmd]).split("\n\n")
         partitions = [share for share in map(self._getShare,partition_strs) if self._includeQueue(share.Name)]
 
         # create shares for reservations
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show reservation"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        reservation_strs = output.split("\n\n")
+        reservation_strs = _readOutput(outputs[reservation_cmd]).split("\n\n")
         try:
             reservations = [self.includeQueue(share.PartitionName) for share in list(map(self._getReservation,reservation_strs))]
         except:
@@ -494,6 +957,71 @@ class ComputingSharesStep(computing_share.ComputingSharesStep):
         share.EnvironmentID = ["urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % (share.Name,self.resource_name)]
         return share
 
+    def _runJson(self):
+        scontrol = self.params.get("scontrol","scontrol")
+        partition_cmd = scontrol + " --json show partition"
+        reservation_cmd = scontrol + " --json show reservation"
+        outputs = _runCommands(self,[partition_cmd,reservation_cmd])
+
+        partitions = [share for share in map(self._getShareJson,_readJsonFile(outputs[partition_cmd],"partitions"))
+                      if self._includeQueue(share.Name)]
+        reservations = [self._getReservationJson(rsrv_doc) for rsrv_doc in
+                        _readJsonFile(outputs[reservation_cmd],"reservations")
+                        if self._includeQueue(rsrv_doc.get("partition"))]
+
+        self.debug("returning "+ str(partitions + reservations))
+        return partitions + reservations
+
+    def _getShareJson(self, partition_doc):
+        share = computing_share.ComputingShare()
+        share.Name = partition_doc["name"]
+        share.MappingQueue = share.Name
+
+        maximums = partition_doc.get("maximums",{})
+        defaults = partition_doc.get("defaults",{})
+        max_nodes = _jsonNumber(maximums.get("nodes"))
+        if max_nodes is not None:
+            share.MaxSlotsPerJob = max_nodes
+        max_memory = _jsonNumber(maximums.get("partition_memory_per_node"))
+        if max_memory is not None:
+            share.MaxMainMemory = max_memory
+        default_time = _jsonNumber(defaults.get("time"))  # minutes
+        if default_time is not None:
+            share.DefaultWallTime = default_time * 60
+        max_time = _jsonNumber(maximums.get("time"))      # minutes
+        if max_time is not None:
+            share.MaxWallTime = max_time * 60
+
+        if "UP" in _jsonFlags(partition_doc.get("partition",{}).get("state")):
+            share.ServingState = "production"
+        else:
+            share.ServingState = "closed"
+
+        share.EnvironmentID = ["urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % (share.Name,self.resource_name)]
+        return share
+
+    def _getReservationJson(self, rsrv_doc):
+        share = computing_share.ComputingShare()
+        share.Extension["Reservation"] = True
+
+        share.Name = rsrv_doc["name"]
+        share.EnvironmentID = ["urn:ogf:glue2:xsede.org:ExecutionEnvironment:%s.%s" % (share.Name,self.resource_name)]
+        share.MappingQueue = rsrv_doc.get("partition") or None
+        node_count = _jsonNumber(rsrv_doc.get("node_count"))
+        if node_count is not None:
+            share.MaxSlotsPerJob = node_count
+
+        start_time = _jsonDateTime(rsrv_doc.get("start_time"))
+        end_time = _jsonDateTime(rsrv_doc.get("end_time"))
+        now = datetime.datetime.now(_local_tz)
+        if start_time is not None and start_time > now:
+            share.ServingState = "queueing"
+        elif end_time is not None and end_time <= now:
+            share.ServingState = "closed"
+        else:
+            share.ServingState = "production"
+        return share
+
     def _getReservation(self, rsrv_str):
         share = computing_share.ComputingShare()
         share.Extension["Reservation"] = True
@@ -541,68 +1069,37 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
         self._acceptParameter("NodeCnt","Regular Expression to parse NodeCnt (default 'NodeCnt=(\S+)')",False)
         self._acceptParameter("Nodes","Regular Expression to parse Nodes (default 'Nodes=(\S+)')",False)
         self._acceptParameter("State","Regular Expression to parse State (default 'State=(\S+)')",False)
+        self._acceptParameter("json","read the JSON output of scontrol (SLURM 23.02 or later) instead of its text. The regular expression parameters are then not used. (default false)",False)
+        self._acceptParameter("cache_ttl","the number of seconds that the output of scontrol commands is shared with other steps (default 10, 0 to not share it)",False)
 
     def _run(self):
-
-
-        # get info on the nodes
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show node -d"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        node_strs = output.split("\n\n")
-        nodes = list(filter(self._goodHost,list(map(self._getNode,node_strs))))
-
-        # ignore partitions for now since a node can be part of more than one of them (plus a reservation)
-        # create environments for partitions
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show partition"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        partition_strs = output.split("\n\n")
-        try:
-            partitions = [share for share in map(self._getPartition,partition_strs) if self._includeQueue(share.Name)]
-            #partitions = [self._includeQueue(share.Name) for share in list(map(self._getPartition,partition_strs))]
-        except Exception as err:
-            partitions = []
-
-        # create environments for reservations
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show reservation"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        reservation_strs = output.split("\n\n")
-        try:
-            #reservations = map(self._getReservation,reservation_strs)
-            #reservations = [self.includeQueue(share.PartitionName) for share in list(map(self._getReservation,reservation_strs))]
-            reservations = [share for share in map(self._getReservation,reservation_strs) if self._includeQueue(share.PartitionName)]
-        except Exception as err:
-            reservations = []
+        if self.params.get("json",False):
+            (nodes,partitions,reservations) = _readEnvironmentsJson(self,execution_environment.ExecutionEnvironment)
+        else:
+            (nodes,partitions,reservations) = self._readEnvironments()
 
         node_map = {}
         for node in nodes:
             node_map[node.Name] = node
+        counted = HostList()    # names that have been counted
         for seq in (partitions,reservations):
           for exec_env in seq:
             try:
-                node_names = exec_env.Extension["Nodes"]
+                host_list = exec_env.Extension["Nodes"]
             except KeyError:
                 continue
 
             # in case a node is in multiple active reservations
-            node_names = [node_name for node_name in node_names if node_name in node_map]
+            host_list = host_list - counted
+            counted = counted | host_list
+            env_nodes = [node for node in map(node_map.get,host_list) if node is not None]
 
             # in case all of the nodes in the reservation have already been counted
-            if len(node_names) == 0:
+            if len(env_nodes) == 0:
+                del exec_env.Extension["Nodes"]
                 continue
 
-            example_node = node_map[node_names[0]]
+            example_node = env_nodes[0]
 
             exec_env.ConnectivityIn = example_node.ConnectivityIn
             exec_env.ConnectivityOut = example_node.ConnectivityOut
@@ -612,18 +1109,19 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
             if "AvailableFeatures" in example_node.Extension and example_node.Extension["AvailableFeatures"] is not None and example_node.Extension["AvailableFeatures"] != "(null)":
                 exec_env.Extension["AvailableFeatures"] = example_node.Extension["AvailableFeatures"]
 
-            exec_env.PhysicalCPUs = sum([node_map[node_name].PhysicalCPUs for node_name in node_names]) / len(node_names)
-            exec_env.LogicalCPUs = sum([node_map[node_name].LogicalCPUs for node_name in node_names]) / len(node_names)
-            exec_env.MainMemorySize = sum([node_map[node_name].MainMemorySize for node_name in node_names]) / len(node_names)
-            exec_env.TotalInstances = len(node_names)
-            exec_env.UsedInstances = sum([node_map[node_name].UsedInstances for node_name in node_names])
-            exec_env.UnavailableInstances = sum([node_map[node_name].UnavailableInstances for node_name in node_names])
-            # remove nodes that are part of a current reservation so that they aren't counted twice
-            for node_name in node_names:
-                try:
-                    del node_map[node_name]
-                except KeyError:
-                    self.warning("didn't find %s in remaining nodes" % node_name)
+            physical_cpus = logical_cpus = memory = used = unavailable = 0
+            for node in env_nodes:
+                physical_cpus += node.PhysicalCPUs
+                logical_cpus += node.LogicalCPUs
+                memory += node.MainMemorySize
+                used += node.UsedInstances
+                unavailable += node.UnavailableInstances
+            exec_env.PhysicalCPUs = physical_cpus / len(env_nodes)
+            exec_env.LogicalCPUs = logical_cpus / len(env_nodes)
+            exec_env.MainMemorySize = memory / len(env_nodes)
+            exec_env.TotalInstances = len(env_nodes)
+            exec_env.UsedInstances = used
+            exec_env.UnavailableInstances = unavailable
 
             # don't need to publish the node names
             del exec_env.Extension["Nodes"]
@@ -632,6 +1130,37 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
         #return reservations + partitions + self._groupHosts(list(node_map.values()))
         return reservations + partitions 
 
+    def _readEnvironments(self):
+        scontrol = self.params.get("scontrol","scontrol")
+        node_cmd = scontrol + " show node -d"
+        partition_cmd = scontrol + " show partition"
+        reservation_cmd = scontrol + " show reservation"
+        outputs = _runCommands(self,[node_cmd,partition_cmd,reservation_cmd])
+
+        # get info on the nodes
+        node_strs = _readOutput(outputs[node_cmd]).split("\n\n")
+        nodes = list(filter(self._goodHost,list(map(self._getNode,node_strs))))
+
+        # ignore partitions for now since a node can be part of more than one of them (plus a reservation)
+        # create environments for partitions
+        partition_strs = _readOutput(outputs[partition_cmd]).split("\n\n")
+        try:
+            partitions = [share for share in map(self._getPartition,partition_strs) if self._includeQueue(share.Name)]
+            #partitions = [self._includeQueue(share.Name) for share in list(map(self._getPartition,partition_strs))]
+        except Exception as err:
+            partitions = []
+
+        # create environments for reservations
+        reservation_strs = _readOutput(outputs[reservation_cmd]).split("\n\n")
+        try:
+            #reservations = map(self._getReservation,reservation_strs)
+            #reservations = [self.includeQueue(share.PartitionName) for share in list(map(self._getReservation,reservation_strs))]
+            reservations = [share for share in map(self._getReservation,reservation_strs) if self._includeQueue(share.PartitionName)]
+        except Exception as err:
+            reservations = []
+
+        return (nodes,partitions,reservations)
+
     def _getNode(self, node_str):
         node = execution_environment.ExecutionEnvironment()
         NodeName = self.params.get("NodeName","NodeName=(\S+)")
@@ -662,33 +1191,18 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
             node.Extension["AvailableFeatures"] = m.group(1)
         m = re.search(State,node_str)
         if m is not None:
-            node.TotalInstances = 1
-            state = m.group(1)
-            if "IDLE" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 0
-            elif "ALLOCATED" in state:
-                node.UsedInstances = 1
-                node.UnavailableInstances = 0
-            elif "DOWN" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
-            elif "MAINT" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
-            elif "RESERVED" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 0
-            elif "MIXED" in state:
-                node.UsedInstances = 1
-                node.UnavailableInstances = 0
-            else:
-                self.warning("unknown node state: %s",state)
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
+            _setNodeState(self,node,m.group(1))
 
         return node
 
+    def _getNodeJson(self, node_doc):
+        node = execution_environment.ExecutionEnvironment()
+        _setNodeJson(self,node,node_doc)
+        features = _jsonList(node_doc.get("features"))
+        if features:
+            node.Extension["AvailableFeatures"] = features
+        return node
+
     # ExecutionEnvironment get partition
     def _getPartition(self, partition_str):
         partition = execution_environment.ExecutionEnvironment()
@@ -707,7 +1221,7 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
 
         m = re.search(Nodes,partition_str)
         if m is not None and m.group(1) != "(null)":
-            partition.Extension["Nodes"] = self._expandNames(m.group(1))
+            partition.Extension["Nodes"] = HostList(m.group(1))
 
         return partition
 
@@ -743,7 +1257,7 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
         m = re.search(Nodes,rsrv_str)
         if m is not None:
             if m.group(1) != "(null)":
-                rsrv.Extension["Nodes"] = self._expandNames(m.group(1))
+                rsrv.Extension["Nodes"] = HostList(m.group(1))
 
         m = re.search(State,rsrv_str)
         if m is not None:
@@ -753,38 +1267,6 @@ class ExecutionEnvironmentsStep(execution_environment.ExecutionEnvironmentsStep)
 
         return rsrv
 
-    def _expandNames(self, expr):
-        exprs = self._splitCommas(expr)
-        if len(exprs) > 1:
-            return list(itertools.chain.from_iterable(list(map(self._expandNames,exprs))))
-        m = re.search("^(\S+)\[(\S+)\]$",expr)
-        if m is not None:
-            prefix = m.group(1)
-            suffixes = self._expandNames(m.group(2))
-            return [prefix+suffix for suffix in suffixes]
-        m = re.search("^(\d+)-(\d+)$",expr)
-        if m is not None:
-            # don't drop any leading 0s
-            pattern = "%%0%dd" % len(m.group(1))
-            return [pattern % num for num in range(int(m.group(1)),int(m.group(2))+1)]
-        return [expr]
-
-    def _splitCommas(self, expr):
-        exprs = []
-        start_pos = 0
-        depth = 0
-        for pos in range(len(expr)):
-            if expr[pos] == "[":
-                depth += 1
-            elif expr[pos] == "]":
-                depth -= 1
-            elif expr[pos] == ",":
-                if depth == 0:
-                    exprs.append(expr[start_pos:pos])
-                    start_pos = pos + 1
-        exprs.append(expr[start_pos:])
-        return exprs
-
 #######################################################################################################################
 
 class ComputingManagerAcceleratorInfoStep(computing_manager_accel_info.ComputingManagerAcceleratorInfoStep):
@@ -840,67 +1322,38 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
         self._acceptParameter("RealMemory","Regular Expression to parse RealMemory (default 'RealMemory=(\S+)')",False)
         self._acceptParameter("Gres","Regular Expression to parse Gres (default 'Gres=(\S+)')",False)
         self._acceptParameter("GresUsed","Regular Expression to parse GresUsed (default 'GresUsed=(\S+)')",False)
+        self._acceptParameter("json","read the JSON output of scontrol (SLURM 23.02 or later) instead of its text. The regular expression parameters are then not used. (default false)",False)
+        self._acceptParameter("cache_ttl","the number of seconds that the output of scontrol commands is shared with other steps (default 10, 0 to not share it)",False)
 
     def _run(self):
-        # get info on the nodes
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show node -d"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        node_strs = output.split("\n\n")
-        nodes = list(filter(self._goodHost,list(map(self._getNode,node_strs))))
-
-        # ignore partitions for now since a node can be part of more than one of them (plus a reservation)
-        # create environments for partitions
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show partition"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        partition_strs = output.split("\n\n")
-        try:
-            partitions = [share for share in map(self._getPartition,partition_strs) if self._includeQueue(share.Name)]
-            #partitions = [self._includeQueue(share.Name) for share in list(map(self._getPartition,partition_strs))]
-        except Exception as err:
-            partitions = []
-
-
-        # create environments for reservations
-        scontrol = self.params.get("scontrol","scontrol")
-        cmd = scontrol + " show reservation"
-        self.debug("running "+cmd)
-        status, output = subprocess.getstatusoutput(cmd)
-        if status != 0:
-            raise StepError("scontrol failed: "+output+"\n")
-        reservation_strs = output.split("\n\n")
-        try:
-            #reservations = map(self._getReservation,reservation_strs)
-            reservations = [self.includeQueue(share.PartitionName) for share in list(map(self._getReservation,reservation_strs))]
-        except:
-            reservations = []
+        if self.params.get("json",False):
+            (nodes,partitions,reservations) = _readEnvironmentsJson(self,accelerator_environment.AcceleratorEnvironment)
+        else:
+            (nodes,partitions,reservations) = self._readEnvironments()
 
         self.debug("number of reservations "+str(len(reservations)))
         node_map = {}
         for node in nodes:
             node_map[node.Name] = node
+        counted = HostList()    # names that have been counted
         for seq in (partitions,reservations):
           for accel_env in seq:
             try:
-                node_names = accel_env.Extension["Nodes"]
+                host_list = accel_env.Extension["Nodes"]
             except KeyError:
                 continue
-            self.debug("size of node map before defining"+str(len(node_map)))
+            self.debug("size of node map before defining"+str(len(node_map)-len(counted)))
             # in case a node is in multiple active reservations
-            node_names = [node_name for node_name in node_names if node_name in node_map]
+            host_list = host_list - counted
+            counted = counted | host_list
+            env_nodes = [node for node in map(node_map.get,host_list) if node is not None]
 
             # in case all of the nodes in the reservation have already been counted
-            if len(node_names) == 0:
+            if len(env_nodes) == 0:
+                del accel_env.Extension["Nodes"]
                 continue
 
-            example_node = node_map[node_names[0]]
+            example_node = env_nodes[0]
 
             accel_env.ConnectivityIn = example_node.ConnectivityIn
             accel_env.ConnectivityOut = example_node.ConnectivityOut
@@ -908,31 +1361,64 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
             accel_env.OSVersion = example_node.OSVersion
             accel_env.Platform = example_node.Platform
 
-            accel_env.PhysicalCPUs = sum([node_map[node_name].PhysicalCPUs for node_name in node_names]) / len(node_names)
-            accel_env.PhysicalAccelerators = sum([node_map[node_name].PhysicalAccelerators for node_name in node_names]) / len(node_names)
-            accel_env.UsedAcceleratorSlots = sum([node_map[node_name].UsedAcceleratorSlots for node_name in node_names]) / len(node_names)
+            physical_cpus = accelerators = used_slots = memory = used = unavailable = 0
+            for node in env_nodes:
+                physical_cpus += node.PhysicalCPUs
+                accelerators += node.PhysicalAccelerators
+                used_slots += node.UsedAcceleratorSlots
+                memory += node.MainMemorySize
+                used += node.UsedInstances
+                unavailable += node.UnavailableInstances
+            accel_env.PhysicalCPUs = physical_cpus / len(env_nodes)
+            accel_env.PhysicalAccelerators = accelerators / len(env_nodes)
+            accel_env.UsedAcceleratorSlots = used_slots / len(env_nodes)
             #exec_env.LogicalAccelerators = sum(map(lambda node_name: node_map[node_name].LogicalAccelerators,
                                            #node_names)) / len(node_names)
-            accel_env.MainMemorySize = sum([node_map[node_name].MainMemorySize for node_name in node_names]) / len(node_names)
-            accel_env.TotalInstances = len(node_names)
-            accel_env.UsedInstances = sum([node_map[node_name].UsedInstances for node_name in node_names])
-            accel_env.UnavailableInstances = sum([node_map[node_name].UnavailableInstances for node_name in node_names])
-            # remove nodes that are part of a current reservation so that they aren't counted twice
-            for node_name in node_names:
-                try:
-                    del node_map[node_name]
-                except KeyError:
-                    self.warning("didn't find %s in remaining nodes" % node_name)
+            accel_env.MainMemorySize = memory / len(env_nodes)
+            accel_env.TotalInstances = len(env_nodes)
+            accel_env.UsedInstances = used
+            accel_env.UnavailableInstances = unavailable
 
             # don't need to publish the node names
             del accel_env.Extension["Nodes"]
 
         # group up nodes that aren't part of a current reservation
-        self.debug("size of node map "+str(len(node_map)))
+        self.debug("size of node map "+str(len(node_map)-len(counted)))
  
         #return partitions + reservations + self._groupHosts(list(node_map.values()))
         return partitions + reservations
 
+    def _readEnvironments(self):
+        scontrol = self.params.get("scontrol","scontrol")
+        node_cmd = scontrol + " show node -d"
+        partition_cmd = scontrol + " show partition"
+        reservation_cmd = scontrol + " show reservation"
+        outputs = _runCommands(self,[node_cmd,partition_cmd,reservation_cmd])
+
+        # get info on the nodes
+        node_strs = _readOutput(outputs[node_cmd]).split("\n\n")
+        nodes = list(filter(self._goodHost,list(map(self._getNode,node_strs))))
+
+        # ignore partitions for now since a node can be part of more than one of them (plus a reservation)
+        # create environments for partitions
+        partition_strs = _readOutput(outputs[partition_cmd]).split("\n\n")
+        try:
+            partitions = [share for share in map(self._getPartition,partition_strs) if self._includeQueue(share.Name)]
+            #partitions = [self._includeQueue(share.Name) for share in list(map(self._getPartition,partition_strs))]
+        except Exception as err:
+            partitions = []
+
+
+        # create environments for reservations
+        reservation_strs = _readOutput(outputs[reservation_cmd]).split("\n\n")
+        try:
+            #reservations = map(self._getReservation,reservation_strs)
+            reservations = [self.includeQueue(share.PartitionName) for share in list(map(self._getReservation,reservation_strs))]
+        except:
+            reservations = []
+
+        return (nodes,partitions,reservations)
+
     def _getNode(self, node_str):
         node = accelerator_environment.AcceleratorEnvironment()
 
@@ -960,70 +1446,58 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
         #AcceleratorEnvironment:
         m = re.search(Gres,node_str)
         if m is not None:
-            greslist=[]
-            #greslist = split(":",m.group(1))
-            greslist = m.group(1).split(":")
-            if len(greslist) == 2:
-                node.PhysicalAccelerators = int(greslist[1])
-                print(node.PhysicalAccelerators)
-                node.Type = ""
-            elif len(greslist) == 3:
-                node.PhysicalAccelerators = int(greslist[2])
-                node.Type = greslist[1] 
-            elif len(greslist) >= 3:
-                endindex = greslist[2].find("(")
-                if endindex == -1:
-                    node.PhysicalAccelerators = int(greslist[-1])
-                else:
-                    pa = greslist[2][:endindex]
-                    node.PhysicalAccelerators = int(pa)
-                node.Type = greslist[1]
+            self._setGres(node,m.group(1))
         m = re.search(GresUsed,node_str)
         if m is not None:
-            greslist=[]
-            #greslist = split(":",m.group(1))
-            greslist = m.group(1).split(":")
-            if len(greslist) == 2:
-                node.UsedAcceleratorSlots = int(greslist[1])
-                node.Type = ""
-            elif len(greslist) >= 3:
-                endindex = greslist[2].find("(")
-                if endindex == -1:
-                    node.UsedAcceleratorSlots = int(greslist[-1])
-                else:
-                    uas = greslist[2][:endindex]
-                    node.UsedAcceleratorSlots = int(uas)
-                node.Type = greslist[1]
+            self._setGresUsed(node,m.group(1))
                 
         m = re.search(State,node_str)
         if m is not None:
-            node.TotalInstances = 1
-            state = m.group(1)
-            if "IDLE" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 0
-            elif "ALLOCATED" in state:
-                node.UsedInstances = 1
-                node.UnavailableInstances = 0
-            elif "DOWN" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
-            elif "MAINT" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
-            elif "RESERVED" in state:
-                node.UsedInstances = 0
-                node.UnavailableInstances = 0
-            elif "MIXED" in state:
-                node.UsedInstances = 1
-                node.UnavailableInstances = 0
-            else:
-                self.warning("unknown node state: %s",state)
-                node.UsedInstances = 0
-                node.UnavailableInstances = 1
+            _setNodeState(self,node,m.group(1))
+
+        return node
 
+    def _getNodeJson(self, node_doc):
+        node = accelerator_environment.AcceleratorEnvironment()
+        _setNodeJson(self,node,node_doc)
+        if node_doc.get("gres"):
+            self._setGres(node,node_doc["gres"])
+        if node_doc.get("gres_used"):
+            self._setGresUsed(node,node_doc["gres_used"])
         return node
 
+    def _setGres(self, node, gres):
+        greslist=[]
+        #greslist = split(":",gres)
+        greslist = gres.split(":")
+        if len(greslist) == 2:
+            node.PhysicalAccelerators = int(greslist[1])
+            node.Type = ""
+        elif len(greslist) >= 3:
+            endindex = greslist[2].find("(")
+            if endindex == -1:
+                node.PhysicalAccelerators = int(greslist[-1])
+            else:
+                pa = greslist[2][:endindex]
+                node.PhysicalAccelerators = int(pa)
+            node.Type = greslist[1]
+
+    def _setGresUsed(self, node, gres_used):
+        greslist=[]
+        #greslist = split(":",gres_used)
+        greslist = gres_used.split(":")
+        if len(greslist) == 2:
+            node.UsedAcceleratorSlots = int(greslist[1])
+            node.Type = ""
+        elif len(greslist) >= 3:
+            endindex = greslist[2].find("(")
+            if endindex == -1:
+                node.UsedAcceleratorSlots = int(greslist[-1])
+            else:
+                uas = greslist[2][:endindex]
+                node.UsedAcceleratorSlots = int(uas)
+            node.Type = greslist[1]
+
     # not being used right now
     def _getPartition(self, partition_str):
         partition = accelerator_environment.AcceleratorEnvironment()
@@ -1043,7 +1517,7 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
 
         m = re.search(Nodes,partition_str)
         if m is not None and m.group(1) != "(null)":
-            partition.Extension["Nodes"] = self._expandNames(m.group(1))
+            partition.Extension["Nodes"] = HostList(m.group(1))
 
         return partition
 
@@ -1078,7 +1552,7 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
         m = re.search(Nodes,rsrv_str)
         if m is not None:
             if m.group(1) != "(null)":
-                rsrv.Extension["Nodes"] = self._expandNames(m.group(1))
+                rsrv.Extension["Nodes"] = HostList(m.group(1))
 
         m = re.search(State,rsrv_str)
         if m is not None:
@@ -1088,36 +1562,4 @@ class AcceleratorEnvironmentsStep(accelerator_environment.AcceleratorEnvironment
 
         return rsrv
 
-    def _expandNames(self, expr):
-        exprs = self._splitCommas(expr)
-        if len(exprs) > 1:
-            return list(itertools.chain.from_iterable(list(map(self._expandNames,exprs))))
-        m = re.search("^(\S+)\[(\S+)\]$",expr)
-        if m is not None:
-            prefix = m.group(1)
-            suffixes = self._expandNames(m.group(2))
-            return [prefix+suffix for suffix in suffixes]
-        m = re.search("^(\d+)-(\d+)$",expr)
-        if m is not None:
-            # don't drop any leading 0s
-            pattern = "%%0%dd" % len(m.group(1))
-            return [pattern % num for num in range(int(m.group(1)),int(m.group(2))+1)]
-        return [expr]
-
-    def _splitCommas(self, expr):
-        exprs = []
-        start_pos = 0
-        depth = 0
-        for pos in range(len(expr)):
-            if expr[pos] == "[":
-                depth += 1
-            elif expr[pos] == "]":
-                depth -= 1
-            elif expr[pos] == ",":
-                if depth == 0:
-                    exprs.append(expr[start_pos:pos])
-                    start_pos = pos + 1
-        exprs.append(expr[start_pos:])
-        return exprs
-
 #######################################################################################################################
@@ -1,5 +1,7 @@
-
 import configparser
+import fnmatch
+import re
+import subprocess
 
 from ipf.step import Step
 
@@ -8,6 +10,37 @@ from ipf.step import Step
 class GlueStep(Step):
     def __init__(self):
         Step.__init__(self)
+        self.queue_filter = None
+        self.partition_filter = None
+        self.snapshot_cls = None
+        self.scheduler_snapshot = None
+
+    def _acceptSnapshotParameter(self, snapshot_cls):
+        """Lets the step read scheduler output from a snapshot_cls (the SchedulerSnapshot of its scheduler)."""
+        self.snapshot_cls = snapshot_cls
+        self._acceptParameter("scheduler_snapshot",
+                              "read the output of scheduler commands from the SchedulerSnapshot of the scheduler instead of running them (default false)",
+                              False)
+
+    def _setParameters(self, step_params, workflow_params):
+        Step._setParameters(self,step_params,workflow_params)
+        if self.snapshot_cls is not None and self.params.get("scheduler_snapshot",False):
+            if self.snapshot_cls not in self.requires:
+                self.requires.append(self.snapshot_cls)
+
+    def reset(self):
+        Step.reset(self)
+        self.scheduler_snapshot = None
+
+    def _query(self, name, cmd):
+        """Returns the (status, output) of a scheduler command, from the scheduler snapshot if one is used."""
+        if not self.params.get("scheduler_snapshot",False):
+            self.debug("running "+cmd)
+            return subprocess.getstatusoutput(cmd)
+        if self.scheduler_snapshot is None:
+            self.scheduler_snapshot = self._getInput(self.snapshot_cls)
+        self.debug("using the output of %s from the scheduler snapshot",name)
+        return self.scheduler_snapshot.getOutput(name)
 
     def _includeQueue(self, queue_name, no_queue_name_return=False):
         if queue_name == None:
@@ -20,20 +53,9 @@ class GlueStep(Step):
         except KeyError:
             return True
 
-        toks = expression.split()
-        goodSoFar = False
-        for tok in toks:
-            if tok[0] == '+':
-                queue = tok[1:]
-                if (queue == "*") or (queue == queue_name):
-                    goodSoFar = True
-            elif tok[0] == '-':
-                queue = tok[1:]
-                if (queue == "*") or (queue == queue_name):
-                    goodSoFar = False
-            else:
-                self.warning("can't parse part of Queues expression: "+tok)
-        return goodSoFar
+        if self.queue_filter is None or self.queue_filter.expression != expression:
+            self.queue_filter = NameFilter(expression,"Queues",self.warning)
+        return self.queue_filter.include(queue_name)
 
     def _includePartition(self, partition_name, no_partition_name_return=False):
         if partition_name == None:
@@ -46,17 +68,60 @@ class GlueStep(Step):
         except KeyError:
             return True
 
-        toks = expression.split()
-        goodSoFar = False
-        for tok in toks:
+        if self.partition_filter is None or self.partition_filter.expression != expression:
+            self.partition_filter = NameFilter(expression,"Partitions",self.warning)
+        return self.partition_filter.include(partition_name)
+
+#######################################################################################################################
+
+class NameFilter(object):
+    """A compiled queue or partition expression such as "+* -debug -gpu-*".
+
+    Each token adds (+) or removes (-) the names that match it, in order. A token is a name, * for all names, or a
+    glob pattern. Whether a name is included is remembered, since the same few names are checked for every job.
+    """
+
+    MAX_NAMES = 10000
+
+    def __init__(self, expression, description="Queues", warning=None):
+        self.expression = expression
+        self.tokens = []    # (include, name or None, pattern or None)
+        for tok in expression.split():
             if tok[0] == '+':
-                partition = tok[1:]
-                if (partition == "*") or (partition == partition_name):
-                    goodSoFar = True
+                include = True
             elif tok[0] == '-':
-                partition = tok[1:]
-                if (partition == "*") or (partition == partition_name):
-                    goodSoFar = False
+                include = False
+            else:
+                if warning is not None:
+                    warning("can't parse part of %s expression: %s",description,tok)
+                continue
+            name = tok[1:]
+            if name == "*":
+                self.tokens.append((include,None,None))
+            elif any(c in name for c in "*?["):
+                self.tokens.append((include,None,re.compile(fnmatch.translate(name))))
+            else:
+                self.tokens.append((include,name,None))
+        self.included = {}
+
+    def include(self, name):
+        try:
+            return self.included[name]
+        except KeyError:
+            pass
+        good_so_far = False
+        for (include,tok_name,pattern) in self.tokens:
+            if tok_name is not None:
+                if tok_name == name:
+                    good_so_far = include
+            elif pattern is not None:
+                if pattern.match(name) is not None:
+                    good_so_far = include
             else:
-                self.warning("can't parse part of Partitions expression: "+tok)
-        return goodSoFar
+                good_so_far = include
+        if len(self.included) >= self.MAX_NAMES:
+            self.included.clear()
+        self.included[name] = good_so_far
+        return good_so_far
+
+#######################################################################################################################
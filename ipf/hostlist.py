@@ -0,0 +1,274 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import bisect
+import re
+
+#######################################################################################################################
+
+class HostList(object):
+    """A set of host names, such as those in the SLURM expression c410-[603,701,803-904],gpu[01-04]-ib.
+
+    Names that differ only in a number are kept as ranges of numbers, so the size of a host list, whether a name is
+    in it, and the union, intersection, and difference of host lists are computed without listing every name.
+    Iterating lists the names in order.
+    """
+
+    def __init__(self, expression=None):
+        # (prefix, number of digits, suffix) -> sorted, disjoint, non-adjacent list of [first number, last number]
+        self.ranges = {}
+        self.names = set()    # names without a number
+        if expression:
+            for item in _splitCommas(expression):
+                self._addExpression(item)
+
+    @staticmethod
+    def fromNames(names):
+        host_list = HostList()
+        numbers = {}
+        for name in names:
+            (key,number) = _splitName(name)
+            if key is None:
+                host_list.names.add(name)
+            else:
+                numbers.setdefault(key,[]).append(number)
+        for (key,key_numbers) in numbers.items():
+            host_list.ranges[key] = _toRanges(key_numbers)
+        return host_list
+
+    def add(self, name):
+        (key,number) = _splitName(name)
+        if key is None:
+            self.names.add(name)
+        else:
+            self._addRange(key,number,number)
+
+    def __len__(self):
+        count = len(self.names)
+        for ranges in self.ranges.values():
+            for (first,last) in ranges:
+                count += last - first + 1
+        return count
+
+    def __contains__(self, name):
+        (key,number) = _splitName(name)
+        if key is None:
+            return name in self.names
+        try:
+            ranges = self.ranges[key]
+        except KeyError:
+            return False
+        pos = bisect.bisect_right(ranges,[number,float("inf")]) - 1
+        return pos >= 0 and ranges[pos][1] >= number
+
+    def __iter__(self):
+        for key in sorted(self.ranges):
+            (prefix,digits,suffix) = key
+            name_format = prefix.replace("%","%%") + "%%0%dd" % digits + suffix.replace("%","%%")
+            for (first,last) in self.ranges[key]:
+                for number in range(first,last+1):
+                    yield name_format % number
+        for name in sorted(self.names):
+            yield name
+
+    def __eq__(self, other):
+        return isinstance(other,HostList) and self.ranges == other.ranges and self.names == other.names
+
+    def __or__(self, other):
+        host_list = self._copy()
+        for (key,ranges) in other.ranges.items():
+            for (first,last) in ranges:
+                host_list._addRange(key,first,last)
+        host_list.names |= other.names
+        return host_list
+
+    def __and__(self, other):
+        host_list = HostList()
+        for (key,ranges) in self.ranges.items():
+            if key in other.ranges:
+                common = _intersect(ranges,other.ranges[key])
+                if len(common) > 0:
+                    host_list.ranges[key] = common
+        host_list.names = self.names & other.names
+        return host_list
+
+    def __sub__(self, other):
+        host_list = HostList()
+        for (key,ranges) in self.ranges.items():
+            if key in other.ranges:
+                ranges = _subtract(ranges,other.ranges[key])
+            if len(ranges) > 0:
+                host_list.ranges[key] = [list(r) for r in ranges]
+        host_list.names = self.names - other.names
+        return host_list
+
+    def __str__(self):
+        exprs = []
+        for key in sorted(self.ranges):
+            (prefix,digits,suffix) = key
+            ranges = self.ranges[key]
+            parts = []
+            for (first,last) in ranges:
+                if first == last:
+                    parts.append("%0*d" % (digits,first))
+                else:
+                    parts.append("%0*d-%0*d" % (digits,first,digits,last))
+            if len(parts) == 1 and ranges[0][0] == ranges[0][1]:
+                exprs.append(prefix+parts[0]+suffix)
+            else:
+                exprs.append("%s[%s]%s" % (prefix,",".join(parts),suffix))
+        exprs.extend(sorted(self.names))
+        return ",".join(exprs)
+
+    def __repr__(self):
+        return "HostList(%r)" % str(self)
+
+    def _copy(self):
+        host_list = HostList()
+        host_list.ranges = dict((key,[list(r) for r in ranges]) for (key,ranges) in self.ranges.items())
+        host_list.names = set(self.names)
+        return host_list
+
+    def _addExpression(self, expr):
+        m = _bracket.match(expr)
+        if m is None:
+            self.add(expr)
+            return
+        (prefix,spec,suffix) = m.groups()
+        if "[" in suffix or prefix[-1:].isdigit() or _digits.search(suffix) is not None:
+            # not a simple prefix[numbers]suffix - list the names
+            for number in _splitCommas(spec):
+                for name in _expandRange(number):
+                    self._addExpression(prefix+name+suffix)
+            return
+        for number in spec.split(","):
+            if number.isdigit():
+                first = int(number)
+                self._addRange((prefix,len(number),suffix),first,first)
+                continue
+            (first,last,digits) = _parseRange(number)
+            if digits is None:
+                self.add(prefix+number+suffix)
+                continue
+            # numbers with more digits than the range specifies aren't padded
+            while first <= last:
+                length = max(digits,len(str(first)))
+                end = min(last,10**length-1)
+                self._addRange((prefix,length,suffix),first,end)
+                first = end + 1
+
+    def _addRange(self, key, first, last):
+        ranges = self.ranges.setdefault(key,[])
+        if len(ranges) == 0 or ranges[-1][1] < first - 1:
+            ranges.append([first,last])    # usual case - names are added in order
+            return
+        ranges.append([first,last])
+        ranges.sort()
+        self.ranges[key] = _merge(ranges)
+
+#######################################################################################################################
+
+_bracket = re.compile(r"^([^\[]*)\[([^\]]*)\](.*)$")
+_digits = re.compile(r"\d")
+_name = re.compile(r"^(.*?)(\d+)(\D*)$")
+_commas = re.compile(r",(?![^\[]*\])")
+_range = re.compile(r"^(\d+)(?:-(\d+))?$")
+
+def _splitName(name):
+    # the last number in the name and the rest
+    if name[-1:].isdigit():
+        prefix = name.rstrip("0123456789")
+        return ((prefix,len(name)-len(prefix),""),int(name[len(prefix):]))
+    m = _name.match(name)
+    if m is None:
+        return (None,None)
+    (prefix,number,suffix) = m.groups()
+    return ((prefix,len(number),suffix),int(number))
+
+def _parseRange(expr):
+    m = _range.match(expr)
+    if m is None:
+        return (None,None,None)
+    first = int(m.group(1))
+    if m.group(2) is None:
+        return (first,first,len(m.group(1)))
+    return (first,int(m.group(2)),len(m.group(1)))
+
+def _expandRange(expr):
+    (first,last,digits) = _parseRange(expr)
+    if digits is None:
+        return [expr]
+    # don't drop any leading 0s
+    return ["%0*d" % (digits,number) for number in range(first,last+1)]
+
+def _splitCommas(expr):
+    # at commas that aren't in brackets
+    return _commas.split(expr)
+
+def _toRanges(numbers):
+    numbers.sort()
+    ranges = []
+    for number in numbers:
+        if len(ranges) > 0 and number <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1],number)
+        else:
+            ranges.append([number,number])
+    return ranges
+
+def _merge(ranges):
+    merged = []
+    for (first,last) in ranges:
+        if len(merged) > 0 and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1],last)
+        else:
+            merged.append([first,last])
+    return merged
+
+def _intersect(ranges1, ranges2):
+    common = []
+    i = j = 0
+    while i < len(ranges1) and j < len(ranges2):
+        first = max(ranges1[i][0],ranges2[j][0])
+        last = min(ranges1[i][1],ranges2[j][1])
+        if first <= last:
+            common.append([first,last])
+        if ranges1[i][1] < ranges2[j][1]:
+            i += 1
+        else:
+            j += 1
+    return common
+
+def _subtract(ranges1, ranges2):
+    if len(ranges1) > 0:
+        pos = bisect.bisect_right(ranges2,[ranges1[0][0],float("inf")]) - 1
+        if pos >= 0 and ranges2[pos][1] >= ranges1[-1][1]:
+            return []    # usual case when removing nodes that have been counted - one range covers ranges1
+    remaining = []
+    j = 0
+    for (first,last) in ranges1:
+        while j < len(ranges2) and ranges2[j][1] < first:
+            j += 1
+        k = j
+        while k < len(ranges2) and ranges2[k][0] <= last:
+            if ranges2[k][0] > first:
+                remaining.append([first,ranges2[k][0]-1])
+            first = max(first,ranges2[k][1]+1)
+            k += 1
+        if first <= last:
+            remaining.append([first,last])
+    return remaining
+
+#######################################################################################################################
@@ -15,8 +15,12 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
+import ctypes
+import ctypes.util
 import logging
 import os
+import select
+import struct
 import time
 import stat
 import sys
@@ -30,23 +34,30 @@ logger = logging.getLogger(__name__)
 #######################################################################################################################
 
 class LogFileWatcher(object):
-    def __init__(self, callback, path, posdb_path=None):
+    def __init__(self, callback, path, posdb_path=None, checkpoint_lines=1, checkpoint_interval=None, batch=False):
         self.callback = callback
         self.path = path
+        self.batch = batch
         self.keep_running = True
-        self.pos_db = PositionDB(posdb_path)
+        self.pos_db = PositionDB(posdb_path,checkpoint_lines,checkpoint_interval)
 
     def run(self):
-        file = LogFile(self.path,self.callback,self.pos_db)
+        file = LogFile(self.path,self.callback,self.pos_db,self.batch)
         file.open()
-        while self.keep_running:
-            try:
-                file.handle()
-            except IOError:
-                # try to reopen in case of stale NFS file handle or similar
-                file.reopen()
-                file.handle()
-            time.sleep(1)
+        waiter = _getWaiter(os.path.dirname(os.path.abspath(self.path)),_waitTimeout(self.pos_db),
+                            [os.path.basename(self.path)])
+        try:
+            while self.keep_running:
+                try:
+                    file.handle()
+                except IOError:
+                    # try to reopen in case of stale NFS file handle or similar
+                    file.reopen()
+                    file.handle()
+                waiter.wait()
+        finally:
+            self.pos_db.flush()
+            waiter.close()
         file.close()
 
     def stop(self):
@@ -57,7 +68,7 @@ class LogFileWatcher(object):
 class LogDirectoryWatcher(object):
     """Discovers new lines in log files and sends them to the callback."""
 
-    def __init__(self, callback, dir, posdb_path=None):
+    def __init__(self, callback, dir, posdb_path=None, checkpoint_lines=1, checkpoint_interval=None, batch=False):
         if not os.path.exists(dir):
             raise StepError("%s doesn't exist",dir)
         if not os.path.isdir(dir):
@@ -65,24 +76,43 @@ class LogDirectoryWatcher(object):
 
         self.callback = callback
         self.dir = dir
-        self.pos_db = PositionDB(posdb_path)
+        self.batch = batch
+        self.pos_db = PositionDB(posdb_path,checkpoint_lines,checkpoint_interval)
         self.files = {}
         self.last_update = -1
+        self.scanned = False
 
         logger.info("created watcher for directory %s",dir)
         
     def run(self):
-        while True:
-            self._updateFiles()
-            for file in list(self.files.values()):
-                try:
-                    file.handle()
-                except IOError:
-                    # try to reopen in case of stale NFS file handle or similar
-                    file.reopen()
-                    file.handle()
-            time.sleep(1)
-                        
+        waiter = _getWaiter(self.dir,_waitTimeout(self.pos_db))
+        try:
+            while True:
+                self._updateFiles()
+                for file in list(self.files.values()):
+                    try:
+                        file.handle()
+                    except IOError:
+                        # try to reopen in case of stale NFS file handle or similar
+                        file.reopen()
+                        file.handle()
+                self._handleEvents(waiter.wait())
+        finally:
+            self.pos_db.flush()
+            waiter.close()
+
+    def _handleEvents(self, events):
+        for (mask,name) in events:
+            if mask & _InotifyWaiter.DIR_CHANGED:
+                # a log file was created, rotated, or deleted - look at the directory now
+                self.last_update = -1
+            elif mask & _InotifyWaiter.IN_MODIFY:
+                # a log file that was closed because it hadn't changed in a while
+                path = os.path.join(self.dir,name)
+                for file in list(self.files.values()):
+                    if file.file is None and file.path == path:
+                        file.openIfNeeded()
+
     def _updateFiles(self):
         cur_time = time.time()
         if cur_time - self.last_update < 60:  # update files once a minute
@@ -96,6 +126,7 @@ class LogDirectoryWatcher(object):
                 self._handleNewFile(file)
         self._handleDeletedFiles(cur_files)
         self.last_update = cur_time
+        self.scanned = True
 
     def _getCurrentFiles(self):
         cur_files = []
@@ -105,7 +136,7 @@ class LogDirectoryWatcher(object):
                 continue
             if os.path.islink(path):      # but not soft links
                 continue
-            cur_files.append(LogFile(path,self.callback,self.pos_db))
+            cur_files.append(LogFile(path,self.callback,self.pos_db,self.batch))
         return cur_files
 
     def _handleExistingFile(self, file):
@@ -117,6 +148,9 @@ class LogDirectoryWatcher(object):
 
     def _handleNewFile(self, file):
         logger.info("new file %s %s",file.id,file.path)
+        if self.scanned and self.pos_db.get(file.id) is None:
+            # created (e.g. by log rotation) since the watcher started, so read all of it
+            self.pos_db.set(file.id,0)
         file.openIfNeeded()
         self.files[file.id] = file
 
@@ -127,17 +161,140 @@ class LogDirectoryWatcher(object):
                 self.files[id].file.close()
             del self.files[id]
         for id in self.pos_db.ids():
-            if id not in self.files:
+            if id not in self.files and not id.startswith(PositionDB.RECORD_PREFIX):
                 self.pos_db.remove(id)
 
 #######################################################################################################################
 
+def _waitTimeout(pos_db):
+    # wake up at least often enough to write changed positions on time
+    if pos_db.checkpoint_interval is None:
+        return 60
+    return max(1,min(60,pos_db.checkpoint_interval))
+
+def _getWaiter(dir, timeout, names=None):
+    """Returns an object whose wait() returns when files in dir (or just the given names) change."""
+    fs_type = _getFileSystemType(dir)
+    if fs_type in _NETWORK_FILE_SYSTEMS:
+        # inotify doesn't see changes made by other hosts
+        logger.info("%s is on a %s file system - polling for changes",dir,fs_type)
+        return _PollWaiter()
+    try:
+        return _InotifyWaiter(dir,timeout,names)
+    except OSError as e:
+        logger.info("can't use inotify for %s (%s) - polling for changes",dir,e)
+        return _PollWaiter()
+
+_NETWORK_FILE_SYSTEMS = set(["nfs","nfs4","cifs","smb3","smbfs","lustre","gpfs","panfs","beegfs","ceph","9p",
+                             "fuse.sshfs","afs"])
+
+def _getFileSystemType(path):
+    path = os.path.realpath(path)
+    fs_type = None
+    mount_len = -1
+    try:
+        f = open("/proc/mounts","r")
+        for line in f:
+            toks = line.split()
+            if len(toks) < 3:
+                continue
+            mount_point = toks[1].replace("\\040"," ")
+            if path == mount_point or path.startswith(mount_point.rstrip("/")+"/"):
+                if len(mount_point) > mount_len:
+                    mount_len = len(mount_point)
+                    fs_type = toks[2]
+        f.close()
+    except IOError:
+        pass
+    return fs_type
+
+class _PollWaiter(object):
+    def wait(self):
+        time.sleep(1)
+        return []
+
+    def close(self):
+        pass
+
+class _InotifyWaiter(object):
+    IN_MODIFY = 0x00000002
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    DIR_CHANGED = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_Q_OVERFLOW
+
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, dir, timeout, names=None):
+        self.timeout = timeout
+        self.names = names
+        libc = ctypes.CDLL(ctypes.util.find_library("c"),use_errno=True)
+        try:
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("inotify isn't supported on this system")
+        self.fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(),os.strerror(ctypes.get_errno()))
+        mask = self.IN_MODIFY | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if inotify_add_watch(self.fd,os.fsencode(dir),mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno,os.strerror(errno))
+
+    def wait(self):
+        """Returns a list of (mask, file name) once an interesting file changes or after timeout seconds."""
+        end_time = time.time() + self.timeout
+        while True:
+            timeout = end_time - time.time()
+            if timeout <= 0:
+                return []
+            (readable,writable,exceptional) = select.select([self.fd],[],[],timeout)
+            if len(readable) == 0:
+                return []
+            events = [event for event in self._read()
+                      if self.names is None or event[1] in self.names or event[0] & self.IN_Q_OVERFLOW]
+            if len(events) > 0:
+                return events
+
+    def _read(self):
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd,65536)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos < len(buf):
+                (wd,mask,cookie,length) = self._EVENT.unpack_from(buf,pos)
+                pos += self._EVENT.size
+                name = buf[pos:pos+length].rstrip(b"\0").decode("utf-8","replace")
+                pos += length
+                events.append((mask,name))
+
+    def close(self):
+        os.close(self.fd)
+
+#######################################################################################################################
+
 class LogFile(object):
-    def __init__(self, path, callback, pos_db = None):
+    """Reads new lines from a log file.
+
+    The callback is called with the path of the file and a line. If batch is True, it is instead called with the
+    path and a list of all of the lines read at once (up to about BLOCK_SIZE bytes).
+    """
+
+    BLOCK_SIZE = 1024*1024
+
+    def __init__(self, path, callback, pos_db = None, batch = False):
         self.path = path
         st = os.stat(path)
         self.id = self._getId(st)
         self.callback = callback
+        self.batch = batch
         self.file = None
         if pos_db is None:
             self.pos_db = PositionDB()
@@ -164,11 +321,9 @@ class LogFile(object):
         if position is not None:
             self.file.seek(position)
         else:
-            self.file.seek(0,os.SEEK_END)
-            self._savePosition()
-
-    def _savePosition(self):
-        return self.pos_db.set(self.id,self.file.tell())
+            position = self.file.seek(0,os.SEEK_END)
+            self.pos_db.set(self.id,position)
+        return position
 
     def _forgetPosition(self):
         self.pos_db.remove(self.id)
@@ -177,12 +332,12 @@ class LogFile(object):
         logger.info("opening file %s (%s)",self.id,self.path)
         if self.file is not None:
             logger.warn("attempting to open already open file %s",self.path)
-        self.file = open(self.path,"r")
+        self.file = open(self.path,"rb")
         self._seek()
 
     def reopen(self):
         logger.info("reopening file %s (%s)",self.id,self.path)
-        self.file = open(self.path,"r")
+        self.file = open(self.path,"rb")
         self._seek()
 
     def closeIfNeeded(self):
@@ -210,36 +365,109 @@ class LogFile(object):
         if self.file is None:
             return
         logger.debug("checking log file %s",self.path)
-        line = "junk"
-        self._seek()
-        while line:
-            line = self.file.readline()
-            if line.endswith("\n"):
-                self.callback(self.path,line)
-                self._savePosition()
-            else:
+        position = self._seek()
+        partial = b""
+        while True:
+            # read large blocks and split them into lines - a partial line at the end of the file is read again
+            # the next time
+            block = self.file.read(self.BLOCK_SIZE)
+            if len(block) == 0:
                 break
-            
+            if len(partial) > 0:
+                block = partial + block
+            end = block.rfind(b"\n") + 1
+            partial = block[end:]
+            if end == 0:
+                continue
+            if self.batch:
+                self._handleBatch(block[:end])
+                position += end
+                self.pos_db.set(self.id,position,block.count(b"\n",0,end))
+            elif block.isascii():
+                # characters are bytes, so decode the whole block at once
+                lines = block[:end].decode("ascii").split("\n")
+                lines.pop()   # empty string after the last newline
+                for line in lines:
+                    position += len(line) + 1
+                    self.callback(self.path,line+"\n")
+                    self.pos_db.set(self.id,position)
+            else:
+                lines = block[:end].split(b"\n")
+                lines.pop()
+                for line in lines:
+                    position += len(line) + 1
+                    self.callback(self.path,line.decode("utf-8","replace")+"\n")
+                    self.pos_db.set(self.id,position)
+        self.pos_db.checkpoint()
+
+    def _handleBatch(self, block):
+        if block.isascii():
+            text = block.decode("ascii")
+        else:
+            text = "\n".join([line.decode("utf-8","replace") for line in block.split(b"\n")])
+        lines = [line+"\n" for line in text.split("\n")]
+        lines.pop()
+        self.callback(self.path,lines)
+
 
 #######################################################################################################################
 
 class PositionDB(object):
-    def __init__(self, path=None):
+    """Remembers how far each log file has been read.
+
+    By default, the positions are written to the file every time one changes. If checkpoint_lines is more than 1 or
+    checkpoint_interval (seconds) is set, changed positions are kept in memory and written once checkpoint_lines of
+    them have changed or checkpoint_interval seconds have passed since the last write, as well as when flush() is
+    called. If IPF stops without flushing, at most checkpoint_lines lines (or the lines read during
+    checkpoint_interval seconds), plus one batch of lines for a LogFile in batch mode, of each log file are handled
+    again when it restarts - none are skipped.
+
+    Ids that start with RECORD_PREFIX record other progress (such as a completed replay of old logs) instead of the
+    position in a log file, and aren't removed when log files go away.
+    """
+
+    RECORD_PREFIX = "record:"
+
+    def __init__(self, path=None, checkpoint_lines=1, checkpoint_interval=None):
         self.position = {}
         self.path = path
+        self.checkpoint_lines = checkpoint_lines
+        self.checkpoint_interval = checkpoint_interval
+        self.changes = 0
+        self.last_write = time.time()
         self._read()
 
-    def set(self, id, position):
+    def set(self, id, position, lines=1):
         if id not in self.position or position != self.position[id]:
             self.position[id] = position
-            self._write()
+            self.changes += lines
+            if self.changes >= self.checkpoint_lines:
+                self.flush()
+            elif self.checkpoint_interval is not None and time.time() - self.last_write >= self.checkpoint_interval:
+                self.flush()
 
     def get(self, id):
         return self.position.get(id,None)
 
     def remove(self, id):
         del self.position[id]
+        self.changes += 1
+        self.flush()
+
+    def checkpoint(self):
+        """Writes changed positions if checkpoint_interval seconds have passed since the last write."""
+        if self.changes == 0 or self.checkpoint_interval is None:
+            return
+        if time.time() - self.last_write >= self.checkpoint_interval:
+            self.flush()
+
+    def flush(self):
+        """Writes any changed positions."""
+        if self.changes == 0:
+            return
         self._write()
+        self.changes = 0
+        self.last_write = time.time()
 
     def ids(self):
         return list(self.position.keys())
@@ -263,10 +491,12 @@ class PositionDB(object):
         if self.path is None:
             return
         try:
-            file = open(self.path,"w")
+            # write a new file and rename it so that a crash never leaves a partial position file
+            file = open(self.path+".new","w")
             for key in self.position:
                 file.write("%s %d\n" % (key,self.position[key]))
             file.close()
+            os.rename(self.path+".new",self.path)
         except IOError as e:
             logger.error("failed to write position database %s: %s" % (self.path,e))
 
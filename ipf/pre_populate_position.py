@@ -4,13 +4,14 @@
 import os
 import sys
 
-position_file = open(sys.argv[1], "w")
+if __name__ == "__main__":
+    # the catalog imports every module in ipf, so only do this when run as a script
+    position_file = open(sys.argv[1], "w")
 
-for file in sys.argv[2:]:
-    st = os.stat(file)
-    ID = "%s-%d" % (st.st_dev, st.st_ino)
-    position = "%s %d\n" % (ID,st.st_size)
-    position_file.write(position)
-
-position_file.close()
+    for file in sys.argv[2:]:
+        st = os.stat(file)
+        ID = "%s-%d" % (st.st_dev, st.st_ino)
+        position = "%s %d\n" % (ID,st.st_size)
+        position_file.write(position)
 
+    position_file.close()
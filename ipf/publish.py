@@ -16,6 +16,7 @@
 ###############################################################################
 
 import http.client
+import io
 import os
 import random
 import ssl
@@ -49,20 +50,28 @@ class FileStep(PublishStep):
         self._acceptParameter("append",
                               "Whether to append to the file or to overwrite it (default is overwrite).",
                               False)
+        self._acceptParameter("compact",
+                              "Whether to write JSON documents without indentation (default is indented).",
+                              False)
 
     def _publish(self, representation):
         if self.params.get("append",False):
             self.info("appending %s",representation)
             f = open(self._getPath(),"a")
-            f.write(representation.get())
+            self._write(f,representation)
             f.close()
         else:
             self.info("writing %s",representation)
             f = open(self._getPath()+".new","w")
-            f.write(representation.get())
+            self._write(f,representation)
             f.close()
             os.rename(self._getPath()+".new",self._getPath())
 
+    def _write(self, f, representation):
+        # large documents are written as they are converted instead of all at once
+        for chunk in representation.getChunks(self.params.get("compact",False)):
+            f.write(chunk)
+
     def _getPath(self):
         try:
             path = self.params["path"]
@@ -103,6 +112,7 @@ class AmqpStep(PublishStep):
         self._acceptParameter("ssl_options","A dictionary containing the SSL options to use to connect. See the Python ssl.wrap_socket function for keys and values. Any relative path names are relative to a path in $IPF_WORKFLOW_PATH",False)
         self._acceptParameter("vhost","the AMQP virtual host to connect to",False)
         self._acceptParameter("exchange","the AMQP exchange to publish to",False)
+        self._acceptParameter("compact","whether to publish JSON documents without indentation (default false)",False)
 
         self.services = []
         self.username = None
@@ -162,7 +172,7 @@ class AmqpStep(PublishStep):
         # don't use PublishStep.run since we need to handle AMQP heartbeats
         while True:
             try:
-                data = self.input_queue.get(True,5)
+                data = self._receive(True,5)
                 if data == None:
                     break
                 for rep_class in self.publish:
@@ -190,7 +200,10 @@ class AmqpStep(PublishStep):
                 self.warning("closing connection - missed too many heartbeats")
                 self._close()
 
-        self._close()
+        if not self.resident:
+            self._close()
+        # otherwise keep the connection for the next run - if the server drops it in between, the retry in
+        # _publish reconnects
 
     def _publish(self, representation):
         self.info("publishing %s",representation)
@@ -210,13 +223,20 @@ class AmqpStep(PublishStep):
         except StepError:
             raise StepError("not connected to any service, will not publish %s" % representation.__class__)
         try:
-            self.channel.basic_publish(amqp.Message(body=representation.get()),
+            self.channel.basic_publish(amqp.Message(body=self._getBody(representation),content_encoding="utf-8"),
                                        self.exchange,
                                        representation.data.id.encode("utf-8"))
         except Exception as e:
             self._close()
             raise StepError("failed to publish %s: %s" % (representation.__class__,e))
 
+    def _getBody(self, representation):
+        # a message is sent all at once, but encoding it in pieces avoids also holding the whole document as text
+        body = io.BytesIO()
+        for chunk in representation.getChunks(self.params.get("compact",False)):
+            body.write(chunk.encode("utf-8"))
+        return body.getvalue()
+
     def _connectIfNecessary(self):
         if self.channel is not None:
             return
@@ -39,8 +39,9 @@ logging.config.fileConfig(os.path.join(IPF_ETC_PATH,"logging.conf"))
 #######################################################################################################################
 
 class WorkflowDaemon(Daemon):
-    def __init__(self, workflow_path):
+    def __init__(self, workflow_path, engine_mode=None):
         self.workflow_path = workflow_path
+        self.engine_mode = engine_mode
 
         (path,workflow_filename) = os.path.split(workflow_path)
         name = workflow_filename.split(".")[0]
@@ -51,14 +52,15 @@ class WorkflowDaemon(Daemon):
                         stderr=os.path.join(IPF_LOG_PATH,name+".log"))
 
     def run(self):
-        engine = WorkflowEngine()
+        engine = WorkflowEngine(self.engine_mode)
         engine.run(self.workflow_path)
 
 #######################################################################################################################
 
 class OneWorkflowOnly(OneProcessWithRedirect):
-    def __init__(self, workflow_path):
+    def __init__(self, workflow_path, engine_mode=None):
         self.workflow_path = workflow_path
+        self.engine_mode = engine_mode
         (path,workflow_filename) = os.path.split(workflow_path)
         name = workflow_filename.split(".")[0]
 
@@ -68,7 +70,7 @@ class OneWorkflowOnly(OneProcessWithRedirect):
                                         stderr=os.path.join(IPF_LOG_PATH,name+".log"))
 
     def run(self):
-        engine = WorkflowEngine()
+        engine = WorkflowEngine(self.engine_mode)
         engine.run(self.workflow_path)
 
 #######################################################################################################################
@@ -80,6 +82,10 @@ def main():
                       help="run as a daemon")
     parser.add_option("-c","--cron",action="store_true",default=False,dest="cron",
                       help="running out of cron")
+    parser.add_option("-m","--engine-mode",action="store",default=None,dest="engine_mode",
+                      choices=WorkflowEngine.MODES,
+                      help="how to run workflow steps: %s (overrides engine_mode in the workflow file)" % \
+                      ", ".join(WorkflowEngine.MODES))
     (options, args) = parser.parse_args()
     if options.daemon and options.cron:
         parser.error("can't run as both daemon and cron")
@@ -87,14 +93,14 @@ def main():
         parser.error("exactly one positional argument expected - a path to a workflow file")
 
     if options.daemon:
-        daemon = WorkflowDaemon(args[0])
+        daemon = WorkflowDaemon(args[0],options.engine_mode)
         daemon.start()
     elif options.cron:
         # don't let processes pile up if workflows aren't finishing
-        workflow = OneWorkflowOnly(args[0])
+        workflow = OneWorkflowOnly(args[0],options.engine_mode)
         workflow.start()
     else:
-        engine = WorkflowEngine()
+        engine = WorkflowEngine(options.engine_mode)
         engine.run(args[0])
 
 #######################################################################################################################
@@ -15,13 +15,12 @@
 #   limitations under the License.                                            #
 ###############################################################################
 
-import copy
 import logging
 import multiprocessing
 import time
 from queue import Empty
 
-from ipf.data import Data,Representation
+from ipf.data import Data,Representation,SerializedData
 from ipf.error import NoMoreInputsError, StepError
 
 #######################################################################################################################
@@ -43,13 +42,19 @@ class Step(multiprocessing.Process):
         self._acceptParameter("requires","list of additional types this step requires",False)
         self._acceptParameter("outputs","list of ids for steps that output should be sent to (typically not needed)",
                               False)
+        self._acceptParameter("share_outputs",
+                              "send the same output data to all steps that receive it instead of a copy to each when the workflow engine runs steps in one process - those steps must not modify their inputs (default false)",
+                              False)
         
         self.input_queue = multiprocessing.Queue()
+        self.local_input_queue = False  # set by the engine when input_queue is an in-process queue
         self.inputs = []  # input data received from input_queue, but not yet wanted
         self.no_more_inputs = False
 
         self.outputs = {}  # steps to send outputs to. keys are data.name, values are lists of steps
 
+        self.resident = False  # set by the engine when this step will be run again after it finishes
+
         self.logger = logging.getLogger(self._logName())
 
     def configure(self, step_doc, workflow_params):
@@ -138,7 +143,7 @@ class Step(multiprocessing.Process):
             raise NoMoreInputsError("No more inputs and none of the %d waiting message is a %s." %
                                     (len(self.inputs),cls))
         while True:
-            data = self.input_queue.get(True)
+            data = self._receive()
             if data == None:
                 self.no_more_inputs = True
                 raise NoMoreInputsError("no more inputs while waiting for %s" % cls)
@@ -147,6 +152,18 @@ class Step(multiprocessing.Process):
             else:
                 self.inputs.append(data)
 
+    def reset(self):
+        """Prepare to run again - the engine calls this before each run of a resident workflow."""
+        self.inputs = []
+        self.no_more_inputs = False
+
+    def _receive(self, block=True, timeout=None):
+        """Get the next item from input_queue, deserializing it if needed. Raises Empty like Queue.get."""
+        data = self.input_queue.get(block,timeout)
+        if isinstance(data,SerializedData):
+            return data.get()
+        return data
+
     def run(self):
         """Run the step - the Engine will have this in its own thread."""
         raise StepError("Step.run not overridden")
@@ -156,10 +173,16 @@ class Step(multiprocessing.Process):
             self.warning("%s is not a specified output - not passing it on" % data.__class__.__name__)
             return
         self.debug("output %s",data)
+        serialized = None
         for step in self.outputs[data.__class__]:
             self.debug("sending output %s to step %s",data,step.id)
-            # isolate any changes to the data by queuing copies
-            step.input_queue.put(copy.deepcopy(data))
+            if step.local_input_queue and self.params.get("share_outputs",False):
+                step.input_queue.put(data)
+                continue
+            # isolate any changes to the data by queuing copies - serialize once for any number of steps
+            if serialized is None:
+                serialized = SerializedData(data)
+            step.input_queue.put(serialized)
 
     def _logName(self):
         return self.__module__ + "." + self.__class__.__name__
@@ -211,7 +234,7 @@ class PublishStep(Step):
 
     def run(self):
         while True:
-            data = self.input_queue.get(True)
+            data = self._receive()
             if data == None:
                 break
             for rep_class in self.publish:
@@ -281,7 +304,7 @@ class TriggerStep(Step):
     def _runTrigger(self):
         while True:
             try:
-                data = self.input_queue.get(True,1)
+                data = self._receive(True,1)
             except Empty:
                 if self.next_trigger is not None and time.time() >= self.next_trigger:
                     # if it has been too long since the last trigger, send one
@@ -318,6 +341,12 @@ class WorkflowStep(TriggerStep):
         TriggerStep.__init__(self)
         self.description = "runs a workflow on triggers under constraints"
         self._acceptParameter("workflow","the workflow description file to execute",True)
+        self._acceptParameter("resident",
+                              "load the workflow once and run the same steps on each trigger instead of reading and starting it again each time - the steps run in threads of this step (default false)",
+                              False)
+
+        self.engine = None
+        self.workflow = None
 
     def _trigger(self, representation):
         try:
@@ -328,8 +357,14 @@ class WorkflowStep(TriggerStep):
         self.info("running workflow %s",workflow_file)
         # error if import is above
         from ipf.engine import WorkflowEngine
-        engine = WorkflowEngine()
-        engine.run(workflow_file)
+        if not self.params.get("resident",False):
+            engine = WorkflowEngine()
+            engine.run(workflow_file)
+            return
+        if self.workflow is None:
+            self.engine = WorkflowEngine(resident=True)
+            self.workflow = self.engine.load(workflow_file)
+        self.engine.execute(self.workflow)
 
 ##############################################################################################################
 
@@ -34,6 +34,8 @@ class Workflow(object):
         self.name = None
         self.steps = []
         self.timeout = None    # the number of seconds to wait for the workflow to complete
+        self.engine_mode = None  # how the engine runs steps (process, thread, or inline) - None for the default
+        self.params = {}         # the workflow params, which are also given to steps that are added
 
     def __str__(self):
         wstr = "Workflow %s\n" % self.name
@@ -51,11 +53,14 @@ class Workflow(object):
 
         if "timeout" in doc:
             self.timeout = doc["timeout"]
+        if "engine_mode" in doc:
+            self.engine_mode = doc["engine_mode"]
 
         if not "steps" in doc:
             raise WorkflowError("no steps specified")
 
         self.name = doc.get("name","workflow")
+        self.params = doc.get("params",{})
         for step_doc in doc["steps"]:
             if "name" not in step_doc:
                 raise WorkflowError("workflow step does not specify the 'name' of the step to run")
@@ -63,7 +68,7 @@ class Workflow(object):
                 step = catalog.steps[step_doc["name"]]()
             except KeyError:
                 raise WorkflowError("no step is known with name '%s'" % step_doc["name"])
-            step.configure(step_doc,doc.get("params",{}))
+            step.configure(step_doc,self.params)
 
             self.steps.append(step)
 
@@ -90,7 +95,7 @@ class Workflow(object):
             if len(producers) > 1:
                 raise WorkflowError("more than one step produces %s - can't infer which to use" % cls)
             step = producers[0]()
-            step.configure({"params":{}},{})
+            step.configure({"params":{}},self.params)
             self.steps.append(step)
             self._addRequires(step,requires)
             self._addProduces(step,produces)
@@ -0,0 +1,85 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import json
+import pickle
+import unittest
+
+from ipf.data import SerializedData, jsonChunks
+
+#######################################################################################################################
+
+class JsonChunksTest(unittest.TestCase):
+    DOC = {"b": [1,2.5,None,True],
+           "a": {"nested": {"x": "line\nbreak", "y": []}, "empty": {}},
+           "c": "café"}
+
+    def assertSameText(self, makeDoc, expected_doc):
+        # makeDoc() is called for each conversion, since iterators can only be read once
+        self.assertEqual("".join(jsonChunks(makeDoc(),sort_keys=True)),
+                         json.dumps(expected_doc,indent=4,sort_keys=True))
+        self.assertEqual("".join(jsonChunks(makeDoc(),True,sort_keys=True)),
+                         json.dumps(expected_doc,separators=(",",":"),sort_keys=True))
+
+    def testNoIterators(self):
+        self.assertSameText(lambda: self.DOC,self.DOC)
+        self.assertSameText(lambda: [],[])
+        self.assertSameText(lambda: "text","text")
+
+    def testIterators(self):
+        docs = [dict(self.DOC,id=i) for i in range(3)]
+        self.assertSameText(lambda: (doc for doc in docs),docs)
+        self.assertSameText(lambda: {"Activities": (doc for doc in docs), "Full": True},
+                            {"Activities": docs, "Full": True})
+        self.assertSameText(lambda: {"Activities": iter([]), "Removed": ["a"]},{"Activities": [], "Removed": ["a"]})
+        self.assertSameText(lambda: [{"x": iter([iter([1]),2])}],[{"x": [[1],2]}])
+
+    def testKeyOrder(self):
+        doc = {"b": iter([1]), "a": 2}
+        self.assertEqual("".join(jsonChunks(doc)),json.dumps({"b": [1], "a": 2},indent=4))
+
+    def testOneItemAtATime(self):
+        # the next item isn't made until the previous one has been written
+        made = []
+        def items():
+            for i in range(3):
+                made.append(i)
+                yield {"id": i}
+        chunks = jsonChunks({"items": items()})
+        text = ""
+        for chunk in chunks:
+            text += chunk
+            if len(made) > 0:
+                self.assertLessEqual(text.count('"id"'),len(made))
+                self.assertGreaterEqual(text.count('"id"'),len(made)-1)
+        self.assertEqual(json.loads(text),{"items": [{"id": 0},{"id": 1},{"id": 2}]})
+
+#######################################################################################################################
+
+class SerializedDataTest(unittest.TestCase):
+    def testGet(self):
+        data = {"jobs": [1,2,3]}
+        serialized = pickle.loads(pickle.dumps(SerializedData(data)))
+        copy1 = serialized.get()
+        copy2 = serialized.get()
+        self.assertEqual(copy1,data)
+        copy1["jobs"].append(4)
+        self.assertEqual(copy2,data)
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import datetime
+import json
+import unittest
+
+from ipf.dt import tzoffset
+from ipf.glue2.computing_activity import *
+
+#######################################################################################################################
+
+def activity(id, queue="normal"):
+    activity = ComputingActivity()
+    activity.LocalIDFromManager = id
+    activity.ID = "urn:ogf:glue2:xsede.org:ComputingActivity:%s.test.org" % id
+    activity.Queue = queue
+    activity.State = [ComputingActivity.STATE_RUNNING]
+    activity.StartTime = datetime.datetime(2026,1,1,tzinfo=tzoffset(0))
+    activity.Extension["LocalAccount"] = "acct"
+    return activity
+
+#######################################################################################################################
+
+class ActivityCacheTest(unittest.TestCase):
+    def testGetAndSet(self):
+        cache = ActivityCache(hot_size=2)
+        activities = [activity(str(i)) for i in range(5)]
+        for a in activities:
+            cache[a.LocalIDFromManager] = a
+        self.assertEqual(len(cache),5)
+        self.assertEqual(len(cache.hot),2)
+        self.assertIn("0",cache)
+        self.assertNotIn("5",cache)
+        # a compacted activity comes back the same
+        restored = cache["0"]
+        self.assertIsInstance(restored,ComputingActivity)
+        self.assertIsNot(restored,activities[0])
+        self.assertEqual(restored.__dict__,activities[0].__dict__)
+        self.assertIn("0",cache.hot)
+        self.assertIsNone(cache.get("5"))
+        with self.assertRaises(KeyError):
+            cache["5"]
+
+    def testChangedInPlace(self):
+        cache = ActivityCache(hot_size=2)
+        cache["1"] = activity("1")
+        cache["1"].State = [ComputingActivity.STATE_FINISHED]
+        for i in range(2,5):
+            cache[str(i)] = activity(str(i))
+        self.assertEqual(cache["1"].State,[ComputingActivity.STATE_FINISHED])
+
+    def testDelete(self):
+        cache = ActivityCache(hot_size=1)
+        cache["1"] = activity("1")
+        cache["2"] = activity("2")
+        del cache["1"]    # cold
+        del cache["2"]    # hot
+        self.assertEqual(len(cache),0)
+        with self.assertRaises(KeyError):
+            del cache["1"]
+
+    def testMaxSize(self):
+        cache = ActivityCache(max_size=3,hot_size=1)
+        for i in range(5):
+            cache[str(i)] = activity(str(i))
+        cache["2"]    # recently used
+        cache["5"] = activity("5")
+        self.assertEqual(len(cache),3)
+        self.assertEqual(sorted(list(cache.hot)+list(cache.cold)),["2","4","5"])
+
+    def testMaxAge(self):
+        cache = ActivityCache(max_age=60,hot_size=1)
+        cache["1"] = activity("1")
+        cache["2"] = activity("2")
+        (last_use,record) = cache.cold["1"]
+        cache.cold["1"] = (last_use-61,record)
+        cache["3"] = activity("3")
+        self.assertNotIn("1",cache)
+        self.assertIn("2",cache)
+
+#######################################################################################################################
+
+class DeltaStep(ComputingActivitiesStep):
+    def __init__(self, params):
+        ComputingActivitiesStep.__init__(self)
+        self.params = params
+        self.resource_name = "test.org"
+        self.resident = True
+        self.snapshot = None
+
+    def run(self, activities):
+        (delta,self.snapshot) = self._getDelta(activities)
+        return delta
+
+class DeltaTest(unittest.TestCase):
+    def testDelta(self):
+        step = DeltaStep({"delta": True})
+        delta = step.run([activity("1"),activity("2"),activity("3")])
+        self.assertTrue(delta.full)
+        self.assertEqual(delta.sequence,0)
+
+        delta = step.run([activity("1"),activity("2"),activity("3")])
+        self.assertFalse(delta.full)
+        self.assertEqual((delta.added,delta.changed,delta.removed),([],[],[]))
+
+        changed = activity("2")
+        changed.State = [ComputingActivity.STATE_FINISHED]
+        extended = activity("3")
+        extended.Extension["Priority"] = 10
+        delta = step.run([activity("1"),changed,extended,activity("4")])
+        self.assertEqual(delta.sequence,2)
+        self.assertEqual([a.LocalIDFromManager for a in delta.added],["4"])
+        self.assertEqual([a.LocalIDFromManager for a in delta.changed],["2","3"])
+
+        delta = step.run([activity("1"),changed,extended])
+        self.assertEqual(delta.removed,[activity("4").ID])
+
+    def testHidden(self):
+        # a change to a hidden attribute isn't published, so it isn't a change
+        step = DeltaStep({"delta": True})
+        hidden = activity("1")
+        hidden.hide = ["Queue"]
+        step.run([hidden])
+        hidden = activity("1",queue="debug")
+        hidden.hide = ["Queue"]
+        self.assertEqual(step.run([hidden]).changed,[])
+
+    def testFullInterval(self):
+        step = DeltaStep({"delta": True, "full_interval": 0})
+        step.run([activity("1")])
+        self.assertTrue(step.run([activity("1")]).full)
+
+    def testDocument(self):
+        step = DeltaStep({"delta": True})
+        step.run([activity("1"),activity("2")])
+        activities = [activity("1",queue="debug"),activity("3")]
+        data = ComputingActivities("test.org",activities)
+        data.delta = step.run(activities)
+        representation = ComputingActivitiesDeltaOgfJson(data)
+        self.assertEqual(representation.get(),json.dumps(representation.toJson(),sort_keys=True,indent=4))
+        doc = json.loads(representation.get())
+        self.assertEqual((doc["Full"],doc["Sequence"]),(False,1))
+        self.assertEqual([a["LocalIDFromManager"] for a in doc["Added"]],["3"])
+        self.assertEqual([a["Queue"] for a in doc["Changed"]],["debug"])
+        self.assertEqual(doc["Removed"],[activity("2").ID])
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import io
+import json
+import unittest
+
+from ipf.error import StepError
+from ipf.glue2.slurm import _JsonReader, _LogDispatcher
+
+#######################################################################################################################
+
+class JsonReaderTest(unittest.TestCase):
+    DOC = {"meta": {"plugin": {"type": "openapi/v0.0.39"}, "Slurm": {"version": [23,2,7]}},
+           "errors": [],
+           "nodes": [{"name": "c401-001", "cpus": 128, "real_memory": 256000, "state": ["IDLE","DRAIN"],
+                      "weight": -1.5e-3, "features": "", "comment": "say \"hi\" \\ café ☃",
+                      "alloc_memory": 0, "energy": {"set": True, "infinite": False, "number": 1700000000}},
+                     {"name": "c401-002", "cpus": 64, "real_memory": 512000.25, "state": "ALLOCATED",
+                      "features": None, "big": 12345678901234567890, "flag": True, "exp": 6.02E+23},
+                     []],
+           "warnings": [{"description": "nodes", "source": "[0]"}]}
+
+    def items(self, text, key, chunk_size):
+        reader = _JsonReader(io.StringIO(text))
+        reader.CHUNK_SIZE = chunk_size
+        return list(reader.items(key))
+
+    def testChunkBoundaries(self):
+        # every value is split across chunks at every position for some chunk size
+        for indent in (None,2):
+            text = json.dumps(self.DOC,indent=indent)
+            for chunk_size in list(range(1,40)) + [len(text)-1,len(text),len(text)+1]:
+                self.assertEqual(self.items(text,"nodes",chunk_size),self.DOC["nodes"],
+                                 "chunk size %d" % chunk_size)
+                self.assertEqual(self.items(text,"warnings",chunk_size),self.DOC["warnings"])
+                self.assertEqual(self.items(text,"errors",chunk_size),[])
+
+    def testNumberAtEndOfChunk(self):
+        # a number that ends a chunk may continue in the next one
+        for text in ('{"x": [1700000000.5e3]}','{"x": [1700000000,2]}','{"x": [-12, 3e-2]}'):
+            expected = json.loads(text)["x"]
+            for chunk_size in range(1,len(text)+1):
+                self.assertEqual(self.items(text,"x",chunk_size),expected,"%s chunk size %d" % (text,chunk_size))
+
+    def testMissingKey(self):
+        self.assertEqual(self.items('{"a": [1,2]}',"b",3),[])
+        self.assertEqual(self.items('{}',"b",3),[])
+        self.assertEqual(self.items(' { "b" : [ ] } ',"b",1),[])
+
+    def testTruncated(self):
+        text = json.dumps(self.DOC)
+        for end in (0,len(text)//2,len(text)-1):
+            with self.assertRaises(StepError):
+                self.items(text[:end],"warnings",7)
+
+    def testNotAnObject(self):
+        with self.assertRaises(StepError):
+            self.items('[1,2]',"nodes",4)
+
+#######################################################################################################################
+
+class FakeStep(object):
+    def __init__(self, params):
+        self.params = params
+
+class LogDispatcherTest(unittest.TestCase):
+    LINES = [
+        ("[2013-04-21T16:14:47] _slurm_rpc_submit_batch_job JobId=618921 usec=12273",
+         (_LogDispatcher.SUBMIT,"2013-04-21T16:14:47","618921")),
+        ("[2013-04-21T11:51:52] sched: _slurm_rpc_job_step_create: StepId=617701.0 c410-[603,701] usec=477",
+         (_LogDispatcher.STEP_CREATE,"2013-04-21T11:51:52","617701")),
+        ("[2013-04-21T16:10:43] job 618861 cancelled from interactive user",
+         (_LogDispatcher.CANCELLED,"2013-04-21T16:10:43","618861")),
+        ("[2013-04-21T11:51:53] sched: _slurm_rpc_step_complete StepId=617701.0 usec=43",
+         (_LogDispatcher.STEP_COMPLETE,"2013-04-21T11:51:53","617701")),
+        ("[2013-04-21T11:51:53] _slurm_rpc_complete_batch_script: JobId=617701 usec=88",None),
+        ("[2013-04-21T11:51:53] _job_complete: JobId=617701 done",None),
+    ]
+
+    def testDefaults(self):
+        dispatcher = _LogDispatcher(FakeStep({}))
+        self.assertIsNotNone(dispatcher.regexp)
+        for (line,event) in self.LINES:
+            self.assertEqual(dispatcher.match(line+"\n"),event)
+
+    def testOverride(self):
+        params = {"job_cancelled_regexp": r"\[(\S+)\] Job (\S+) was cancelled"}
+        dispatcher = _LogDispatcher(FakeStep(params))
+        self.assertIsNone(dispatcher.regexp)
+        self.assertEqual(dispatcher.match("[2013-04-21T16:10:43] Job 5 was cancelled\n"),
+                         (_LogDispatcher.CANCELLED,"2013-04-21T16:10:43","5"))
+        self.assertIsNone(dispatcher.match("[2013-04-21T16:10:43] job 618861 cancelled from interactive user\n"))
+        for (line,event) in self.LINES:
+            if event is not None and event[0] != _LogDispatcher.CANCELLED:
+                self.assertEqual(dispatcher.match(line+"\n"),event)
+
+    def testOverridesInOrder(self):
+        # when an expression is overridden, the first expression in order that matches is used
+        params = {"submit_batch_job_regexp": r"\[(\S+)\] .*JobId=(\S+)",
+                  "job_cancelled_regexp": r"\[(\S+)\] job (\S+) cancelled"}
+        dispatcher = _LogDispatcher(FakeStep(params))
+        self.assertEqual(dispatcher.match("[t1] job 7 cancelled JobId=7\n"),(_LogDispatcher.SUBMIT,"t1","7"))
+        self.assertEqual(dispatcher.match("[t1] job 7 cancelled\n"),(_LogDispatcher.CANCELLED,"t1","7"))
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()
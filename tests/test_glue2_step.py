@@ -0,0 +1,82 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import unittest
+
+from ipf.glue2.step import NameFilter
+
+#######################################################################################################################
+
+class NameFilterTest(unittest.TestCase):
+    def testNames(self):
+        name_filter = NameFilter("+normal +debug")
+        self.assertTrue(name_filter.include("normal"))
+        self.assertTrue(name_filter.include("debug"))
+        self.assertFalse(name_filter.include("gpu"))
+
+    def testAll(self):
+        name_filter = NameFilter("+* -debug")
+        self.assertTrue(name_filter.include("normal"))
+        self.assertFalse(name_filter.include("debug"))
+        self.assertFalse(NameFilter("").include("normal"))
+
+    def testGlob(self):
+        name_filter = NameFilter("+* -gpu-* -test?")
+        self.assertTrue(name_filter.include("gpu"))
+        self.assertFalse(name_filter.include("gpu-a100"))
+        self.assertFalse(name_filter.include("test1"))
+        self.assertTrue(name_filter.include("test10"))
+        self.assertFalse(NameFilter("+gpu-[ab]*").include("gpu-c100"))
+        self.assertTrue(NameFilter("+gpu-[ab]*").include("gpu-b100"))
+
+    def testLastMatchWins(self):
+        # tokens are applied in order, so a later token overrides an earlier one
+        name_filter = NameFilter("-* +gpu-* -gpu-debug")
+        self.assertTrue(name_filter.include("gpu-a100"))
+        self.assertFalse(name_filter.include("gpu-debug"))
+        self.assertFalse(name_filter.include("normal"))
+        name_filter = NameFilter("-gpu-debug +gpu-*")
+        self.assertTrue(name_filter.include("gpu-debug"))
+        name_filter = NameFilter("+gpu-* -*")
+        self.assertFalse(name_filter.include("gpu-a100"))
+
+    def testWholeName(self):
+        # a glob matches the whole name, not a prefix of it
+        name_filter = NameFilter("+gpu")
+        self.assertFalse(name_filter.include("gpu-a100"))
+        name_filter = NameFilter("+gpu*")
+        self.assertTrue(name_filter.include("gpu-a100"))
+        self.assertFalse(name_filter.include("xgpu"))
+
+    def testBadToken(self):
+        warnings = []
+        name_filter = NameFilter("+normal debug",warning=lambda *args: warnings.append(args))
+        self.assertTrue(name_filter.include("normal"))
+        self.assertFalse(name_filter.include("debug"))
+        self.assertEqual(len(warnings),1)
+
+    def testRemembered(self):
+        name_filter = NameFilter("+* -debug")
+        for i in range(NameFilter.MAX_NAMES+10):
+            name_filter.include("queue%d" % i)
+        self.assertLessEqual(len(name_filter.included),NameFilter.MAX_NAMES)
+        self.assertFalse(name_filter.include("debug"))
+        self.assertTrue(name_filter.include("queue1"))
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import unittest
+
+from ipf.hostlist import HostList
+
+#######################################################################################################################
+
+class HostListTest(unittest.TestCase):
+    def testExpand(self):
+        self.assertEqual(list(HostList("c410-[603,701,803-805]")),
+                         ["c410-603","c410-701","c410-803","c410-804","c410-805"])
+        self.assertEqual(list(HostList("gpu[01-03]-ib")),["gpu01-ib","gpu02-ib","gpu03-ib"])
+        self.assertEqual(list(HostList("login1,login2")),["login1","login2"])
+        self.assertEqual(list(HostList("head")),["head"])
+        self.assertEqual(len(HostList("")),0)
+
+    def testLeadingZeros(self):
+        # numbers with more digits than the range specifies aren't padded
+        self.assertEqual(list(HostList("n[08-11]")),["n08","n09","n10","n11"])
+        self.assertEqual(list(HostList("n[98-101]")),["n98","n99","n100","n101"])
+        self.assertNotIn("n8",HostList("n[08-11]"))
+
+    def testNested(self):
+        names = list(HostList("r[1-2]n[1-2]"))
+        self.assertEqual(sorted(names),["r1n1","r1n2","r2n1","r2n2"])
+
+    def testSizeAndMembership(self):
+        host_list = HostList("c[001-100],c[201-300],d[1-5],head")
+        self.assertEqual(len(host_list),206)
+        self.assertIn("c050",host_list)
+        self.assertIn("c300",host_list)
+        self.assertIn("head",host_list)
+        self.assertNotIn("c150",host_list)
+        self.assertNotIn("c50",host_list)
+        self.assertNotIn("e1",host_list)
+
+    def testStr(self):
+        self.assertEqual(str(HostList("c[003,001-002,005]")),"c[001-003,005]")
+        self.assertEqual(str(HostList("c001")),"c001")
+        self.assertEqual(HostList(str(HostList("a[1-3],b[07-09]-ib,x"))),HostList("a[1-3],b[07-09]-ib,x"))
+
+    def testFromNames(self):
+        names = ["c003","c001","c002","c010","head"]
+        self.assertEqual(HostList.fromNames(names),HostList("c[001-003,010],head"))
+        host_list = HostList()
+        for name in names:
+            host_list.add(name)
+        self.assertEqual(host_list,HostList("c[001-003,010],head"))
+
+    def testUnion(self):
+        union = HostList("c[001-010],a") | HostList("c[005-020],b")
+        self.assertEqual(union,HostList("c[001-020],a,b"))
+        self.assertEqual(HostList("c[001-002]") | HostList("c[003-004]"),HostList("c[001-004]"))
+        self.assertEqual(HostList("c[1-2]") | HostList("c[01-02]"),HostList("c[1-2],c[01-02]"))
+
+    def testIntersection(self):
+        common = HostList("c[001-010,020-030],a,b") & HostList("c[005-025],b")
+        self.assertEqual(common,HostList("c[005-010,020-025],b"))
+        self.assertEqual(len(HostList("c[001-010]") & HostList("d[001-010]")),0)
+
+    def testDifference(self):
+        self.assertEqual(HostList("c[001-030],a,b") - HostList("c[005-010,020],b"),HostList("c[001-004,011-019,021-030],a"))
+        self.assertEqual(len(HostList("c[005-010]") - HostList("c[001-100]")),0)
+        self.assertEqual(HostList("c[001-010]") - HostList("d[001-010]"),HostList("c[001-010]"))
+
+    def testOperandsUnchanged(self):
+        host_list1 = HostList("c[001-010]")
+        host_list2 = HostList("c[005-020]")
+        host_list1 | host_list2
+        host_list1 & host_list2
+        host_list1 - host_list2
+        self.assertEqual(str(host_list1),"c[001-010]")
+        self.assertEqual(str(host_list2),"c[005-020]")
+
+    def testSetOperationsMatchSets(self):
+        exprs = ["c[001-050,060,070-099]","c[040-075]","c[001-002,098-120],x","c[100-200]-ib,c[010-020]"]
+        for expr1 in exprs:
+            for expr2 in exprs:
+                (names1,names2) = (set(HostList(expr1)),set(HostList(expr2)))
+                self.assertEqual(set(HostList(expr1) | HostList(expr2)),names1 | names2)
+                self.assertEqual(set(HostList(expr1) & HostList(expr2)),names1 & names2)
+                self.assertEqual(set(HostList(expr1) - HostList(expr2)),names1 - names2)
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+###############################################################################
+#   Copyright 2026 The University of Texas at Austin                          #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+###############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ipf.log import LogDirectoryWatcher, LogFile, PositionDB
+
+#######################################################################################################################
+
+class LogFileTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="ipf-test-")
+        self.path = os.path.join(self.dir,"test.log")
+        self.pos_path = os.path.join(self.dir,"positions")
+        self.write(b"")
+        self.lines = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data):
+        with open(self.path,"ab") as f:
+            f.write(data)
+
+    def callback(self, path, line):
+        self.lines.append(line)
+
+    def logFile(self, block_size=LogFile.BLOCK_SIZE, batch=False):
+        pos_db = PositionDB(self.pos_path)
+        log_file = LogFile(self.path,self.callback,pos_db,batch)
+        log_file.BLOCK_SIZE = block_size
+        if pos_db.get(log_file.id) is None:
+            pos_db.set(log_file.id,0)    # read from the start instead of the end
+        log_file.open()
+        return log_file
+
+    def testPartialLine(self):
+        for block_size in (1,2,3,1024):
+            self.lines = []
+            os.remove(self.path)
+            self.write(b"first\nsec")
+            if os.path.exists(self.pos_path):
+                os.remove(self.pos_path)
+            log_file = self.logFile(block_size)
+            log_file.handle()
+            self.assertEqual(self.lines,["first\n"])
+            self.assertEqual(log_file.pos_db.get(log_file.id),6)
+            self.write(b"ond\nthird\n")
+            log_file.handle()
+            self.assertEqual(self.lines,["first\n","second\n","third\n"])
+            log_file.close()
+
+    def testPartialCharacter(self):
+        text = "café ☃ \U0001f600\n"
+        data = text.encode("utf-8")
+        for split in range(1,len(data)):
+            for block_size in (1,3,1024):
+                os.remove(self.path)
+                self.write(b"start\n"+data[:split])
+                if os.path.exists(self.pos_path):
+                    os.remove(self.pos_path)
+                self.lines = []
+                log_file = self.logFile(block_size)
+                log_file.handle()
+                self.write(data[split:])
+                log_file.handle()
+                log_file.close()
+                self.assertEqual(self.lines,["start\n",text],"split at %d, block size %d" % (split,block_size))
+
+    def testInvalidUtf8(self):
+        self.write(b"bad \xff byte\nok\n")
+        log_file = self.logFile()
+        log_file.handle()
+        log_file.close()
+        self.assertEqual(self.lines,["bad � byte\n","ok\n"])
+
+    def testResume(self):
+        self.write(b"one\ntwo\nthr")
+        log_file = self.logFile(2)
+        log_file.handle()
+        log_file.close()
+        self.write(b"ee\nfour\n")
+        # as if IPF restarted - the positions are read from the file
+        log_file = self.logFile(2)
+        log_file.handle()
+        log_file.close()
+        self.assertEqual(self.lines,["one\n","two\n","three\n","four\n"])
+        self.assertEqual(PositionDB(self.pos_path).get(log_file.id),os.path.getsize(self.path))
+
+    def testBatch(self):
+        self.write(b"one\ntwo\nthr")
+        log_file = self.logFile(batch=True)
+        log_file.handle()
+        self.write(b"ee\n")
+        log_file.handle()
+        log_file.close()
+        self.assertEqual(self.lines,[["one\n","two\n"],["three\n"]])
+
+#######################################################################################################################
+
+class PositionDBTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="ipf-test-")
+        self.path = os.path.join(self.dir,"positions")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testWrite(self):
+        pos_db = PositionDB(self.path)
+        pos_db.set("1-2",10)
+        pos_db.set("1-3",20)
+        self.assertEqual(PositionDB(self.path).get("1-2"),10)
+        self.assertEqual(PositionDB(self.path).get("1-3"),20)
+        pos_db.remove("1-2")
+        self.assertEqual(PositionDB(self.path).ids(),["1-3"])
+        self.assertFalse(os.path.exists(self.path+".new"))
+
+    def testCheckpointLines(self):
+        pos_db = PositionDB(self.path,checkpoint_lines=3)
+        pos_db.set("1-2",10)
+        pos_db.set("1-2",20)
+        self.assertIsNone(PositionDB(self.path).get("1-2"))
+        pos_db.set("1-2",30)
+        self.assertEqual(PositionDB(self.path).get("1-2"),30)
+        pos_db.set("1-2",40)
+        pos_db.flush()
+        self.assertEqual(PositionDB(self.path).get("1-2"),40)
+
+    def testCheckpointInterval(self):
+        pos_db = PositionDB(self.path,checkpoint_lines=1000,checkpoint_interval=60)
+        pos_db.set("1-2",10)
+        pos_db.checkpoint()
+        self.assertIsNone(PositionDB(self.path).get("1-2"))
+        pos_db.last_write -= 60
+        pos_db.checkpoint()
+        self.assertEqual(PositionDB(self.path).get("1-2"),10)
+
+    def testRecordsKept(self):
+        pos_db = PositionDB(self.path)
+        pos_db.set("1-2",10)
+        pos_db.set(PositionDB.RECORD_PREFIX+"replay-1",1700000000)
+        watcher = LogDirectoryWatcher(None,self.dir,self.path)
+        watcher._handleDeletedFiles([])
+        self.assertEqual(PositionDB(self.path).ids(),[PositionDB.RECORD_PREFIX+"replay-1"])
+
+#######################################################################################################################
+
+if __name__ == "__main__":
+    unittest.main()